@@ -0,0 +1,164 @@
+"""
+Context Store for Shadow AI
+SQLite helpers for the context database: tuned connections, schema migrations
+and a background writer that group-commits queued writes
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from config import CONTEXT_WRITE_BATCH_SIZE, CONTEXT_FLUSH_TIMEOUT
+
+# A migration is a list of SQL statements; its version is its position + 1
+Migration = Sequence[str]
+
+def connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """Open a connection in WAL mode with settings suited to many small writes"""
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL makes NORMAL durable across application crashes; only an OS crash can lose the last commits
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version recorded in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration]) -> int:
+    """
+    Bring the database schema up to date
+
+    Migrations newer than the stored ``user_version`` run in order, each in its
+    own transaction, so existing databases are upgraded in place.
+
+    Returns:
+        The resulting schema version
+    """
+    version = get_schema_version(conn)
+    if conn.in_transaction:
+        conn.commit()
+
+    for target, statements in enumerate(migrations, start=1):
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+            logging.info(f"Migrated context database to schema version {target}")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = target
+
+    return version
+
+WriteOperation = Callable[[sqlite3.Connection], Any]
+
+class BackgroundWriter:
+    """
+    Applies database writes on a dedicated thread.
+
+    Callers queue writes and return immediately. The writer drains everything
+    that is queued (up to ``batch_size``) and commits it as one transaction, so
+    a burst of writes costs one fsync instead of one per insert.
+    """
+
+    def __init__(self, db_path: Union[str, Path], batch_size: int = CONTEXT_WRITE_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batches_committed = 0
+        self.writes_committed = 0
+        self.failed_writes = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="shadow-context-writer", daemon=True)
+        self._thread.start()
+
+    def execute(self, sql: str, params: Tuple = ()):
+        """Queue a single SQL statement"""
+        self.submit(lambda conn: conn.execute(sql, params))
+
+    def submit(self, operation: WriteOperation):
+        """Queue a write operation; it receives the writer's connection"""
+        if self._closed:
+            raise RuntimeError("BackgroundWriter has been closed")
+        self._queue.put(operation)
+
+    def flush(self, timeout: Optional[float] = CONTEXT_FLUSH_TIMEOUT) -> bool:
+        """Wait until every write queued so far has been committed"""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        conn = connect(self.db_path)
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not self._commit_batch(conn, batch):
+                    break
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[Any]) -> bool:
+        """Apply and commit one batch; returns False when the stop marker was seen"""
+        keep_running = True
+        waiters = []
+        writes = 0
+
+        for item in batch:
+            if item is None:
+                keep_running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                try:
+                    item(conn)
+                    writes += 1
+                except Exception as e:
+                    self.failed_writes += 1
+                    logging.error(f"Context database write failed: {e}")
+
+        try:
+            conn.commit()
+            if writes:
+                self.batches_committed += 1
+                self.writes_committed += writes
+        except Exception as e:
+            logging.error(f"Context database commit failed: {e}")
+            conn.rollback()
+
+        for waiter in waiters:
+            waiter.set()
+        return keep_running
+
+    def get_stats(self) -> dict:
+        """Get writer statistics"""
+        return {
+            'queued_writes': self._queue.qsize(),
+            'batches_committed': self.batches_committed,
+            'writes_committed': self.writes_committed,
+            'failed_writes': self.failed_writes
+        }
+
+    def close(self, timeout: Optional[float] = CONTEXT_FLUSH_TIMEOUT):
+        """Commit pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
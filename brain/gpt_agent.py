@@ -1,20 +1,36 @@
 import logging
 import json
+import asyncio
 import openai
 import google.generativeai as genai
 import requests
-from typing import Dict, Any, List
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Iterator
 from config import (
     OPENAI_API_KEY, GEMINI_API_KEY, OLLAMA_URL, 
-    DEFAULT_LLM_PROVIDER, DEFAULT_MODEL
+    DEFAULT_LLM_PROVIDER, DEFAULT_MODEL,
+    HTTP_POOL_SIZE, LLM_REQUEST_TIMEOUT
 )
 
+# Optional asyncio HTTP client for Ollama
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
 class GPTAgent:
-    def __init__(self, provider: str = DEFAULT_LLM_PROVIDER):
+    def __init__(self, provider: str = DEFAULT_LLM_PROVIDER, ollama_url: str = OLLAMA_URL):
         self.provider = provider
         self.model = DEFAULT_MODEL.get(provider, "gpt-4")
+        self.ollama_url = ollama_url.rstrip("/")
         self.client_available = False
         self.openai_client = None
+        self.async_openai_client = None
+        self.gemini_model = None
+        self.session = self._create_session()
+        self._async_session = None
+        self._async_session_loop = None
         try:
             self.setup_client()
             self.client_available = True
@@ -28,19 +44,29 @@ class GPTAgent:
             if not OPENAI_API_KEY or OPENAI_API_KEY == "test_key_not_real" or OPENAI_API_KEY == "your_openai_key_here":
                 raise ValueError("OpenAI API key not found or is a placeholder. Please set OPENAI_API_KEY in .env file")
             self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+            self.async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
         elif self.provider == "gemini":
             if not GEMINI_API_KEY or GEMINI_API_KEY == "test_key_not_real" or GEMINI_API_KEY == "your_gemini_key_here":
                 raise ValueError("Gemini API key not found or is a placeholder. Please set GEMINI_API_KEY in .env file")
             genai.configure(api_key=GEMINI_API_KEY)
+            self.gemini_model = genai.GenerativeModel(self.model)
         elif self.provider == "ollama":
             # Test connection to Ollama
             try:
-                response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
+                response = self.session.get(f"{self.ollama_url}/api/tags", timeout=5)
                 if response.status_code != 200:
                     raise ValueError("Cannot connect to Ollama server")
             except requests.exceptions.RequestException:
                 raise ValueError("Cannot connect to Ollama server. Make sure it's running.")
     
+    def _create_session(self) -> requests.Session:
+        """Create a keep-alive HTTP session backed by a shared connection pool"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
     def generate_response(self, prompt: str, system_prompt: str = None) -> str:
         """Generate response using the configured LLM provider"""
         if not self.client_available:
@@ -60,6 +86,54 @@ class GPTAgent:
             logging.error(f"Error generating response: {e}")
             return "I apologize, but I encountered an error while processing your request."
     
+    async def agenerate_response(self, prompt: str, system_prompt: str = None) -> str:
+        """Generate response asynchronously so concurrent callers don't block each other"""
+        if not self.client_available:
+            logging.warning("LLM client not available, using fallback response")
+            return "I'm sorry, but I don't have access to AI services right now. Please configure your API keys in the .env file."
+        
+        try:
+            if self.provider == "openai":
+                return await self._openai_agenerate(prompt, system_prompt)
+            elif self.provider == "gemini":
+                return await self._gemini_agenerate(prompt, system_prompt)
+            elif self.provider == "ollama":
+                return await self._ollama_agenerate(prompt, system_prompt)
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+        except Exception as e:
+            logging.error(f"Error generating response: {e}")
+            return "I apologize, but I encountered an error while processing your request."
+    
+    def generate_stream(self, prompt: str, system_prompt: str = None) -> Iterator[str]:
+        """Generate a response incrementally, yielding text chunks as they arrive"""
+        if not self.client_available:
+            logging.warning("LLM client not available, using fallback response")
+            yield "I'm sorry, but I don't have access to AI services right now. Please configure your API keys in the .env file."
+            return
+        
+        if self.provider == "openai":
+            stream = self._openai_stream(prompt, system_prompt)
+        elif self.provider == "gemini":
+            stream = self._gemini_stream(prompt, system_prompt)
+        elif self.provider == "ollama":
+            stream = self._ollama_stream(prompt, system_prompt)
+        else:
+            logging.error(f"Error generating response: Unsupported provider: {self.provider}")
+            yield "I apologize, but I encountered an error while processing your request."
+            return
+        
+        produced_output = False
+        try:
+            for chunk in stream:
+                if chunk:
+                    produced_output = True
+                    yield chunk
+        except Exception as e:
+            logging.error(f"Error streaming response: {e}")
+            if not produced_output:
+                yield "I apologize, but I encountered an error while processing your request."
+    
     def _openai_generate(self, prompt: str, system_prompt: str = None) -> str:
         """Generate response using OpenAI GPT"""
         messages = []
@@ -75,13 +149,58 @@ class GPTAgent:
         )
         return response.choices[0].message.content.strip()
     
+    async def _openai_agenerate(self, prompt: str, system_prompt: str = None) -> str:
+        """Generate response asynchronously using OpenAI GPT"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        response = await self.async_openai_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _openai_stream(self, prompt: str, system_prompt: str = None) -> Iterator[str]:
+        """Stream response chunks from OpenAI GPT"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        stream = self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.7,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def _gemini_generate(self, prompt: str, system_prompt: str = None) -> str:
         """Generate response using Google Gemini"""
-        model = genai.GenerativeModel(self.model)
         full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
-        response = model.generate_content(full_prompt)
+        response = self.gemini_model.generate_content(full_prompt)
         return response.text.strip()
     
+    async def _gemini_agenerate(self, prompt: str, system_prompt: str = None) -> str:
+        """Generate response asynchronously using Google Gemini"""
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        response = await self.gemini_model.generate_content_async(full_prompt)
+        return response.text.strip()
+    
+    def _gemini_stream(self, prompt: str, system_prompt: str = None) -> Iterator[str]:
+        """Stream response chunks from Google Gemini"""
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        for chunk in self.gemini_model.generate_content(full_prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+    
     def _ollama_generate(self, prompt: str, system_prompt: str = None) -> str:
         """Generate response using Ollama"""
         full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
@@ -90,9 +209,67 @@ class GPTAgent:
             "prompt": full_prompt,
             "stream": False
         }
-        response = requests.post(f"{OLLAMA_URL}/api/generate", json=data)
+        response = self.session.post(f"{self.ollama_url}/api/generate", json=data, timeout=LLM_REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()["response"].strip()
+    
+    async def _ollama_agenerate(self, prompt: str, system_prompt: str = None) -> str:
+        """Generate response asynchronously using Ollama"""
+        if not AIOHTTP_AVAILABLE:
+            # Fall back to the pooled blocking session on a worker thread
+            return await asyncio.to_thread(self._ollama_generate, prompt, system_prompt)
+        
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        data = {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": False
+        }
+        session = self._get_async_session()
+        async with session.post(f"{self.ollama_url}/api/generate", json=data) as response:
+            response.raise_for_status()
+            result = await response.json()
+        return result["response"].strip()
+    
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """Get the aiohttp session for the running event loop, creating it if needed"""
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=30)
+            timeout = aiohttp.ClientTimeout(total=LLM_REQUEST_TIMEOUT)
+            self._async_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._async_session_loop = loop
+        return self._async_session
+    
+    def _ollama_stream(self, prompt: str, system_prompt: str = None) -> Iterator[str]:
+        """Stream response chunks from Ollama"""
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        data = {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": True
+        }
+        with self.session.post(f"{self.ollama_url}/api/generate", json=data, stream=True,
+                               timeout=LLM_REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+    
+    async def aclose(self):
+        """Close the asyncio HTTP session"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+    
+    def close(self):
+        """Close pooled HTTP connections"""
+        self.session.close()
 
 # System prompt for Shadow AI Agent
 SYSTEM_PROMPT = """You are Shadow, a personal AI agent for Windows. Your role is to understand user commands and convert them into actionable tasks.
@@ -157,6 +334,10 @@ def process_command(command: str) -> Dict[str, Any]:
         logging.error(f"Error in command processing: {e}")
         return _fallback_command_parsing(command)
 
+def stream_response(prompt: str, system_prompt: str = None) -> Iterator[str]:
+    """Stream a conversational response from the shared agent as text chunks"""
+    return agent.generate_stream(prompt, system_prompt)
+
 def _fallback_command_parsing(command: str) -> Dict[str, Any]:
     """Fallback command parsing for simple commands"""
     command_lower = command.lower()
@@ -0,0 +1,175 @@
+"""
+Plan Cache for Shadow AI
+Persists AI-generated task plans so repeated commands skip the LLM round trip
+"""
+import logging
+import json
+import re
+import sqlite3
+import threading
+import hashlib
+import time
+from typing import Dict, Any, Optional, Iterable
+from pathlib import Path
+
+from config import PLAN_CACHE_TTL_SECONDS, PLAN_CACHE_MAX_ENTRIES, PLAN_CACHE_CONTEXT_KEYS
+
+class PlanCache:
+    """
+    On-disk cache of task plans keyed by whitespace-normalized command and context.
+
+    Entries expire after ``ttl_seconds`` and the least recently used entries
+    are evicted once the cache grows beyond ``max_entries``.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None,
+                 ttl_seconds: int = PLAN_CACHE_TTL_SECONDS,
+                 max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+                 context_keys: Iterable[str] = PLAN_CACHE_CONTEXT_KEYS):
+        self.db_path = Path(db_path) if db_path else Path.home() / ".shadow_ai" / "plan_cache.db"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.context_keys = tuple(context_keys)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.setup_database()
+
+    def setup_database(self):
+        """Create the cache table if needed"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                cache_key TEXT PRIMARY KEY,
+                command TEXT NOT NULL,
+                plan_data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER DEFAULT 0
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_plan_cache_last_used ON plan_cache(last_used)')
+        self.conn.commit()
+
+    @staticmethod
+    def normalize_command(command: str) -> str:
+        """
+        Normalize a command so trivial variations share a cache entry
+
+        Only whitespace is collapsed: case and punctuation can be part of
+        literal text or filenames that the plan carries.
+        """
+        return re.sub(r"\s+", " ", command.strip())
+
+    def make_key(self, command: str, context: Dict[str, Any] = None) -> str:
+        """Build the cache key from the normalized command and relevant context fields"""
+        relevant = {}
+        for key in self.context_keys:
+            if context and key in context:
+                relevant[key] = context[key]
+
+        payload = json.dumps(
+            {"command": self.normalize_command(command), "context": relevant},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, command: str, context: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached plan data for a command, or None on a miss"""
+        cache_key = self.make_key(command, context)
+        now = time.time()
+
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT plan_data, created_at FROM plan_cache WHERE cache_key = ?',
+                (cache_key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            plan_data, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self.conn.execute('DELETE FROM plan_cache WHERE cache_key = ?', (cache_key,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+
+            self.conn.execute('''
+                UPDATE plan_cache SET last_used = ?, hit_count = hit_count + 1
+                WHERE cache_key = ?
+            ''', (now, cache_key))
+            self.conn.commit()
+            self.hits += 1
+
+        try:
+            return json.loads(plan_data)
+        except json.JSONDecodeError:
+            logging.warning("Discarding corrupt plan cache entry")
+            self.invalidate(command, context)
+            return None
+
+    def put(self, command: str, plan_data: Dict[str, Any], context: Dict[str, Any] = None):
+        """Store plan data for a command"""
+        cache_key = self.make_key(command, context)
+        now = time.time()
+
+        with self._lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO plan_cache
+                (cache_key, command, plan_data, created_at, last_used, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (cache_key, command, json.dumps(plan_data), now, now))
+            self._evict(now)
+            self.conn.commit()
+
+    def invalidate(self, command: str, context: Dict[str, Any] = None):
+        """Remove a single cached plan"""
+        with self._lock:
+            self.conn.execute('DELETE FROM plan_cache WHERE cache_key = ?',
+                              (self.make_key(command, context),))
+            self.conn.commit()
+
+    def clear(self):
+        """Remove all cached plans"""
+        with self._lock:
+            self.conn.execute('DELETE FROM plan_cache')
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries and trim to max_entries by least recent use"""
+        if self.ttl_seconds:
+            self.conn.execute('DELETE FROM plan_cache WHERE created_at < ?',
+                              (now - self.ttl_seconds,))
+
+        if self.max_entries:
+            self.conn.execute('''
+                DELETE FROM plan_cache WHERE cache_key IN (
+                    SELECT cache_key FROM plan_cache
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM plan_cache').fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries
+        }
+
+    def close(self):
+        """Close database connection"""
+        if hasattr(self, 'conn'):
+            self.conn.close()
@@ -0,0 +1,149 @@
+"""
+Similarity Index for Shadow AI
+Incremental TF-IDF index over task history with vectorized cosine top-k lookups
+"""
+import math
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import TASK_INDEX_DIM
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def hashed_features(text: str, dim: int = TASK_INDEX_DIM) -> Dict[int, float]:
+    """
+    Hash the words and word bigrams of a text into a sparse term-frequency vector
+
+    Returns:
+        Mapping of feature index -> signed log term frequency
+    """
+    words = TOKEN_PATTERN.findall(text.lower())
+    counts = {}
+    for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = zlib.crc32(term.encode("utf-8"))
+        index = h % dim
+        # The sign bit keeps colliding terms from always adding up
+        sign = 1.0 if (h >> 31) & 1 == 0 else -1.0
+        counts[index] = counts.get(index, 0.0) + sign
+
+    return {index: math.copysign(math.log1p(abs(count)), count)
+            for index, count in counts.items() if count}
+
+class _GrowableArray:
+    """1-D NumPy buffer with amortized O(1) appends"""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[:self.size]
+
+class TaskSimilarityIndex:
+    """
+    Sparse TF-IDF vectors for task commands, stored as flat NumPy arrays.
+
+    Each document's non-zero features are appended as (row, feature, tf)
+    triples. Document frequencies are updated on every add, so IDF weights and
+    document norms always reflect the whole history; a query scores every
+    document with a couple of vectorized passes over the non-zeros.
+    """
+
+    def __init__(self, dim: int = TASK_INDEX_DIM):
+        self.dim = dim
+        self.documents: List[Dict[str, Any]] = []
+        self._ids = set()
+        self._rows = _GrowableArray(np.int32)
+        self._features = _GrowableArray(np.int32)
+        self._tf = _GrowableArray(np.float32)
+        self._df = np.zeros(dim, dtype=np.float32)
+        # TF-IDF weights and norms, recomputed lazily after adds change the IDF
+        self._weights: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._ids
+
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any] = None) -> bool:
+        """Add a document; returns False if it is already indexed"""
+        features = hashed_features(text, self.dim)
+        with self._lock:
+            if doc_id in self._ids:
+                return False
+            row = len(self.documents)
+            self.documents.append({'id': doc_id, 'text': text, **(metadata or {})})
+            self._ids.add(doc_id)
+
+            if features:
+                indexes = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+                self._rows.extend(np.full(len(features), row, dtype=np.int32))
+                self._features.extend(indexes)
+                self._tf.extend(np.fromiter(features.values(), dtype=np.float32, count=len(features)))
+                self._df[indexes] += 1
+            self._weights = None
+            self._norms = None
+            return True
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1 + len(self.documents)) / (1 + self._df)) + 1
+
+    def search(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Find the documents most similar to a text
+
+        Returns:
+            List of (document, cosine similarity) pairs, best first
+        """
+        features = hashed_features(text, self.dim)
+        if not features:
+            return []
+
+        with self._lock:
+            n_docs = len(self.documents)
+            if n_docs == 0:
+                return []
+
+            idf = self._idf()
+            rows, cols = self._rows.view, self._features.view
+            if self._weights is None:
+                self._weights = self._tf.view * idf[cols]
+                self._norms = np.sqrt(np.bincount(rows, weights=self._weights ** 2, minlength=n_docs))
+            weights = self._weights
+
+            query = np.zeros(self.dim, dtype=np.float32)
+            indexes = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+            query[indexes] = np.fromiter(features.values(), dtype=np.float32, count=len(features)) * idf[indexes]
+            query_norm = np.linalg.norm(query[indexes])
+            if query_norm == 0:
+                return []
+
+            # Only non-zeros that hit a query feature contribute to the dot products
+            hits = query[cols] != 0
+            dots = np.bincount(rows[hits], weights=weights[hits] * query[cols[hits]], minlength=n_docs)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = np.where(self._norms > 0, dots / (self._norms * query_norm), 0.0)
+
+            k = min(limit, n_docs)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [(self.documents[i], float(scores[i])) for i in top if scores[i] > min_score]
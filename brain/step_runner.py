@@ -0,0 +1,196 @@
+"""
+Step Runner for Shadow AI
+Worker pool that enforces per-step timeouts and recovers from stuck handlers
+"""
+import logging
+import ctypes
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+class StepTimeoutError(TimeoutError):
+    """Raised when a step handler exceeds its timeout"""
+
+class StepCancelledError(Exception):
+    """Injected into a worker thread to interrupt a stuck step handler"""
+
+class _Job:
+    """A unit of work queued for the worker pool"""
+
+    def __init__(self, func: Callable, args: Tuple, kwargs: Dict[str, Any]):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.worker: Optional["_Worker"] = None
+
+class _Worker(threading.Thread):
+    """Daemon worker thread; abandoned workers exit after their current job"""
+
+    def __init__(self, runner: "StepRunner", index: int):
+        super().__init__(name=f"shadow-step-worker-{index}", daemon=True)
+        self.runner = runner
+        self.abandoned = False
+        self.job: Optional[_Job] = None
+        self.interrupted = False
+        self._job_lock = threading.Lock()
+
+    def run(self):
+        while not self.abandoned:
+            try:
+                if not self._run_next():
+                    break
+            except StepCancelledError:
+                # A late interrupt arrived after the job had already finished
+                continue
+
+    def _run_next(self) -> bool:
+        """Run the next queued job; returns False when asked to stop"""
+        job = self.runner._jobs.get()
+        if job is None:
+            return False
+        if not job.future.set_running_or_notify_cancel():
+            return True
+
+        with self._job_lock:
+            self.job = job
+            job.worker = self
+        try:
+            try:
+                result = job.func(*job.args, **job.kwargs)
+            finally:
+                self._finish_job(job)
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        return True
+
+    def _finish_job(self, job: _Job):
+        with self._job_lock:
+            self.job = None
+            job.worker = None
+            if self.interrupted:
+                # Drop an interrupt that was raised but not yet delivered
+                self.interrupted = False
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.ident), None)
+
+    def interrupt(self, job: _Job) -> bool:
+        """Raise StepCancelledError in this thread if it is still running ``job``"""
+        with self._job_lock:
+            if self.job is not job or self.ident is None:
+                return False
+            self.interrupted = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(self.ident), ctypes.py_object(StepCancelledError)
+            )
+            return True
+
+class StepRunner:
+    """
+    Runs step handlers on a bounded pool of worker threads with real timeouts.
+
+    When a handler overruns its timeout, a StepCancelledError is injected into
+    its thread. If the handler still does not return within the grace period
+    (e.g. it is blocked inside a C call), the worker is abandoned and replaced
+    so the pool stays responsive for the next task.
+    """
+
+    def __init__(self, max_workers: int = 4, cancel_grace_seconds: float = 1.0):
+        self.max_workers = max_workers
+        self.cancel_grace_seconds = cancel_grace_seconds
+        self.abandoned_workers = 0
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._worker_count = 0
+        self._shutdown = False
+        for _ in range(max_workers):
+            self._spawn_worker()
+
+    def _spawn_worker(self):
+        """Start a new worker thread"""
+        with self._lock:
+            self._worker_count += 1
+            worker = _Worker(self, self._worker_count)
+            self._workers.append(worker)
+        worker.start()
+
+    def submit(self, func: Callable, *args, **kwargs) -> _Job:
+        """Queue a handler call and return its job"""
+        if self._shutdown:
+            raise RuntimeError("StepRunner has been shut down")
+        job = _Job(func, args, kwargs)
+        self._jobs.put(job)
+        return job
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Tuple[Any, float]:
+        """
+        Run a handler with a timeout
+
+        Returns:
+            Tuple of (handler result, wall time in seconds)
+
+        Raises:
+            StepTimeoutError: if the handler did not finish within ``timeout``
+        """
+        start_time = time.time()
+        job = self.submit(func, *args, **kwargs)
+        try:
+            result = job.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # FutureTimeoutError is the builtin TimeoutError, which a handler
+            # may raise itself; only an unfinished job has timed out
+            if job.future.done():
+                result = job.future.result()
+            else:
+                self.cancel(job)
+                raise StepTimeoutError(f"Step timed out after {timeout} seconds")
+        return result, time.time() - start_time
+
+    def cancel(self, job: _Job) -> bool:
+        """Cancel a job; interrupt or abandon its worker if it is already running"""
+        if job.future.cancel():
+            return True
+
+        worker = job.worker
+        if worker is None or job.future.done():
+            return job.future.done()
+
+        logging.warning(f"Interrupting stuck step handler on {worker.name}")
+        worker.interrupt(job)
+        try:
+            job.future.exception(timeout=self.cancel_grace_seconds)
+            return True
+        except FutureTimeoutError:
+            pass
+
+        # The handler ignored the interrupt; leave it behind and restore capacity
+        logging.error(f"Abandoning unresponsive worker {worker.name}")
+        worker.abandoned = True
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.abandoned_workers += 1
+        self._spawn_worker()
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'live_workers': sum(1 for w in self._workers if w.is_alive()),
+                'queued_jobs': self._jobs.qsize(),
+                'abandoned_workers': self.abandoned_workers
+            }
+
+    def shutdown(self):
+        """Stop all workers after their current jobs"""
+        self._shutdown = True
+        with self._lock:
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
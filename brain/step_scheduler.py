@@ -0,0 +1,113 @@
+"""
+Step Scheduler for Shadow AI
+Builds a dependency graph over task steps so independent steps can run concurrently
+"""
+import logging
+import re
+from typing import Any, Dict, List, Set
+
+from brain.universal_processor import TaskStep
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Context keys each action publishes through "context_updates"
+ACTION_OUTPUTS = {
+    "generate_article_content": {"generated_content"},
+    "generate_letter_content": {"generated_content"},
+    "create_content": {"generated_content"},
+}
+
+# Actions that never touch the foreground UI and may overlap with other steps.
+# Anything not listed here is treated as a foreground step and serialized.
+# Steps that write files (create_document, save_file) stay serialized: later
+# steps use those files by path, which no placeholder or output key records.
+BACKGROUND_ACTIONS = {
+    "generate_article_content",
+    "generate_letter_content",
+    "create_content",
+    "analyze_command",
+}
+
+def _collect_placeholders(value: Any, found: Set[str]):
+    """Collect {{placeholder}} names from nested parameter values"""
+    if isinstance(value, str):
+        found.update(PLACEHOLDER_PATTERN.findall(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_placeholders(item, found)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_placeholders(item, found)
+
+def step_inputs(step: TaskStep) -> Set[str]:
+    """Context keys a step reads through {{placeholder}} parameters"""
+    found = set()
+    _collect_placeholders(step.parameters, found)
+    return found
+
+def step_outputs(step: TaskStep) -> Set[str]:
+    """Context keys a step publishes"""
+    if step.produces is not None:
+        return set(step.produces)
+    return set(ACTION_OUTPUTS.get(step.action, set()))
+
+def is_foreground_step(step: TaskStep) -> bool:
+    """Check whether a step drives the foreground UI (keyboard, mouse, windows)"""
+    return step.action not in BACKGROUND_ACTIONS
+
+def build_dependency_graph(steps: List[TaskStep]) -> Dict[int, Set[int]]:
+    """
+    Build the dependency graph for a list of steps
+
+    Returns:
+        Mapping of step index -> set of step indexes it must wait for
+    """
+    index_by_number = {step.step_number: i for i, step in enumerate(steps)}
+    graph = {i: set() for i in range(len(steps))}
+    last_producer = {}
+    last_foreground = None
+
+    for i, step in enumerate(steps):
+        # Explicitly declared dependencies
+        for number in step.depends_on or []:
+            if number in index_by_number and index_by_number[number] != i:
+                graph[i].add(index_by_number[number])
+            else:
+                logging.warning(f"Step {step.step_number} depends on unknown step {number}")
+
+        # Data dependencies inferred from placeholders
+        for key in step_inputs(step):
+            if key in last_producer:
+                graph[i].add(last_producer[key])
+
+        # Foreground steps keep their original relative order
+        if is_foreground_step(step):
+            if last_foreground is not None:
+                graph[i].add(last_foreground)
+            last_foreground = i
+
+        for key in step_outputs(step):
+            last_producer[key] = i
+
+    if _has_cycle(graph):
+        logging.warning("Step dependencies contain a cycle, falling back to sequential execution")
+        return {i: ({i - 1} if i > 0 else set()) for i in range(len(steps))}
+
+    return graph
+
+def _has_cycle(graph: Dict[int, Set[int]]) -> bool:
+    """Detect cycles with Kahn's algorithm"""
+    remaining = {node: set(deps) for node, deps in graph.items()}
+    ready = [node for node, deps in remaining.items() if not deps]
+    visited = 0
+
+    while ready:
+        node = ready.pop()
+        visited += 1
+        for other, deps in remaining.items():
+            if node in deps:
+                deps.discard(node)
+                if not deps:
+                    ready.append(other)
+
+    return visited != len(graph)
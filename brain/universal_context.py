@@ -2,16 +2,130 @@
 Universal Context Manager for Shadow AI
 Manages context, memory, and learning for the universal assistant
 """
+import atexit
 import logging
 import json
-import sqlite3
+import threading
 import time
 from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from pathlib import Path
 import os
 
+from brain.context_store import connect, apply_migrations, BackgroundWriter
+from config import TASK_SIMILARITY_THRESHOLD
+
+# Optional imports with fallbacks
+try:
+    from brain.similarity_index import TaskSimilarityIndex
+    SIMILARITY_INDEX_AVAILABLE = True
+except ImportError:
+    SIMILARITY_INDEX_AVAILABLE = False
+
+# Schema migrations, applied in order; a migration's version is its position + 1
+MIGRATIONS = [
+    # 1: base schema
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            preference_key TEXT NOT NULL,
+            preference_value TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            last_updated TIMESTAMP NOT NULL,
+            UNIQUE(category, preference_key)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS task_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT UNIQUE NOT NULL,
+            user_command TEXT NOT NULL,
+            task_category TEXT NOT NULL,
+            execution_time REAL NOT NULL,
+            success BOOLEAN NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            context_data TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS conversation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            user_query TEXT NOT NULL,
+            response_summary TEXT,
+            timestamp TIMESTAMP NOT NULL,
+            success BOOLEAN NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS learning_patterns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pattern_type TEXT NOT NULL,
+            pattern_data TEXT NOT NULL,
+            frequency INTEGER DEFAULT 1,
+            last_seen TIMESTAMP NOT NULL,
+            confidence REAL NOT NULL
+        )
+        ''',
+    ],
+    # 2: indexes for the history and pattern lookups
+    [
+        'CREATE INDEX IF NOT EXISTS idx_task_history_timestamp ON task_history(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_task_history_category ON task_history(task_category)',
+        'CREATE INDEX IF NOT EXISTS idx_conversation_session ON conversation_history(session_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_conversation_timestamp ON conversation_history(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_learning_patterns_type ON learning_patterns(pattern_type, last_seen)',
+    ],
+    # 3: learning_patterns becomes a counter table keyed by (pattern_type, pattern_key).
+    # Legacy rows carried no key; temporal ones can be recovered from their JSON,
+    # word counts could never be matched and are dropped.
+    [
+        'ALTER TABLE learning_patterns RENAME TO learning_patterns_legacy',
+        '''
+        CREATE TABLE learning_patterns (
+            pattern_type TEXT NOT NULL,
+            pattern_key TEXT NOT NULL,
+            pattern_data TEXT,
+            frequency INTEGER NOT NULL DEFAULT 1,
+            last_seen TIMESTAMP NOT NULL,
+            confidence REAL NOT NULL DEFAULT 0.5,
+            PRIMARY KEY (pattern_type, pattern_key)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO learning_patterns (pattern_type, pattern_key, pattern_data, frequency, last_seen, confidence)
+        SELECT pattern_type, 'time_pattern_' || json_extract(pattern_data, '$.time_of_day'),
+               MAX(pattern_data), SUM(frequency), MAX(last_seen), MAX(confidence)
+        FROM learning_patterns_legacy
+        WHERE pattern_type = 'temporal' AND json_valid(pattern_data)
+              AND json_extract(pattern_data, '$.time_of_day') IS NOT NULL
+        GROUP BY json_extract(pattern_data, '$.time_of_day')
+        ''',
+        'DROP TABLE learning_patterns_legacy',
+        'CREATE INDEX idx_learning_patterns_frequency ON learning_patterns(pattern_type, frequency DESC)',
+    ],
+]
+
+PATTERN_UPSERT_SQL = '''
+    INSERT INTO learning_patterns (pattern_type, pattern_key, pattern_data, frequency, last_seen)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(pattern_type, pattern_key) DO UPDATE SET
+        frequency = frequency + excluded.frequency,
+        last_seen = excluded.last_seen,
+        pattern_data = COALESCE(excluded.pattern_data, pattern_data)
+'''
+
+def _isoformat(timestamp: Any) -> Any:
+    """ISO 8601 form of a stored timestamp (sqlite returns them with a space separator)"""
+    try:
+        return datetime.fromisoformat(timestamp).isoformat()
+    except (TypeError, ValueError):
+        return timestamp
+
 @dataclass
 class UserPreference:
     """User preference data"""
@@ -49,67 +163,38 @@ class UniversalContextManager:
     Manages context, memory, and learning for Shadow AI
     """
     
-    def __init__(self):
-        self.setup_database()
+    def __init__(self, db_path: Optional[Path] = None):
+        self.setup_database(db_path)
         self.current_session = self._create_new_session()
         self.memory_cache = {}
         self.active_contexts = {}
         self.user_patterns = {}
         
-    def setup_database(self):
+    def setup_database(self, db_path: Optional[Path] = None):
         """Setup SQLite database for persistent memory"""
-        self.db_path = Path.home() / ".shadow_ai" / "memory.db"
-        self.db_path.parent.mkdir(exist_ok=True)
-        
-        self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,
-                preference_key TEXT NOT NULL,
-                preference_value TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                last_updated TIMESTAMP NOT NULL,
-                UNIQUE(category, preference_key)
-            )
-        ''')
-        
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS task_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id TEXT UNIQUE NOT NULL,
-                user_command TEXT NOT NULL,
-                task_category TEXT NOT NULL,
-                execution_time REAL NOT NULL,
-                success BOOLEAN NOT NULL,
-                timestamp TIMESTAMP NOT NULL,
-                context_data TEXT
-            )
-        ''')
-        
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS conversation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                user_query TEXT NOT NULL,
-                response_summary TEXT,
-                timestamp TIMESTAMP NOT NULL,
-                success BOOLEAN NOT NULL
-            )
-        ''')
-        
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS learning_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT NOT NULL,
-                pattern_data TEXT NOT NULL,
-                frequency INTEGER DEFAULT 1,
-                last_seen TIMESTAMP NOT NULL,
-                confidence REAL NOT NULL
-            )
-        ''')
-        
-        self.conn.commit()
+        self.db_path = Path(db_path) if db_path else Path.home() / ".shadow_ai" / "memory.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Reads use this connection; all writes go through the background writer
+        self.conn = connect(self.db_path)
+        self._read_lock = threading.Lock()
+        self.schema_version = apply_migrations(self.conn, MIGRATIONS)
+        self.writer = BackgroundWriter(self.db_path)
+        self.similarity_index = None
+        self._index_lock = threading.Lock()
+
+    def _query(self, sql: str, params: Tuple = (), consistent: bool = False) -> List[Tuple]:
+        """
+        Run a read query
+
+        Args:
+            consistent: Wait until queued writes are committed first, for reads
+                that must see them; other reads may lag the writer slightly
+        """
+        if consistent:
+            self.writer.flush()
+        with self._read_lock:
+            return self.conn.execute(sql, params).fetchall()
 
     def _create_new_session(self) -> ConversationContext:
         """Create a new conversation session"""
@@ -129,12 +214,11 @@ class UniversalContextManager:
         self.current_session.user_queries.append(query)
         
         # Store in database
-        self.conn.execute('''
+        self.writer.execute('''
             INSERT INTO conversation_history 
             (session_id, user_query, timestamp, success)
             VALUES (?, ?, ?, ?)
         ''', (self.current_session.session_id, query, datetime.now(), response_success))
-        self.conn.commit()
         
         # Update patterns
         self._update_user_patterns(query)
@@ -166,22 +250,20 @@ class UniversalContextManager:
 
     def learn_user_preference(self, category: str, key: str, value: str, confidence: float = 0.8):
         """Learn and store user preference"""
-        self.conn.execute('''
+        self.writer.execute('''
             INSERT OR REPLACE INTO user_preferences 
             (category, preference_key, preference_value, confidence, last_updated)
             VALUES (?, ?, ?, ?, ?)
         ''', (category, key, value, confidence, datetime.now()))
-        self.conn.commit()
 
     def get_user_preference(self, category: str, key: str) -> Optional[str]:
         """Get user preference"""
-        cursor = self.conn.execute('''
+        rows = self._query('''
             SELECT preference_value FROM user_preferences 
             WHERE category = ? AND preference_key = ?
-        ''', (category, key))
+        ''', (category, key), consistent=True)
         
-        result = cursor.fetchone()
-        return result[0] if result else None
+        return rows[0][0] if rows else None
 
     def get_task_context(self, user_command: str) -> TaskContext:
         """Generate comprehensive task context"""
@@ -199,27 +281,62 @@ class UniversalContextManager:
     def store_task_result(self, task_id: str, user_command: str, category: str, 
                          execution_time: float, success: bool, context_data: Dict[str, Any]):
         """Store task execution result for learning"""
-        self.conn.execute('''
+        now = datetime.now()
+        self.writer.execute('''
             INSERT INTO task_history 
             (task_id, user_command, task_category, execution_time, success, timestamp, context_data)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (task_id, user_command, category, execution_time, success, datetime.now(), 
+        ''', (task_id, user_command, category, execution_time, success, now, 
               json.dumps(context_data)))
-        self.conn.commit()
+        
+        if self.similarity_index is not None:
+            self.similarity_index.add(task_id, user_command, {
+                'category': category, 'success': success, 'timestamp': now.isoformat()
+            })
+
+    def _get_similarity_index(self) -> "TaskSimilarityIndex":
+        """Build the task similarity index from the full history on first use"""
+        with self._index_lock:
+            if self.similarity_index is None:
+                index = TaskSimilarityIndex()
+                # Tasks stored before the index exists are only added from here
+                rows = self._query('''
+                    SELECT task_id, user_command, task_category, success, timestamp
+                    FROM task_history ORDER BY id
+                ''', consistent=True)
+                for task_id, command, category, success, timestamp in rows:
+                    index.add(task_id, command, {
+                        'category': category, 'success': success, 'timestamp': _isoformat(timestamp)
+                    })
+                logging.info(f"Built task similarity index over {len(index)} tasks")
+                self.similarity_index = index
+            return self.similarity_index
 
     def get_similar_tasks(self, current_command: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get similar tasks from history"""
+        if SIMILARITY_INDEX_AVAILABLE:
+            matches = self._get_similarity_index().search(current_command, limit, TASK_SIMILARITY_THRESHOLD)
+            return [
+                {
+                    'task_id': doc['id'],
+                    'command': doc['text'],
+                    'category': doc['category'],
+                    'success': doc['success'],
+                    'timestamp': doc['timestamp'],
+                    'similarity': score
+                }
+                for doc, score in matches
+            ]
+        
         # Simple similarity based on keyword matching
         words = set(current_command.lower().split())
         
-        cursor = self.conn.execute('''
+        tasks = self._query('''
             SELECT task_id, user_command, task_category, success, timestamp 
             FROM task_history 
             ORDER BY timestamp DESC 
             LIMIT 50
         ''')
-        
-        tasks = cursor.fetchall()
         similar_tasks = []
         
         for task in tasks:
@@ -242,7 +359,7 @@ class UniversalContextManager:
 
     def get_user_statistics(self) -> Dict[str, Any]:
         """Get user usage statistics"""
-        cursor = self.conn.execute('''
+        stats = self._query('''
             SELECT 
                 COUNT(*) as total_tasks,
                 COUNT(CASE WHEN success = 1 THEN 1 END) as successful_tasks,
@@ -251,15 +368,10 @@ class UniversalContextManager:
                 COUNT(*) as category_count
             FROM task_history 
             GROUP BY task_category
-        ''')
+        ''', consistent=True)
         
-        stats = cursor.fetchall()
-        
-        total_cursor = self.conn.execute('SELECT COUNT(*) FROM task_history')
-        total_tasks = total_cursor.fetchone()[0]
-        
-        success_cursor = self.conn.execute('SELECT COUNT(*) FROM task_history WHERE success = 1')
-        successful_tasks = success_cursor.fetchone()[0]
+        total_tasks = self._query('SELECT COUNT(*) FROM task_history')[0][0]
+        successful_tasks = self._query('SELECT COUNT(*) FROM task_history WHERE success = 1')[0][0]
         
         return {
             'total_tasks': total_tasks,
@@ -297,15 +409,9 @@ class UniversalContextManager:
     def _get_active_applications(self) -> List[str]:
         """Get list of currently active applications"""
         try:
-            import psutil
-            active_apps = []
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    if proc.info['name'] and proc.info['name'].endswith('.exe'):
-                        active_apps.append(proc.info['name'])
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            return list(set(active_apps))  # Remove duplicates
+            from control.process_table import process_table
+            # Served from the shared table, which only inspects new PIDs
+            return [name for name in process_table.names() if name.endswith('.exe')]
         except ImportError:
             return ["psutil_not_available"]
 
@@ -379,51 +485,67 @@ class UniversalContextManager:
         # Extract patterns from query
         words = query.lower().split()
         time_context = self._get_time_context()
+        time_of_day = time_context['time_of_day']
         
         # Time-based patterns
         pattern_data = {
             'words': words,
             'hour': time_context['hour'],
-            'time_of_day': time_context['time_of_day'],
+            'time_of_day': time_of_day,
             'is_weekend': time_context['is_weekend']
         }
+        patterns = [('temporal', f"time_pattern_{time_of_day}", pattern_data, 1)]
         
-        pattern_key = f"time_pattern_{time_context['time_of_day']}"
-        self._store_pattern('temporal', pattern_key, pattern_data)
+        # Word frequency patterns, overall and per time of day
+        word_counts = Counter(word for word in words if len(word) > 2)  # Skip short words
+        for word, count in word_counts.items():
+            patterns.append(('word_frequency', word, None, count))
+            patterns.append(('word_by_time', f"{time_of_day}:{word}", None, count))
         
-        # Word frequency patterns
-        for word in words:
-            if len(word) > 2:  # Skip short words
-                self._store_pattern('word_frequency', word, {'count': 1})
+        self._store_patterns(patterns)
 
     def _store_pattern(self, pattern_type: str, pattern_key: str, pattern_data: Dict[str, Any]):
         """Store a learned pattern"""
-        pattern_json = json.dumps(pattern_data)
-        
-        # Check if pattern exists
-        cursor = self.conn.execute('''
-            SELECT frequency FROM learning_patterns 
-            WHERE pattern_type = ? AND pattern_data LIKE ?
-        ''', (pattern_type, f'%{pattern_key}%'))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            # Update frequency
-            self.conn.execute('''
-                UPDATE learning_patterns 
-                SET frequency = frequency + 1, last_seen = ?
-                WHERE pattern_type = ? AND pattern_data LIKE ?
-            ''', (datetime.now(), pattern_type, f'%{pattern_key}%'))
+        self._store_patterns([(pattern_type, pattern_key, pattern_data, 1)])
+
+    def _store_patterns(self, patterns: List[Tuple[str, str, Optional[Dict[str, Any]], int]]):
+        """Increment a batch of (pattern_type, pattern_key, pattern_data, count) counters"""
+        now = datetime.now()
+        rows = [
+            (pattern_type, pattern_key, json.dumps(data) if data is not None else None, count, now)
+            for pattern_type, pattern_key, data, count in patterns
+        ]
+        self.writer.submit(lambda conn: conn.executemany(PATTERN_UPSERT_SQL, rows))
+
+    def get_top_patterns(self, pattern_type: str, limit: int = 10,
+                         key_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the most frequent patterns of a type, optionally restricted to a key prefix"""
+        if key_prefix:
+            # Range scan on the primary key instead of LIKE
+            rows = self._query('''
+                SELECT pattern_key, frequency, last_seen FROM learning_patterns
+                WHERE pattern_type = ? AND pattern_key >= ? AND pattern_key < ?
+                ORDER BY frequency DESC LIMIT ?
+            ''', (pattern_type, key_prefix, key_prefix + '\uffff', limit))
         else:
-            # Insert new pattern
-            self.conn.execute('''
-                INSERT INTO learning_patterns 
-                (pattern_type, pattern_data, frequency, last_seen, confidence)
-                VALUES (?, ?, 1, ?, 0.5)
-            ''', (pattern_type, pattern_json, datetime.now()))
-        
-        self.conn.commit()
+            rows = self._query('''
+                SELECT pattern_key, frequency, last_seen FROM learning_patterns
+                WHERE pattern_type = ?
+                ORDER BY frequency DESC LIMIT ?
+            ''', (pattern_type, limit))
+        
+        return [
+            {'key': row[0][len(key_prefix):] if key_prefix else row[0], 'frequency': row[1], 'last_seen': row[2]}
+            for row in rows
+        ]
+
+    def get_pattern_frequency(self, pattern_type: str, pattern_key: str) -> int:
+        """Get how often a pattern has been seen"""
+        rows = self._query('''
+            SELECT frequency FROM learning_patterns
+            WHERE pattern_type = ? AND pattern_key = ?
+        ''', (pattern_type, pattern_key))
+        return rows[0][0] if rows else 0
 
     def _update_current_focus(self, task_summary: str):
         """Update current user focus based on completed tasks"""
@@ -458,6 +580,11 @@ class UniversalContextManager:
             suggestions.append("Organize personal files")
             suggestions.append("Back up important documents")
         
+        # What the user usually asks about at this time of day
+        frequent = self.get_top_patterns('word_by_time', 3, key_prefix=f"{time_context['time_of_day']}:")
+        if frequent:
+            suggestions.append(f"You often ask about: {', '.join(p['key'] for p in frequent)}")
+        
         return suggestions
 
     def _get_preference_based_suggestions(self, query: str) -> List[str]:
@@ -470,32 +597,42 @@ class UniversalContextManager:
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         
         # Clean old conversation history
-        self.conn.execute('''
+        self.writer.execute('''
             DELETE FROM conversation_history 
             WHERE timestamp < ?
         ''', (cutoff_date,))
         
         # Clean old task history (keep successful tasks longer)
-        self.conn.execute('''
+        self.writer.execute('''
             DELETE FROM task_history 
             WHERE timestamp < ? AND success = 0
         ''', (cutoff_date,))
         
         # Clean old patterns with low frequency
-        self.conn.execute('''
+        self.writer.execute('''
             DELETE FROM learning_patterns 
             WHERE last_seen < ? AND frequency < 3
         ''', (cutoff_date,))
         
-        self.conn.commit()
+        # Rebuild the similarity index from what is left on next use
+        self.writer.flush()
+        with self._index_lock:
+            self.similarity_index = None
+
+    def flush(self) -> bool:
+        """Wait until all queued writes have been committed"""
+        return self.writer.flush()
 
     def close(self):
-        """Close database connection"""
+        """Commit pending writes and close database connections"""
+        if hasattr(self, 'writer'):
+            self.writer.close()
         if hasattr(self, 'conn'):
             self.conn.close()
 
 # Global instance
 context_manager = UniversalContextManager()
+atexit.register(context_manager.close)
 
 def get_task_context(user_command: str) -> TaskContext:
     """Get task context for a user command"""
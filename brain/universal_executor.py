@@ -7,6 +7,7 @@ import time
 import json
 import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime
@@ -16,14 +17,18 @@ import subprocess
 import webbrowser
 from pathlib import Path
 
-from brain.universal_processor import UniversalTask, TaskStep, TaskComplexity
+from brain.universal_processor import UniversalTask, TaskStep, TaskComplexity, universal_processor
+from brain.step_runner import StepRunner
+from brain.step_scheduler import build_dependency_graph
 from control.desktop import desktop_controller
+from control.readiness import get_foreground_window, wait_for_foreground_change
 from control.browser import get_browser_controller, close_browser
 from control.documents import document_controller
 from control.advanced_vision import AdvancedVision
 from control.intelligent_browser import IntelligentBrowser
 from input.voice_input import speak_response
 from utils.confirm import confirm_action, confirm_sensitive_action
+from config import EXECUTOR_MAX_WORKERS, STEP_CANCEL_GRACE_SECONDS
 
 @dataclass
 class ExecutionResult:
@@ -33,6 +38,21 @@ class ExecutionResult:
     error_message: Optional[str] = None
     execution_time: float = 0.0
     warnings: List[str] = None
+    step_timings: Dict[int, float] = None  # step_number -> wall time in seconds
+    timed_out_steps: List[int] = None
+
+    def __post_init__(self):
+        if self.step_timings is None:
+            self.step_timings = {
+                result["step_number"]: result["wall_time"]
+                for result in self.step_results
+                if "step_number" in result and "wall_time" in result
+            }
+        if self.timed_out_steps is None:
+            self.timed_out_steps = [
+                result["step_number"] for result in self.step_results
+                if result.get("timed_out")
+            ]
 
 class UniversalExecutor:
     """
@@ -41,6 +61,8 @@ class UniversalExecutor:
     
     def __init__(self):
         self.setup_components()
+        self.step_runner = StepRunner(max_workers=EXECUTOR_MAX_WORKERS,
+                                      cancel_grace_seconds=STEP_CANCEL_GRACE_SECONDS)
         self.execution_history = []
         self.active_processes = {}
         self.context_cache = {}
@@ -156,65 +178,64 @@ class UniversalExecutor:
                         execution_time=time.time() - start_time
                     )
             
-            # Execute each step
-            for i, step in enumerate(task.steps):
-                logging.info(f"Executing step {step.step_number}: {step.action}")
-                
-                try:
-                    step_result = self._execute_step(step, context)
-                    step_results.append(step_result)
-                    
-                    if not step_result.get("success", False):
-                        error_msg = step_result.get("error", "Unknown error")
-                        logging.error(f"Step {step.step_number} failed: {error_msg}")
-                        
-                        # Handle error based on step configuration
-                        if step.error_handling == "abort":
-                            return ExecutionResult(
-                                success=False,
-                                step_results=step_results,
-                                error_message=f"Step {step.step_number} failed: {error_msg}",
-                                execution_time=time.time() - start_time,
-                                warnings=warnings
-                            )
-                        elif step.error_handling == "retry":
-                            # Retry the step once
-                            logging.info(f"Retrying step {step.step_number}")
-                            step_result = self._execute_step(step, context)
-                            step_results[-1] = step_result
-                        else:
-                            # Continue with warning
-                            warnings.append(f"Step {step.step_number} failed but continuing: {error_msg}")
+            if context is None:
+                context = {}
+            
+            # Execute steps as their dependencies complete
+            graph = build_dependency_graph(task.steps)
+            pending = set(range(len(task.steps)))
+            completed = set()
+            running = {}
+            results_by_index = {}
+            abort_message = None
+            
+            with ThreadPoolExecutor(max_workers=EXECUTOR_MAX_WORKERS,
+                                    thread_name_prefix="shadow-scheduler") as pool:
+                while pending or running:
+                    if abort_message is None:
+                        ready = [i for i in sorted(pending) if graph[i] <= completed]
+                        for i in ready:
+                            pending.discard(i)
+                            # Each step sees a snapshot that already holds its dependencies' outputs
+                            future = pool.submit(self._run_scheduled_step, task.steps[i], dict(context))
+                            running[future] = i
                     
-                    # Update context with step results
-                    if context is None:
-                        context = {}
-                    context.update(step_result.get("context_updates", {}))
+                    if not running:
+                        break
                     
-                    # Brief pause between steps
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    error_msg = f"Exception in step {step.step_number}: {str(e)}"
-                    logging.error(error_msg)
-                    logging.error(traceback.format_exc())
-                    
-                    step_results.append({
-                        "step_number": step.step_number,
-                        "success": False,
-                        "error": error_msg
-                    })
-                    
-                    if step.error_handling == "abort":
-                        return ExecutionResult(
-                            success=False,
-                            step_results=step_results,
-                            error_message=error_msg,
-                            execution_time=time.time() - start_time,
-                            warnings=warnings
-                        )
-                    else:
-                        warnings.append(error_msg)
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i = running.pop(future)
+                        step = task.steps[i]
+                        step_result = future.result()
+                        results_by_index[i] = step_result
+                        completed.add(i)
+                        
+                        if not step_result.get("success", False):
+                            error_msg = step_result.get("error", "Unknown error")
+                            logging.error(f"Step {step.step_number} failed: {error_msg}")
+                            
+                            # Handle error based on step configuration
+                            if step.error_handling == "abort":
+                                if abort_message is None:
+                                    abort_message = f"Step {step.step_number} failed: {error_msg}"
+                            elif step.error_handling != "retry":
+                                # Continue with warning
+                                warnings.append(f"Step {step.step_number} failed but continuing: {error_msg}")
+                        
+                        # Update context with step results
+                        context.update(step_result.get("context_updates", {}))
+            
+            step_results.extend(results_by_index[i] for i in sorted(results_by_index))
+            
+            if abort_message is not None:
+                return ExecutionResult(
+                    success=False,
+                    step_results=step_results,
+                    error_message=abort_message,
+                    execution_time=time.time() - start_time,
+                    warnings=warnings
+                )
             
             # Check success criteria
             success = self._check_success_criteria(task, step_results, context)
@@ -258,11 +279,37 @@ class UniversalExecutor:
                 warnings=warnings
             )
 
+    def _run_scheduled_step(self, step: TaskStep, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one scheduled step, applying its retry policy"""
+        logging.info(f"Executing step {step.step_number}: {step.action}")
+        
+        try:
+            step_result = self._execute_step(step, context)
+            
+            if not step_result.get("success", False) and step.error_handling == "retry":
+                # Retry the step once
+                logging.info(f"Retrying step {step.step_number}")
+                step_result = self._execute_step(step, context)
+            
+            return step_result
+            
+        except Exception as e:
+            error_msg = f"Exception in step {step.step_number}: {str(e)}"
+            logging.error(error_msg)
+            logging.error(traceback.format_exc())
+            
+            return {
+                "step_number": step.step_number,
+                "success": False,
+                "error": error_msg
+            }
+
     def _execute_step(self, step: TaskStep, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute a single task step"""
         
         # Get the appropriate handler
         handler = self.action_handlers.get(step.action, self._execute_universal)
+        step_start = time.time()
         
         try:
             # Set timeout for step execution
@@ -274,14 +321,18 @@ class UniversalExecutor:
             result["step_number"] = step.step_number
             result["action"] = step.action
             result["application"] = step.application
+            result["wall_time"] = time.time() - step_start
             
             return result
             
         except TimeoutError:
+            logging.error(f"Step {step.step_number} ({step.action}) timed out after {step.timeout_seconds} seconds")
             return {
                 "step_number": step.step_number,
                 "action": step.action,
                 "success": False,
+                "timed_out": True,
+                "wall_time": time.time() - step_start,
                 "error": f"Step timed out after {step.timeout_seconds} seconds"
             }
         except Exception as e:
@@ -289,13 +340,14 @@ class UniversalExecutor:
                 "step_number": step.step_number,
                 "action": step.action,
                 "success": False,
+                "wall_time": time.time() - step_start,
                 "error": f"Exception: {str(e)}"
             }
 
     def _execute_with_timeout(self, handler: Callable, step: TaskStep, context: Dict[str, Any], timeout: int) -> Dict[str, Any]:
-        """Execute handler with timeout"""
-        # For now, execute directly - could add proper timeout handling later
-        return handler(step, context)
+        """Execute handler on the step worker pool, interrupting it if it overruns the timeout"""
+        result, _ = self.step_runner.run(handler, step, context, timeout=timeout or None)
+        return result
 
     def _validate_execution_environment(self, task: UniversalTask) -> bool:
         """Validate that the environment is ready for task execution"""
@@ -385,8 +437,8 @@ Do you want to proceed with this task?
     def _open_notepad(self, step: TaskStep, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Open Notepad application"""
         try:
-            subprocess.Popen(["notepad.exe"])
-            time.sleep(2)  # Wait for notepad to open
+            if not desktop_controller.launch_application(["notepad.exe"], "Notepad"):
+                logging.warning("Notepad window not detected in the foreground")
             return {"success": True, "message": "Notepad opened successfully"}
         except Exception as e:
             return {"success": False, "error": f"Failed to open Notepad: {str(e)}"}
@@ -406,8 +458,8 @@ Do you want to proceed with this task?
             # Type the text
             text = step.parameters.get("text", "")
             if text:
-                time.sleep(1)  # Additional wait for notepad to be ready
-                pyautogui.typewrite(text)
+                if not desktop_controller.insert_text(text):
+                    return {"success": False, "error": "Failed to insert text in Notepad"}
                 return {"success": True, "message": f"Typed text in Notepad: {text[:50]}..."}
             else:
                 return {"success": False, "error": "No text provided to type"}
@@ -428,26 +480,13 @@ Do you want to proceed with this task?
             filename = step.parameters.get("filename", "new.txt")
             article_content = self._generate_article_about_topic(topic)
             
-            # Wait for notepad to be ready
-            time.sleep(2)
-            
-            # Type the article
-            pyautogui.typewrite(article_content, interval=0.01)
+            # Insert the article
+            if not desktop_controller.insert_text(article_content):
+                return {"success": False, "error": "Failed to insert article text"}
             
             # Save the file with the specified name
-            time.sleep(1)
-            
-            # Use Ctrl+S to save
-            pyautogui.hotkey('ctrl', 's')
-            time.sleep(1)
-            
-            # Type the filename
-            pyautogui.typewrite(filename, interval=0.05)
-            time.sleep(0.5)
-            
-            # Press Enter to save
-            pyautogui.press('enter')
-            time.sleep(1)
+            if not desktop_controller.save_as(filename):
+                return {"success": False, "error": f"Failed to save article as {filename}"}
             
             return {
                 "success": True, 
@@ -468,33 +507,21 @@ Do you want to proceed with this task?
             
             logging.info(f"Starting complete notepad task: create {filename} with {topic} article")
             
-            # Step 1: Open notepad
-            subprocess.Popen(["notepad.exe"])
-            time.sleep(3)  # Wait for notepad to fully load
+            # Step 1: Open notepad and wait for its window
+            if not desktop_controller.launch_application(["notepad.exe"], "Notepad"):
+                logging.warning("Notepad window not detected in the foreground")
             
             # Step 2: Generate and type the article content
             article_content = self._generate_comprehensive_ai_article()
             
-            logging.info(f"Typing article content ({len(article_content)} characters)")
-            pyautogui.typewrite(article_content, interval=0.01)
+            logging.info(f"Inserting article content ({len(article_content)} characters)")
+            if not desktop_controller.insert_text(article_content):
+                return {"success": False, "error": "Failed to insert article text"}
             
             # Step 3: Save the file with specified name
-            time.sleep(1)
             logging.info(f"Saving file as {filename}")
-            
-            # Use Ctrl+S to open save dialog
-            pyautogui.hotkey('ctrl', 's')
-            time.sleep(2)  # Wait for save dialog
-            
-            # Type the filename (clear any existing text first)
-            pyautogui.hotkey('ctrl', 'a')  # Select all text in filename field
-            time.sleep(0.5)
-            pyautogui.typewrite(filename, interval=0.05)
-            time.sleep(1)
-            
-            # Press Enter to save
-            pyautogui.press('enter')
-            time.sleep(2)  # Wait for save to complete
+            if not desktop_controller.save_as(filename):
+                return {"success": False, "error": f"Failed to save file as {filename}"}
             
             return {
                 "success": True,
@@ -592,7 +619,8 @@ Word count: Approximately 500 words
         try:
             text = step.parameters.get("text", "")
             if text:
-                pyautogui.typewrite(text)
+                if not desktop_controller.insert_text(text):
+                    return {"success": False, "error": "Failed to insert text"}
                 return {"success": True, "message": f"Text typed: {text[:50]}..."}
             else:
                 return {"success": False, "error": "No text provided to type"}
@@ -615,9 +643,8 @@ Word count: Approximately 500 words
                     text = text.replace(f"{{{{{key}}}}}", str(value))
             
             if text:
-                # Add a small delay to ensure the target application is ready
-                time.sleep(0.5)
-                pyautogui.typewrite(text, interval=0.01)  # Slightly slower typing
+                if not desktop_controller.insert_text(text):
+                    return {"success": False, "error": "Failed to insert content"}
                 return {"success": True, "message": f"Content typed: {text[:100]}..."}
             else:
                 return {"success": False, "error": "No content provided to type"}
@@ -659,8 +686,8 @@ Word count: Approximately 500 words
             if not app_name:
                 return {"success": False, "error": "No application name provided"}
             
-            subprocess.Popen([app_name])
-            time.sleep(2)
+            if not desktop_controller.launch_application([app_name]):
+                logging.warning(f"{app_name} window not detected in the foreground")
             return {"success": True, "message": f"Opened {app_name}"}
         except Exception as e:
             return {"success": False, "error": f"Failed to open {app_name}: {str(e)}"}
@@ -699,8 +726,8 @@ Word count: Approximately 500 words
                 # Open in notepad
                 result = self._open_notepad(step, context)
                 if result["success"]:
-                    time.sleep(1)
-                    pyautogui.typewrite(content)
+                    if not desktop_controller.insert_text(content):
+                        return {"success": False, "error": "Failed to insert article text"}
                     return {"success": True, "message": f"Article about {topic} created in Notepad"}
                 else:
                     return result
@@ -724,8 +751,8 @@ Word count: Approximately 500 words
             # Open notepad and type the letter
             result = self._open_notepad(step, context)
             if result["success"]:
-                time.sleep(1)
-                pyautogui.typewrite(content)
+                if not desktop_controller.insert_text(content):
+                    return {"success": False, "error": "Failed to insert leave letter"}
                 return {"success": True, "message": "Leave letter created in Notepad"}
             else:
                 return result
@@ -736,16 +763,13 @@ Word count: Approximately 500 words
     def _save_document(self, step: TaskStep, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Save current document"""
         try:
-            # Use Ctrl+S to save
-            pyautogui.hotkey('ctrl', 's')
-            time.sleep(1)
-            
-            # If filename provided, type it
+            # If filename provided, save through the Save As dialog
             filename = step.parameters.get("filename", "")
             if filename:
-                pyautogui.typewrite(filename)
-                time.sleep(0.5)
-                pyautogui.press('enter')
+                if not desktop_controller.save_as(filename):
+                    return {"success": False, "error": f"Failed to save document as {filename}"}
+            else:
+                pyautogui.hotkey('ctrl', 's')
             
             return {"success": True, "message": "Document saved"}
         except Exception as e:
@@ -754,8 +778,8 @@ Word count: Approximately 500 words
     def _open_word(self, step: TaskStep, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Open Microsoft Word"""
         try:
-            subprocess.Popen(["winword.exe"])
-            time.sleep(3)
+            if not desktop_controller.launch_application(["winword.exe"], "Word"):
+                logging.warning("Word window not detected in the foreground")
             return {"success": True, "message": "Microsoft Word opened"}
         except Exception as e:
             # Fallback to notepad
@@ -766,8 +790,10 @@ Word count: Approximately 500 words
         """Open web browser"""
         try:
             url = step.parameters.get("url", "https://www.google.com")
+            previous_window, _ = get_foreground_window()
             webbrowser.open(url)
-            time.sleep(3)
+            if not wait_for_foreground_change(previous_window):
+                logging.warning("Browser window not detected in the foreground")
             return {"success": True, "message": f"Browser opened with {url}"}
         except Exception as e:
             return {"success": False, "error": f"Failed to open browser: {str(e)}"}
@@ -857,8 +883,8 @@ Word count: Approximately 500 words
         """Open email client"""
         try:
             # Try to open Outlook
-            subprocess.Popen(["outlook.exe"])
-            time.sleep(3)
+            if not desktop_controller.launch_application(["outlook.exe"], "Outlook"):
+                logging.warning("Outlook window not detected in the foreground")
             return {"success": True, "message": "Email client opened"}
         except Exception as e:
             return {"success": False, "error": f"Failed to open email client: {str(e)}"}
@@ -1100,4 +1126,7 @@ universal_executor = UniversalExecutor()
 
 def execute_universal_task(task: UniversalTask, context: Dict[str, Any] = None) -> ExecutionResult:
     """Main entry point for universal task execution"""
-    return universal_executor.execute_task(task, context)
+    result = universal_executor.execute_task(task, context)
+    # Only plans that worked are replayed for repeated commands
+    universal_processor.record_task_outcome(task, result.success, context)
+    return result
@@ -7,12 +7,22 @@ import json
 import re
 import time
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime, timedelta
+from pathlib import Path
 
 import google.generativeai as genai
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, PLAN_CACHE_ENABLED, RAG_PROMPT_PASSAGES
+from brain.plan_cache import PlanCache
+
+# Optional imports with fallbacks
+try:
+    from utils.rag import retrieve_context
+    RAG_AVAILABLE = True
+except Exception:
+    # utils pulls in GUI confirmation dialogs, which can fail without a display
+    RAG_AVAILABLE = False
 
 class TaskComplexity(Enum):
     SIMPLE = "simple"        # Single action
@@ -47,6 +57,8 @@ class TaskStep:
     error_handling: str
     timeout_seconds: int = 30
     requires_confirmation: bool = False
+    depends_on: Optional[List[int]] = None  # step_numbers that must finish first
+    produces: Optional[List[str]] = None    # context keys published via context_updates
 
 @dataclass
 class UniversalTask:
@@ -63,6 +75,9 @@ class UniversalTask:
     context_requirements: List[str]
     success_criteria: str
     rollback_plan: Optional[str] = None
+    # AI plan behind the task, cached only once the task has run successfully
+    plan_data: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    from_plan_cache: bool = False
 
 class UniversalProcessor:
     """
@@ -71,6 +86,7 @@ class UniversalProcessor:
     
     def __init__(self):
         self.setup_ai()
+        self.setup_plan_cache()
         self.task_history = []
         self.context_memory = {}
         self.user_preferences = {}
@@ -87,6 +103,17 @@ class UniversalProcessor:
             self.ai_available = False
             logging.warning("AI not available - using pattern-based processing")
 
+    def setup_plan_cache(self):
+        """Initialize the persistent plan cache"""
+        self.plan_cache = None
+        if not PLAN_CACHE_ENABLED:
+            return
+        try:
+            self.plan_cache = PlanCache()
+            logging.info("Plan cache enabled")
+        except Exception as e:
+            logging.warning(f"Plan cache not available: {e}")
+
     def process_universal_command(self, command: str, context: Dict[str, Any] = None) -> UniversalTask:
         """
         Process any natural language command into an executable task
@@ -100,14 +127,18 @@ class UniversalProcessor:
         """
         logging.info(f"Processing universal command: {command}")
         
-        # Analyze command complexity and intent
-        task_analysis = self._analyze_command(command, context)
+        # Reuse a previously generated plan for repeated commands
+        task = self._get_cached_task(command, context)
         
-        # Generate detailed execution plan
-        if self.ai_available:
-            task = self._ai_generate_task(command, task_analysis, context)
-        else:
-            task = self._pattern_generate_task(command, task_analysis)
+        if task is None:
+            # Analyze command complexity and intent
+            task_analysis = self._analyze_command(command, context)
+            
+            # Generate detailed execution plan
+            if self.ai_available:
+                task = self._ai_generate_task(command, task_analysis, context)
+            else:
+                task = self._pattern_generate_task(command, task_analysis)
             
         # Validate and optimize task
         task = self._validate_task(task)
@@ -136,8 +167,27 @@ class UniversalProcessor:
         
         return analysis
 
+    def _get_knowledge_context(self, command: str) -> str:
+        """Format the most relevant knowledge base passages for the planning prompt"""
+        if not RAG_AVAILABLE:
+            return ""
+        try:
+            passages = retrieve_context(command, RAG_PROMPT_PASSAGES)
+        except Exception as e:
+            logging.warning(f"Knowledge retrieval failed: {e}")
+            return ""
+        if not passages:
+            return ""
+        
+        lines = ["RELEVANT KNOWLEDGE (from the user's knowledge base):"]
+        for passage in passages:
+            source = f"{Path(passage['file']).name}@{passage['offset']}"
+            lines.append(f"- [{source}] {passage['text'][:500]}")
+        return "\n".join(lines) + "\n"
+
     def _ai_generate_task(self, command: str, analysis: Dict[str, Any], context: Dict[str, Any] = None) -> UniversalTask:
         """Use AI to generate a comprehensive task plan"""
+        knowledge = self._get_knowledge_context(command)
         
         prompt = f"""
 You are Shadow AI, a universal computer assistant. Break down this user request into a detailed, executable task plan.
@@ -148,6 +198,7 @@ ANALYSIS: {json.dumps(analysis, indent=2)}
 
 CONTEXT: {json.dumps(context or {}, indent=2)}
 
+{knowledge}
 Generate a comprehensive task plan with these components:
 
 1. TASK OVERVIEW:
@@ -165,6 +216,7 @@ Generate a comprehensive task plan with these components:
    - Expected result
    - Error handling approach
    - Timeout duration
+   - Step numbers it depends on (steps without dependencies may run in parallel)
 
 3. REQUIREMENTS:
    - Context requirements
@@ -189,7 +241,8 @@ Format your response as a valid JSON object matching this structure:
             "expected_result": "what_should_happen",
             "error_handling": "how_to_handle_errors",
             "timeout_seconds": 30,
-            "requires_confirmation": false
+            "requires_confirmation": false,
+            "depends_on": []
         }}
     ],
     "context_requirements": ["requirement1", "requirement2"],
@@ -203,27 +256,68 @@ IMPORTANT: Always provide safe, practical steps that respect user privacy and sy
         try:
             response = self.ai_model.generate_content(prompt)
             task_data = json.loads(response.text)
-            
-            # Create UniversalTask object
-            return UniversalTask(
-                task_id=f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                original_command=command,
-                category=TaskCategory(task_data.get("category", "universal")),
-                complexity=TaskComplexity(task_data.get("complexity", "simple")),
-                description=task_data.get("description", "AI-generated task"),
-                steps=[TaskStep(**step) for step in task_data.get("steps", [])],
-                estimated_duration=task_data.get("estimated_duration", 60),
-                risk_level=task_data.get("risk_level", "low"),
-                requires_user_confirmation=task_data.get("requires_user_confirmation", False),
-                context_requirements=task_data.get("context_requirements", []),
-                success_criteria=task_data.get("success_criteria", "Task completed"),
-                rollback_plan=task_data.get("rollback_plan")
-            )
+            task = self._build_task_from_data(command, task_data)
+            task.plan_data = task_data
+            return task
             
         except Exception as e:
             logging.error(f"AI task generation failed: {e}")
             return self._pattern_generate_task(command, analysis)
 
+    def record_task_outcome(self, task: UniversalTask, success: bool, context: Dict[str, Any] = None):
+        """
+        Update the plan cache after a task has run
+
+        A new AI plan is cached once it has succeeded; a cached plan that
+        failed is dropped so the next request gets a fresh one.
+        """
+        if not self.plan_cache:
+            return
+        try:
+            if success and task.plan_data is not None:
+                self.plan_cache.put(task.original_command, task.plan_data, context)
+            elif not success and task.from_plan_cache:
+                logging.info(f"Dropping cached plan that failed: {task.original_command}")
+                self.plan_cache.invalidate(task.original_command, context)
+        except Exception as e:
+            logging.warning(f"Failed to update plan cache: {e}")
+
+    def _build_task_from_data(self, command: str, task_data: Dict[str, Any]) -> UniversalTask:
+        """Create a UniversalTask from AI-generated (or cached) plan data"""
+        return UniversalTask(
+            task_id=f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            original_command=command,
+            category=TaskCategory(task_data.get("category", "universal")),
+            complexity=TaskComplexity(task_data.get("complexity", "simple")),
+            description=task_data.get("description", "AI-generated task"),
+            steps=[TaskStep(**step) for step in task_data.get("steps", [])],
+            estimated_duration=task_data.get("estimated_duration", 60),
+            risk_level=task_data.get("risk_level", "low"),
+            requires_user_confirmation=task_data.get("requires_user_confirmation", False),
+            context_requirements=task_data.get("context_requirements", []),
+            success_criteria=task_data.get("success_criteria", "Task completed"),
+            rollback_plan=task_data.get("rollback_plan")
+        )
+
+    def _get_cached_task(self, command: str, context: Dict[str, Any] = None) -> Optional[UniversalTask]:
+        """Rebuild a task from the plan cache without an LLM round trip"""
+        if not self.plan_cache:
+            return None
+        
+        try:
+            task_data = self.plan_cache.get(command, context)
+            if task_data is None:
+                return None
+            
+            logging.info(f"Plan cache hit for command: {command}")
+            task = self._build_task_from_data(command, task_data)
+            task.from_plan_cache = True
+            return task
+        except Exception as e:
+            logging.warning(f"Cached plan could not be used, regenerating: {e}")
+            self.plan_cache.invalidate(command, context)
+            return None
+
     def _pattern_generate_task(self, command: str, analysis: Dict[str, Any]) -> UniversalTask:
         """Fallback pattern-based task generation"""
         
@@ -43,3 +43,97 @@ HEADLESS_MODE = False
 # Document settings
 DEFAULT_DOC_FORMAT = "docx"  # Options: "docx", "pdf", "txt"
 SAVE_LOCATION = DESKTOP_PATH
+
+# Plan cache settings
+PLAN_CACHE_ENABLED = True
+PLAN_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Expire cached plans after a week
+PLAN_CACHE_MAX_ENTRIES = 500
+PLAN_CACHE_CONTEXT_KEYS = ("user_intent", "active_application", "current_focus", "interaction_mode")
+
+# LLM transport settings
+HTTP_POOL_SIZE = 10  # Keep-alive connections shared by concurrent callers
+LLM_REQUEST_TIMEOUT = 120
+
+# Task execution settings
+EXECUTOR_MAX_WORKERS = 4
+STEP_CANCEL_GRACE_SECONDS = 2  # Time a timed-out step gets to unwind before its worker is abandoned
+
+# Context database settings
+CONTEXT_WRITE_BATCH_SIZE = 200  # Max queued writes committed in one transaction
+CONTEXT_FLUSH_TIMEOUT = 10
+TASK_INDEX_DIM = 2 ** 18  # Hashed feature space of the task similarity index
+TASK_SIMILARITY_THRESHOLD = 0.3
+
+# Knowledge base (RAG) settings
+RAG_PASSAGE_MAX_CHARS = 1000
+RAG_REFRESH_INTERVAL = 5  # Seconds between knowledge base mtime checks
+BM25_K1 = 1.5
+BM25_B = 0.75
+RAG_EMBEDDING_DIM = 256
+RAG_IVF_MIN_VECTORS = 50000  # Below this the vector store is searched exhaustively
+RAG_IVF_NPROBE = 8
+RAG_COMPACT_RATIO = 0.3  # Dead-row fraction that triggers vector store compaction
+RAG_PROMPT_PASSAGES = 3
+
+# File management settings
+FILE_SCAN_WORKERS = 8  # Threads listing directories in parallel
+FILE_SCAN_PROGRESS_INTERVAL = 5000  # Entries between progress callbacks
+DUPLICATE_SAMPLE_BYTES = 64 * 1024  # Bytes hashed from each end of same-size files
+DUPLICATE_HASH_WORKERS = 4  # Threads hashing duplicate candidates
+HASH_CHUNK_BYTES = 1024 * 1024  # Chunk size for streaming full-file hashes
+FILE_INDEX_REFRESH_INTERVAL = 30  # Seconds before index lookups re-check directory mtimes
+FILE_INDEX_FULL_REFRESH_HOURS = 24  # Relist every indexed folder this often to catch in-place edits
+BACKUP_FOLDER_NAME = "Shadow Backups"  # Repository folder created inside the backup location
+BACKUP_CHUNK_BYTES = 4 * 1024 * 1024
+BACKUP_WORKERS = 4  # Threads reading, hashing and compressing files
+BACKUP_COMPRESSION_LEVEL = 6  # zlib level for stored chunks
+BULK_OPERATION_WORKERS = 8  # Threads running the moves and copies of a batch
+FILE_JOURNAL_KEEP = 100  # Undo journals kept for recent batches
+
+# Desktop automation readiness settings
+PYAUTOGUI_PAUSE = 0.05  # Per-call pause; readiness waits handle synchronization
+READINESS_TIMEOUT = 10
+READINESS_POLL_INITIAL = 0.05
+READINESS_POLL_MAX = 0.5
+READINESS_FALLBACK_DELAY = 1.0  # Used when window state cannot be observed
+SAVE_DIALOG_TIMEOUT = 2  # Ctrl+S on a document that already has a file shows no dialog
+
+# Text insertion settings
+PASTE_THRESHOLD_CHARS = 200  # Longer text is pasted through the clipboard
+TYPING_CHUNK_SIZE = 64
+TYPING_INTERVAL = 0.01
+CLIPBOARD_VERIFY_TIMEOUT = 1.0
+CLIPBOARD_PASTE_SETTLE = 0.15  # Time the target app gets to read the clipboard before it is restored
+
+# Clipboard history settings
+CLIPBOARD_HISTORY_LIMIT = 100000  # Items kept in the history
+CLIPBOARD_COMPRESS_BYTES = 4096  # Longer items are stored compressed
+CLIPBOARD_SEGMENT_BYTES = 4 * 1024 * 1024  # History log segment size
+CLIPBOARD_INDEX_CHARS = 10000  # Leading characters of each item that search indexes
+CLIPBOARD_SEARCH_CANDIDATES = 200  # Full-text matches re-ranked per search
+CLIPBOARD_FUZZY_MIN_MATCH = 0.5  # Share of a query's trigrams a fuzzy match must contain
+CLIPBOARD_RECENCY_HALF_LIFE_DAYS = 7
+CLIPBOARD_RECENCY_WEIGHT = 0.3  # Share of the search score that depends on age
+CLIPBOARD_WATCH_INTERVAL = 0.5  # Seconds between checks for clipboard changes made by other apps
+CLIPBOARD_OWN_WRITES = 8  # Recent clipboard writes by Shadow that the watcher ignores
+
+# Hotkey settings
+HOTKEY_WORKERS = 2  # Threads running hotkey actions
+HOTKEY_DEBOUNCE_SECONDS = 0.3  # Repeats of a hotkey within this window are ignored
+HOTKEY_MAX_PENDING = 1  # Triggers queued per action while it runs; more are dropped
+HOTKEY_SEQUENCE_TIMEOUT = 1.0  # Seconds allowed between the steps of a sequence like "ctrl+k, n"
+
+# System monitoring settings
+METRICS_SAMPLE_INTERVAL = 1.0  # Seconds between background samples
+METRICS_HISTORY_SECONDS = 3600  # History kept in the ring buffers
+PROCESS_SAMPLE_EVERY = 5  # Samples between process table refreshes
+PROCESS_HISTORY_SAMPLES = 60  # Per-process history entries
+PROCESS_TABLE_MAX_AGE_MS = 500  # Process snapshots younger than this are served from cache
+PROCESS_TABLE_RECHECK_SECONDS = 2  # Known PIDs are checked for reuse at least this often
+METRICS_RETENTION_DAYS = {1: 1, 60: 30, 3600: 365}  # Days kept per resolution (seconds)
+METRIC_ALERT_RULES = [
+    {'name': 'High CPU usage', 'metric': 'cpu_percent', 'threshold': 90, 'duration': 60},
+    {'name': 'High memory usage', 'metric': 'memory_percent', 'threshold': 90, 'duration': 30},
+    {'name': 'Memory usage climbing', 'metric': 'memory_percent', 'kind': 'rate', 'threshold': 10, 'window': 120},
+    {'name': 'Heavy swapping', 'metric': 'swap_percent', 'threshold': 80, 'duration': 60},
+]
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Backup Engine Module for Shadow AI
+Incremental, deduplicating backups into a content-addressed chunk store
+"""
+
+import os
+import json
+import time
+import uuid
+import zlib
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import BACKUP_CHUNK_BYTES, BACKUP_WORKERS, BACKUP_COMPRESSION_LEVEL
+from control.file_scanner import file_scanner, ScanEntry
+
+# Chunk files start with a marker byte saying how the payload is stored
+COMPRESSED = b'z'
+RAW = b'r'
+
+class BackupRepository:
+    """
+    A folder of snapshots sharing one content-addressed chunk store.
+
+    Files are split into fixed-size chunks named by their BLAKE2b hash and
+    stored zlib-compressed under ``chunks/``, so a chunk that appears in many
+    files or snapshots is stored once. A snapshot is a JSON manifest listing
+    each file's size, mtime and chunk ids; it is written only after all of its
+    chunks, so an interrupted backup never leaves a snapshot that cannot be
+    restored. A small header (id, source, time, stats) is kept beside each
+    manifest under ``headers/``, so listing snapshots never parses file lists.
+
+    Files whose size and mtime match the previous snapshot of the same source
+    reuse its chunk list without being read, so a backup only reads and
+    stores what changed.
+    """
+
+    def __init__(self, path: str, chunk_size: int = BACKUP_CHUNK_BYTES,
+                 max_workers: int = BACKUP_WORKERS, compression_level: int = BACKUP_COMPRESSION_LEVEL):
+        self.path = Path(path)
+        self.chunks_dir = self.path / "chunks"
+        self.snapshots_dir = self.path / "snapshots"
+        self.headers_dir = self.path / "headers"
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.compression_level = compression_level
+
+    # Chunk store
+
+    def _chunk_path(self, chunk_id: str) -> Path:
+        return self.chunks_dir / chunk_id[:2] / chunk_id
+
+    def _store_chunk(self, data: bytes) -> Tuple[str, int]:
+        """Store a chunk unless it already exists; returns (chunk id, bytes written)"""
+        chunk_id = hashlib.blake2b(data, digest_size=32).hexdigest()
+        path = self._chunk_path(chunk_id)
+        if path.exists():
+            return chunk_id, 0
+
+        compressed = zlib.compress(data, self.compression_level)
+        payload = COMPRESSED + compressed if len(compressed) < len(data) else RAW + data
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers may store the same chunk at once; each writes its own temp file
+        tmp_path = path.with_name(f"{chunk_id}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return chunk_id, len(payload)
+
+    def _read_chunk(self, chunk_id: str) -> bytes:
+        with open(self._chunk_path(chunk_id), 'rb') as f:
+            payload = f.read()
+        if payload[:1] == COMPRESSED:
+            return zlib.decompress(payload[1:])
+        return payload[1:]
+
+    def _backup_file(self, path: str) -> Dict:
+        """Chunk one file into the store"""
+        chunks, size, written = [], 0, 0
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(self.chunk_size), b''):
+                chunk_id, chunk_written = self._store_chunk(data)
+                chunks.append(chunk_id)
+                size += len(data)
+                written += chunk_written
+        return {'size': size, 'chunks': chunks, 'written': written}
+
+    # Snapshots
+
+    def list_snapshots(self, source: Optional[str] = None) -> List[Dict]:
+        """List snapshots (oldest first), optionally only those of one source"""
+        snapshots = []
+        if not self.snapshots_dir.exists():
+            return snapshots
+        headers = {path.stem for path in self.headers_dir.glob("*.json")} if self.headers_dir.exists() else set()
+        for manifest in self.snapshots_dir.glob("*.json"):
+            if manifest.stem in headers:
+                continue
+            # Repositories written before headers existed, or a crash between the two writes
+            try:
+                self._save_header(self.load_snapshot(manifest.stem))
+                headers.add(manifest.stem)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable snapshot {manifest.name}: {e}")
+        for snapshot_id in headers:
+            try:
+                with open(self.headers_dir / f"{snapshot_id}.json", 'r', encoding='utf-8') as f:
+                    header = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable snapshot header {snapshot_id}: {e}")
+                continue
+            if source is None or os.path.normcase(header['source']) == os.path.normcase(os.path.abspath(source)):
+                snapshots.append(header)
+        snapshots.sort(key=lambda s: s['created'])
+        return snapshots
+
+    def load_snapshot(self, snapshot_id: str) -> Dict:
+        with open(self.snapshots_dir / f"{snapshot_id}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def latest_snapshot(self, source: str) -> Optional[Dict]:
+        snapshots = self.list_snapshots(source)
+        return self.load_snapshot(snapshots[-1]['id']) if snapshots else None
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _save_header(self, snapshot: Dict):
+        header = {key: value for key, value in snapshot.items() if key not in ('files', 'dirs')}
+        self._write_json(self.headers_dir / f"{snapshot['id']}.json", header)
+
+    def _save_snapshot(self, snapshot: Dict):
+        self._write_json(self.snapshots_dir / f"{snapshot['id']}.json", snapshot)
+        self._save_header(snapshot)
+
+    # Commands
+
+    def backup(self, source: str, rehash: bool = False) -> Dict:
+        """
+        Back up a file or folder as a new snapshot
+
+        Args:
+            rehash: Read every file even if its size and mtime are unchanged
+
+        Returns:
+            Backup statistics, including the snapshot id
+        """
+        start_time = time.time()
+        source = os.path.abspath(source)
+        previous = self.latest_snapshot(source)
+        previous_files = previous['files'] if previous else {}
+
+        if os.path.isfile(source):
+            stat = os.stat(source)
+            base = os.path.dirname(source)
+            entries = [ScanEntry(path=source, name=os.path.basename(source), is_dir=False,
+                                 size=stat.st_size, mtime=stat.st_mtime)]
+        else:
+            base = source
+            # Never back up the repository into itself
+            repository = os.path.normcase(os.path.abspath(self.path))
+            entries = [entry for entry in file_scanner.scan(
+                source, include_dirs=True, dir_filter=lambda e: os.path.normcase(e.path) != repository)
+                if os.path.normcase(entry.path) != repository]
+
+        files, dirs, changed = {}, [], []
+        stats = {'files': 0, 'unchanged_files': 0, 'changed_files': 0, 'total_bytes': 0,
+                 'bytes_read': 0, 'bytes_written': 0, 'errors': 0}
+        for entry in entries:
+            relpath = Path(os.path.relpath(entry.path, base)).as_posix()
+            if entry.is_dir:
+                dirs.append(relpath)
+                continue
+            stats['files'] += 1
+            stats['total_bytes'] += entry.size
+            known = previous_files.get(relpath)
+            if not rehash and known and known['size'] == entry.size and known['mtime'] == entry.mtime:
+                files[relpath] = known
+                stats['unchanged_files'] += 1
+            else:
+                changed.append((relpath, entry))
+
+        def backup_entry(item: Tuple[str, ScanEntry]) -> Tuple[str, ScanEntry, Optional[Dict]]:
+            relpath, entry = item
+            try:
+                return relpath, entry, self._backup_file(entry.path)
+            except OSError as e:
+                logging.warning(f"Could not back up {entry.path}: {e}")
+                return relpath, entry, None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-backup") as pool:
+            for relpath, entry, result in pool.map(backup_entry, changed):
+                if result is None:
+                    stats['errors'] += 1
+                    continue
+                # Change detection compares against the scanned stat, which for a
+                # symbolic link describes the link rather than the content read
+                files[relpath] = {'size': entry.size, 'mtime': entry.mtime, 'chunks': result['chunks']}
+                stats['changed_files'] += 1
+                stats['bytes_read'] += result['size']
+                stats['bytes_written'] += result['written']
+
+        created = datetime.now()
+        snapshot_id = f"{Path(source).name}_{created.strftime('%Y%m%d_%H%M%S')}"
+        suffix = 1
+        while (self.snapshots_dir / f"{snapshot_id}.json").exists():
+            suffix += 1
+            snapshot_id = f"{Path(source).name}_{created.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+
+        stats['elapsed'] = time.time() - start_time
+        self._save_snapshot({
+            'id': snapshot_id,
+            'source': source,
+            'created': created.isoformat(),
+            'parent': previous['id'] if previous else None,
+            'stats': stats,
+            'dirs': dirs,
+            'files': files
+        })
+        stats['snapshot'] = snapshot_id
+        logging.info(f"Backup {snapshot_id}: {stats['changed_files']} changed, {stats['unchanged_files']} unchanged "
+                     f"files, {stats['bytes_written'] // 1024}KB written in {stats['elapsed']:.1f}s")
+        return stats
+
+    def restore(self, snapshot_id: str, target: str, paths: Optional[Iterable[str]] = None,
+                overwrite: bool = False) -> Dict:
+        """
+        Restore a snapshot (or some of its files) into a folder
+
+        Args:
+            paths: Relative paths of files or folders to restore; everything if None
+            overwrite: Replace files that already exist in the target
+
+        Returns:
+            Restore statistics
+        """
+        snapshot = self.load_snapshot(snapshot_id)
+        target = Path(target)
+        prefixes = None if paths is None else [Path(p).as_posix().rstrip('/') for p in paths]
+
+        def selected(relpath: str) -> bool:
+            return prefixes is None or any(relpath == p or relpath.startswith(p + '/') for p in prefixes)
+
+        for relpath in snapshot['dirs']:
+            if selected(relpath):
+                (target / relpath).mkdir(parents=True, exist_ok=True)
+
+        def restore_file(item: Tuple[str, Dict]) -> Tuple[int, Optional[str]]:
+            relpath, info = item
+            destination = target / relpath
+            if destination.exists() and not overwrite:
+                return 0, f"{relpath}: already exists"
+            try:
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = destination.with_name(f"{destination.name}.{uuid.uuid4().hex}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    for chunk_id in info['chunks']:
+                        f.write(self._read_chunk(chunk_id))
+                os.utime(tmp_path, (info['mtime'], info['mtime']))
+                os.replace(tmp_path, destination)
+                return info['size'], None
+            except (OSError, zlib.error) as e:
+                return 0, f"{relpath}: {e}"
+
+        stats = {'files': 0, 'bytes': 0, 'errors': []}
+        items = [(relpath, info) for relpath, info in snapshot['files'].items() if selected(relpath)]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-restore") as pool:
+            for size, error in pool.map(restore_file, items):
+                if error:
+                    stats['errors'].append(error)
+                else:
+                    stats['files'] += 1
+                    stats['bytes'] += size
+
+        logging.info(f"Restored {stats['files']} files from {snapshot_id} to {target}")
+        return stats
+
+    def verify(self, snapshot_id: Optional[str] = None, read_data: bool = True) -> Dict:
+        """
+        Check that the chunks of one snapshot (or all) are present and intact
+
+        Args:
+            read_data: Decompress and re-hash every chunk instead of only checking it exists
+
+        Returns:
+            Dict with the chunks checked and the missing and corrupt chunk ids
+        """
+        snapshot_ids = [snapshot_id] if snapshot_id else [s['id'] for s in self.list_snapshots()]
+        chunk_ids = set()
+        for sid in snapshot_ids:
+            for info in self.load_snapshot(sid)['files'].values():
+                chunk_ids.update(info['chunks'])
+
+        def check(chunk_id: str) -> Optional[str]:
+            if not self._chunk_path(chunk_id).exists():
+                return 'missing'
+            if not read_data:
+                return None
+            try:
+                data = self._read_chunk(chunk_id)
+            except (OSError, zlib.error):
+                return 'corrupt'
+            return None if hashlib.blake2b(data, digest_size=32).hexdigest() == chunk_id else 'corrupt'
+
+        result = {'snapshots': snapshot_ids, 'chunks_checked': len(chunk_ids), 'missing': [], 'corrupt': []}
+        ordered = sorted(chunk_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-verify") as pool:
+            for chunk_id, problem in zip(ordered, pool.map(check, ordered)):
+                if problem:
+                    result[problem].append(chunk_id)
+        result['ok'] = not result['missing'] and not result['corrupt']
+
+        if result['ok']:
+            logging.info(f"Verified {len(chunk_ids)} chunks in {len(snapshot_ids)} snapshots")
+        else:
+            logging.error(f"Backup verification found {len(result['missing'])} missing and "
+                          f"{len(result['corrupt'])} corrupt chunks")
+        return result
+
+    def get_stats(self) -> Dict:
+        """Get repository statistics"""
+        chunk_count, stored_bytes = 0, 0
+        if self.chunks_dir.exists():
+            for entry in file_scanner.scan_files(str(self.chunks_dir)):
+                chunk_count += 1
+                stored_bytes += entry.size
+        return {
+            'path': str(self.path),
+            'snapshots': len(self.list_snapshots()),
+            'chunks': chunk_count,
+            'stored_bytes': stored_bytes
+        }
+
+_repositories: Dict[str, BackupRepository] = {}
+_repositories_lock = threading.Lock()
+
+def get_repository(path: str) -> BackupRepository:
+    """Get the shared repository object for a folder"""
+    key = os.path.normcase(os.path.abspath(path))
+    with _repositories_lock:
+        if key not in _repositories:
+            _repositories[key] = BackupRepository(path)
+        return _repositories[key]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Bulk File Operations Module for Shadow AI
+Plans and runs batches of moves and copies in parallel, with an undo journal
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import BULK_OPERATION_WORKERS, FILE_JOURNAL_KEEP
+
+FILE_CATEGORIES = {
+    'Documents': ['.txt', '.doc', '.docx', '.pdf', '.rtf', '.odt'],
+    'Images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp'],
+    'Videos': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
+    'Audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma'],
+    'Archives': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
+    'Spreadsheets': ['.xls', '.xlsx', '.csv', '.ods'],
+    'Presentations': ['.ppt', '.pptx', '.odp'],
+    'Code': ['.py', '.js', '.html', '.css', '.cpp', '.java', '.cs', '.php'],
+    'Executables': ['.exe', '.msi', '.dmg', '.deb', '.rpm']
+}
+
+# Extension -> category, built once instead of searching every list per file
+EXTENSION_CATEGORIES = {ext: category for category, extensions in FILE_CATEGORIES.items() for ext in extensions}
+
+def get_category(extension: str) -> str:
+    """Get the organize category for a file extension"""
+    return EXTENSION_CATEGORIES.get(extension.lower(), 'Others')
+
+@dataclass
+class FileOperation:
+    """One planned move or copy"""
+    action: str  # 'move' or 'copy'
+    source: str
+    destination: str
+
+class BulkFileOperations:
+    """
+    Runs batches of file operations planned up front.
+
+    Before anything changes, the whole plan is appended to a per-batch journal
+    file and flushed to disk. The outcome of each operation is appended as it
+    finishes, and a summary when the batch is done. Undo reverses only the
+    operations that succeeded; an operation with no recorded outcome (the
+    process died halfway through) is checked against the disk instead.
+    """
+
+    def __init__(self, journal_dir: Optional[Path] = None, max_workers: int = BULK_OPERATION_WORKERS):
+        self.journal_dir = Path(journal_dir) if journal_dir else Path.home() / ".shadow_ai" / "file_journal"
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    # Planning
+
+    def plan_organize(self, folder_path: str) -> List[FileOperation]:
+        """Plan moving the files directly in a folder into category subfolders"""
+        operations = []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                category = get_category(os.path.splitext(entry.name)[1])
+                operations.append(FileOperation('move', entry.path, os.path.join(folder_path, category, entry.name)))
+        return operations
+
+    # Journal
+
+    def _journal_path(self, batch_id: str) -> Path:
+        return self.journal_dir / f"{batch_id}.jsonl"
+
+    def _append(self, batch_id: str, record: Dict):
+        with open(self._journal_path(batch_id), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_journal(self, batch_id: str) -> List[Dict]:
+        records = []
+        with open(self._journal_path(batch_id), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Outcome records are not synced one by one; a crash can cut the last
+                    if records:
+                        continue
+                    raise
+        return records
+
+    def _prune_journal(self):
+        journals = sorted(self.journal_dir.glob("*.jsonl"))
+        for path in journals[:-FILE_JOURNAL_KEEP]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def list_batches(self, count: int = 10) -> List[Dict]:
+        """Get the most recent batches, newest first"""
+        batches = []
+        for path in sorted(self.journal_dir.glob("*.jsonl"), reverse=True)[:count]:
+            try:
+                records = self._read_journal(path.stem)
+            except (OSError, ValueError):
+                continue
+            plan = records[0]
+            statuses = [r['status'] for r in records[1:] if 'status' in r]
+            batches.append({
+                'batch': plan['batch'],
+                'description': plan['description'],
+                'timestamp': plan['timestamp'],
+                'operations': len(plan['operations']),
+                'status': statuses[-1] if statuses else 'incomplete'
+            })
+        return batches
+
+    # Execution
+
+    @staticmethod
+    def _run(operation: FileOperation) -> Optional[str]:
+        """Perform one operation; returns an error message on failure"""
+        try:
+            if os.path.lexists(operation.destination):
+                return f"{operation.destination} already exists"
+            if operation.action == 'copy':
+                shutil.copy2(operation.source, operation.destination)
+            else:
+                try:
+                    # A rename is a metadata-only change on the same device
+                    os.rename(operation.source, operation.destination)
+                except OSError:
+                    shutil.move(operation.source, operation.destination)
+            return None
+        except OSError as e:
+            return f"{operation.source}: {e}"
+
+    def execute(self, operations: Iterable[FileOperation], description: str = "") -> Dict:
+        """
+        Run a batch of operations
+
+        Target folders are created once, then the operations run on a thread
+        pool. Operations whose destination exists, or that repeat an earlier
+        destination in the batch, are skipped.
+
+        Returns:
+            Dict with the batch id, succeeded and skipped operations and errors
+        """
+        operations = list(operations)
+        seen_destinations = set()
+        planned, skipped = [], []
+        for operation in operations:
+            key = os.path.normcase(os.path.abspath(operation.destination))
+            if key in seen_destinations or os.path.lexists(operation.destination):
+                skipped.append(operation)
+                continue
+            seen_destinations.add(key)
+            planned.append(operation)
+
+        # Every folder the batch will create, so undo can remove them again
+        created_dirs = set()
+        for directory in {os.path.dirname(op.destination) for op in planned}:
+            while directory and directory not in created_dirs and not os.path.isdir(directory):
+                created_dirs.add(directory)
+                directory = os.path.dirname(directory)
+        created_dirs = sorted(created_dirs)
+
+        with self._lock:
+            batch_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            self._append(batch_id, {
+                'batch': batch_id,
+                'description': description,
+                'timestamp': datetime.now().isoformat(),
+                'created_dirs': created_dirs,
+                'operations': [[op.action, op.source, op.destination] for op in planned]
+            })
+
+        start_time = time.time()
+        errors = []
+        for directory in created_dirs:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                errors.append(f"{directory}: {e}")
+
+        succeeded = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-fileops") as pool, \
+                open(self._journal_path(batch_id), 'a', encoding='utf-8') as journal:
+            for index, (operation, error) in enumerate(zip(planned, pool.map(self._run, planned))):
+                journal.write(json.dumps({'op': index, 'ok': error is None}) + "\n")
+                journal.flush()
+                if error:
+                    errors.append(error)
+                else:
+                    succeeded.append(operation)
+
+        self._append(batch_id, {'status': 'done', 'succeeded': len(succeeded), 'errors': errors[:100]})
+        self._prune_journal()
+        logging.info(f"Batch {batch_id}: {len(succeeded)} of {len(operations)} operations done "
+                     f"in {time.time() - start_time:.2f}s")
+        return {
+            'batch': batch_id,
+            'succeeded': succeeded,
+            'skipped': skipped,
+            'errors': errors
+        }
+
+    def undo(self, batch_id: Optional[str] = None) -> Dict:
+        """
+        Reverse a batch (the most recent one by default)
+
+        Moved files are moved back if they are still at their destination and
+        nothing has taken their original place; copies are deleted. Operations
+        journaled as failed are left alone. Folders the batch created are
+        removed if they are empty again.
+        """
+        if batch_id is None:
+            batches = [b for b in self.list_batches(FILE_JOURNAL_KEEP) if b['status'] != 'undone']
+            if not batches:
+                return {'error': "Nothing to undo"}
+            batch_id = batches[0]['batch']
+
+        records = self._read_journal(batch_id)
+        if any(r.get('status') == 'undone' for r in records[1:]):
+            return {'error': f"Batch {batch_id} was already undone"}
+        plan = records[0]
+        outcomes = {r['op']: r['ok'] for r in records[1:] if 'op' in r}
+        operations = [operation for index, operation in enumerate(plan['operations'])
+                      if outcomes.get(index, True)]
+
+        def reverse(operation: Tuple[str, str, str]) -> Optional[str]:
+            action, source, destination = operation
+            try:
+                if not os.path.lexists(destination):
+                    return None
+                if action == 'copy':
+                    os.unlink(destination)
+                elif not os.path.lexists(source):
+                    try:
+                        os.rename(destination, source)
+                    except OSError:
+                        shutil.move(destination, source)
+                else:
+                    return f"{source} exists, leaving {destination}"
+                return None
+            except OSError as e:
+                return f"{destination}: {e}"
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-fileops") as pool:
+            errors = [error for error in pool.map(reverse, reversed(operations)) if error]
+
+        for directory in sorted(plan['created_dirs'], key=len, reverse=True):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+        self._append(batch_id, {'status': 'undone', 'errors': errors[:100]})
+        logging.info(f"Undid batch {batch_id} ({len(operations)} operations, {len(errors)} errors)")
+        return {'batch': batch_id, 'operations': len(operations), 'errors': errors}
+
+# Global instance
+bulk_operations = BulkFileOperations()
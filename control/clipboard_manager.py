@@ -6,25 +6,72 @@ Provides advanced clipboard operations and history
 
 import logging
 import json
+import queue
+import threading
 import time
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 from pathlib import Path
 
+from config import (CLIPBOARD_VERIFY_TIMEOUT, CLIPBOARD_HISTORY_LIMIT, CLIPBOARD_WATCH_INTERVAL,
+                    CLIPBOARD_OWN_WRITES)
+from control.readiness import wait_until
+from control.clipboard_store import ClipboardHistoryStore, content_digest
+from control.clipboard_search import ClipboardSearchIndex, FTS5_TRIGRAM_AVAILABLE
+from control.clipboard_watcher import ClipboardWatcher, system_change_counter
+
+# Optional imports with fallbacks
+try:
+    import win32clipboard
+    import win32con
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+if WIN32_AVAILABLE:
+    # Formats whose data is a GDI handle rather than a memory block; Windows
+    # synthesizes them again from CF_DIB and friends
+    HANDLE_FORMATS = {win32con.CF_BITMAP, win32con.CF_METAFILEPICT, win32con.CF_PALETTE,
+                      win32con.CF_ENHMETAFILE, win32con.CF_OWNERDISPLAY, win32con.CF_DSPBITMAP,
+                      win32con.CF_DSPMETAFILEPICT, win32con.CF_DSPENHMETAFILE}
+
 class ClipboardManager:
     """Advanced clipboard management with history"""
     
-    def __init__(self):
-        self.clipboard_history = []
-        self.max_history = 100
+    def __init__(self, history_store: Optional[ClipboardHistoryStore] = None):
+        self.max_history = CLIPBOARD_HISTORY_LIMIT
+        self.history_store = (history_store if history_store is not None
+                              else ClipboardHistoryStore(max_items=self.max_history))
+        # Written by earlier versions; imported into the store once
         self.history_file = Path("logs/clipboard_history.json")
-        self.history_file.parent.mkdir(exist_ok=True)
         
         # Try to import clipboard libraries
         self.clipboard_available = self._setup_clipboard()
         
         # Load history if available
         self.load_history()
+        
+        # Full-text search index, derived from the history
+        self.search_index = None
+        if FTS5_TRIGRAM_AVAILABLE:
+            try:
+                self.search_index = ClipboardSearchIndex(self.history_store.directory / "search.db")
+                self.search_index.sync(self.history_store)
+            except Exception as e:
+                logging.error(f"Error opening clipboard search index: {e}")
+                self.search_index = None
+        else:
+            logging.warning("SQLite FTS5 trigram search not available, clipboard search will scan the history")
+        
+        # History writes happen on a background thread so callers never wait on disk
+        self._history_queue = queue.Queue()
+        self._history_writer = None
+        self._writer_lock = threading.Lock()
+        self.watcher = None
+        # Digests of content Shadow itself put on the clipboard, oldest first,
+        # so the watcher does not record it as an external copy
+        self._own_writes: Dict[str, bool] = {}
+        self._own_writes_lock = threading.Lock()
     
     def _setup_clipboard(self) -> bool:
         """Setup clipboard functionality"""
@@ -49,6 +96,7 @@ class ClipboardManager:
                 logging.error("Clipboard functionality not available")
                 return False
             
+            self._note_own_write(text)
             if hasattr(self, 'pyperclip'):
                 self.pyperclip.copy(text)
             elif hasattr(self, 'win32clipboard'):
@@ -111,6 +159,80 @@ class ClipboardManager:
             logging.error(f"Error getting clipboard content: {e}")
             return ""
     
+    def set_clipboard_content(self, text: str) -> bool:
+        """Set clipboard content without adding to history"""
+        try:
+            if not self.clipboard_available:
+                return False
+            
+            self._note_own_write(text)
+            if hasattr(self, 'pyperclip'):
+                self.pyperclip.copy(text)
+            elif hasattr(self, 'win32clipboard'):
+                self.win32clipboard.OpenClipboard()
+                self.win32clipboard.EmptyClipboard()
+                self.win32clipboard.SetClipboardText(text)
+                self.win32clipboard.CloseClipboard()
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error setting clipboard content: {e}")
+            return False
+    
+    def save_formats(self) -> Optional[Dict[int, Any]]:
+        """
+        Read every clipboard format that can be put back (Windows only)
+
+        Returns:
+            Format -> data, or None where the clipboard can only hold text
+        """
+        if not WIN32_AVAILABLE:
+            return None
+        formats = {}
+        try:
+            win32clipboard.OpenClipboard()
+            try:
+                clipboard_format = win32clipboard.EnumClipboardFormats(0)
+                while clipboard_format:
+                    if clipboard_format not in HANDLE_FORMATS:
+                        try:
+                            formats[clipboard_format] = win32clipboard.GetClipboardData(clipboard_format)
+                        except Exception as e:
+                            logging.debug(f"Could not read clipboard format {clipboard_format}: {e}")
+                    clipboard_format = win32clipboard.EnumClipboardFormats(clipboard_format)
+            finally:
+                win32clipboard.CloseClipboard()
+            return formats
+        except Exception as e:
+            logging.error(f"Error saving clipboard formats: {e}")
+            return None
+    
+    def restore_formats(self, formats: Dict[int, Any]) -> bool:
+        """Replace the clipboard with formats read by save_formats"""
+        try:
+            text = formats.get(win32con.CF_UNICODETEXT)
+            if isinstance(text, str):
+                self._note_own_write(text)
+            win32clipboard.OpenClipboard()
+            try:
+                win32clipboard.EmptyClipboard()
+                for clipboard_format, data in formats.items():
+                    try:
+                        win32clipboard.SetClipboardData(clipboard_format, data)
+                    except Exception as e:
+                        logging.debug(f"Could not restore clipboard format {clipboard_format}: {e}")
+            finally:
+                win32clipboard.CloseClipboard()
+            return True
+        except Exception as e:
+            logging.error(f"Error restoring clipboard formats: {e}")
+            return False
+    
+    def wait_for_content(self, text: str, timeout: float = CLIPBOARD_VERIFY_TIMEOUT) -> bool:
+        """Wait until the clipboard holds exactly the given text"""
+        return wait_until(lambda: self.get_clipboard_content() == text, timeout,
+                          description="clipboard update")
+    
     def clear_clipboard(self) -> bool:
         """Clear clipboard content"""
         try:
@@ -133,43 +255,131 @@ class ClipboardManager:
             return False
     
     def add_to_history(self, content: str, operation: str):
-        """Add item to clipboard history"""
+        """Queue an item for the clipboard history"""
+        # Don't add empty content
+        if content:
+            self._enqueue_history((content, operation, None, False))
+    
+    def _enqueue_history(self, entry):
+        with self._writer_lock:
+            if not (self._history_writer and self._history_writer.is_alive()):
+                self._history_writer = threading.Thread(target=self._write_history, name="shadow-clipboard-history",
+                                                        daemon=True)
+                self._history_writer.start()
+        self._history_queue.put(entry)
+    
+    def _write_history(self):
+        while True:
+            entry = self._history_queue.get()
+            if isinstance(entry, threading.Event):
+                entry.set()  # A flush marker: everything queued before it is written
+                continue
+            self._store_history_item(*entry)
+    
+    def _store_history_item(self, content: str, operation: str, digest: Optional[str], anywhere: bool):
+        """
+        Append an item unless it repeats the latest item, or (with ``anywhere``)
+        any item in the history
+        """
         try:
-            # Don't add empty content or duplicates
-            if not content or (self.clipboard_history and self.clipboard_history[-1].get('content') == content):
-                return
-            
-            history_item = {
-                'timestamp': datetime.now().isoformat(),
-                'content': content[:1000],  # Limit content length
-                'operation': operation,
-                'length': len(content)
-            }
-            
-            self.clipboard_history.append(history_item)
-            
-            # Keep only last max_history items
-            if len(self.clipboard_history) > self.max_history:
-                self.clipboard_history = self.clipboard_history[-self.max_history:]
+            digest = digest or content_digest(content)
+            if anywhere:
+                if self.history_store.contains(digest):
+                    return
+            else:
+                latest = self.history_store.latest()
+                if latest and latest.get('digest') == digest:
+                    return
             
-            # Save to file
-            self.save_history()
+            # Appends one record; the full content is kept
+            item = self.history_store.append(content, operation, digest=digest)
+            if self.search_index:
+                self.search_index.add(item, self.history_store.first_id())
             
         except Exception as e:
             logging.error(f"Error adding to clipboard history: {e}")
     
+    def flush_history(self, timeout: float = 2.0) -> bool:
+        """Wait until queued history items are written"""
+        if not (self._history_writer and self._history_writer.is_alive()):
+            return True
+        done = threading.Event()
+        self._history_queue.put(done)
+        return done.wait(timeout)
+    
+    def start_watching(self, interval: float = CLIPBOARD_WATCH_INTERVAL) -> bool:
+        """Record text copied in other applications into the history"""
+        if not self.clipboard_available:
+            logging.warning("Clipboard watcher not started: no clipboard library available")
+            return False
+        if self.watcher and self.watcher.running:
+            return True
+        self.watcher = ClipboardWatcher(self.get_clipboard_content, self._on_clipboard_change,
+                                        interval=interval, change_counter=system_change_counter())
+        self.watcher.start()
+        return True
+    
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.stop()
+    
+    def _note_own_write(self, text: str):
+        """Remember content about to be written so the watcher skips it"""
+        with self._own_writes_lock:
+            self._own_writes[content_digest(text)] = True
+            while len(self._own_writes) > CLIPBOARD_OWN_WRITES:
+                del self._own_writes[next(iter(self._own_writes))]
+    
+    def _on_clipboard_change(self, content: str, digest: str):
+        # Shadow's own writes (e.g. text passed through the clipboard by paste_text) are not external copies
+        with self._own_writes_lock:
+            if self._own_writes.pop(digest, False):
+                return
+        # Content already anywhere in the history is skipped
+        self._enqueue_history((content, "external", digest, True))
+    
     def get_history(self, limit: int = 20) -> List[Dict]:
         """Get clipboard history"""
-        return self.clipboard_history[-limit:]
+        self.flush_history()
+        return self.history_store.recent(limit)
     
-    def search_history(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search clipboard history"""
+    def search_history(self, query: str, limit: int = 10, operation: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+        """
+        Search clipboard history
+        
+        Results are ranked by how much of the query they contain (tolerating
+        typos) and how recent they are; each carries a 'score'.
+        
+        Args:
+            operation: Only items recorded by this operation ('copy', 'paste' or 'external')
+            since, until: Only items from this time window
+        """
         try:
+            self.flush_history()
+            if self.search_index:
+                results = []
+                for item_id, score in self.search_index.search(
+                        query, limit, operation=operation,
+                        since=since.timestamp() if since else None,
+                        until=until.timestamp() if until else None):
+                    item = self.history_store.get(item_id)
+                    if item:
+                        item['score'] = round(score, 4)
+                        results.append(item)
+                return results
+            
             query = query.lower()
             results = []
             
-            for item in reversed(self.clipboard_history):
+            for item in self.history_store.iter_newest():
+                if operation and item['operation'] != operation:
+                    continue
+                created = datetime.fromisoformat(item['timestamp'])
+                if (since and created < since) or (until and created > until):
+                    continue
                 if query in item['content'].lower():
+                    item['score'] = 1.0
                     results.append(item)
                     if len(results) >= limit:
                         break
@@ -183,8 +393,9 @@ class ClipboardManager:
     def restore_from_history(self, index: int) -> bool:
         """Restore clipboard content from history"""
         try:
-            if 0 <= index < len(self.clipboard_history):
-                content = self.clipboard_history[-(index + 1)]['content']
+            self.flush_history()
+            if 0 <= index < len(self.history_store):
+                content = self.history_store.recent(index + 1)[0]['content']
                 return self.copy_to_clipboard(content)
             else:
                 logging.error(f"Invalid history index: {index}")
@@ -287,29 +498,28 @@ class ClipboardManager:
             return False
     
     def save_history(self):
-        """Save clipboard history to file"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.clipboard_history, f, indent=2)
-        except Exception as e:
-            logging.error(f"Error saving clipboard history: {e}")
+        """Kept for compatibility: every item is written as it is added"""
     
     def load_history(self):
-        """Load clipboard history from file"""
+        """Import the history file written by earlier versions, once"""
         try:
             if self.history_file.exists():
                 with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.clipboard_history = json.load(f)
-                logging.info(f"Loaded {len(self.clipboard_history)} clipboard history items")
+                    legacy_history = json.load(f)
+                for item in legacy_history:
+                    self.history_store.append(item['content'], item['operation'], timestamp=item['timestamp'])
+                self.history_file.rename(self.history_file.with_suffix('.json.imported'))
+                logging.info(f"Imported {len(legacy_history)} clipboard history items")
         except Exception as e:
             logging.error(f"Error loading clipboard history: {e}")
-            self.clipboard_history = []
     
     def clear_history(self) -> bool:
         """Clear clipboard history"""
         try:
-            self.clipboard_history.clear()
-            self.save_history()
+            self.flush_history()
+            self.history_store.clear()
+            if self.search_index:
+                self.search_index.clear()
             logging.info("Clipboard history cleared")
             return True
         except Exception as e:
@@ -319,25 +529,27 @@ class ClipboardManager:
     def get_statistics(self) -> Dict:
         """Get clipboard usage statistics"""
         try:
+            self.flush_history()
+            history = self.history_store.metadata()
             stats = {
-                'total_items': len(self.clipboard_history),
+                'total_items': len(history),
                 'operations': {},
                 'average_length': 0,
                 'longest_content': 0,
                 'most_recent': None
             }
             
-            if self.clipboard_history:
+            if history:
                 # Count operations
-                for item in self.clipboard_history:
+                for item in history:
                     op = item['operation']
                     stats['operations'][op] = stats['operations'].get(op, 0) + 1
                 
                 # Calculate averages
-                total_length = sum(item['length'] for item in self.clipboard_history)
-                stats['average_length'] = total_length // len(self.clipboard_history)
-                stats['longest_content'] = max(item['length'] for item in self.clipboard_history)
-                stats['most_recent'] = self.clipboard_history[-1]['timestamp']
+                total_length = sum(item['length'] for item in history)
+                stats['average_length'] = total_length // len(history)
+                stats['longest_content'] = max(item['length'] for item in history)
+                stats['most_recent'] = history[-1]['timestamp']
             
             return stats
             
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Clipboard Search Module for Shadow AI
+SQLite FTS5 trigram index over clipboard history with typo-tolerant, recency-weighted ranking
+"""
+
+import math
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import (CLIPBOARD_INDEX_CHARS, CLIPBOARD_SEARCH_CANDIDATES, CLIPBOARD_FUZZY_MIN_MATCH,
+                    CLIPBOARD_RECENCY_HALF_LIFE_DAYS, CLIPBOARD_RECENCY_WEIGHT)
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS items USING fts5(
+        content, operation UNINDEXED, created UNINDEXED, tokenize='trigram'
+    )""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_vocab USING fts5vocab(items, 'row')",
+]
+
+def _fts5_trigram_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(content, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+# Needs SQLite 3.34 or newer built with FTS5
+FTS5_TRIGRAM_AVAILABLE = _fts5_trigram_available()
+
+def trigrams(text: str) -> List[str]:
+    """Distinct lowercase trigrams of a text, in order of first appearance"""
+    text = text.lower()
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+def _timestamp(value: str) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+class ClipboardSearchIndex:
+    """
+    Full-text index of clipboard items in an FTS5 table using the trigram
+    tokenizer, keyed by item id.
+
+    Items containing the query as typed are looked up first. If there are
+    too few, items containing enough of the query's trigrams are found as
+    well, so results survive a few mistyped characters. Candidates are
+    ranked by the share of the query's trigrams they contain (an exact
+    match counts as complete), weighted by how recently they were copied.
+
+    The index is derived from the history store: it is brought in line with
+    it on startup and kept in step by ``add``.
+    """
+
+    def __init__(self, db_path: Path, index_chars: int = CLIPBOARD_INDEX_CHARS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_chars = index_chars
+        self._first_id = 0
+        self._lock = threading.RLock()
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    # Maintenance
+
+    def _insert(self, items: Iterable[Dict]):
+        self.conn.executemany(
+            "INSERT INTO items (rowid, content, operation, created) VALUES (?, ?, ?, ?)",
+            ((item['id'], item['content'][:self.index_chars], item['operation'],
+              _timestamp(item['timestamp'])) for item in items))
+
+    def add(self, item: Dict, first_id: Optional[int] = None):
+        """
+        Index a new item
+
+        Args:
+            first_id: Oldest id still in the history; older items are dropped
+        """
+        with self._lock:
+            self._insert([item])
+            if first_id is not None:
+                self._evict(first_id)
+            self.conn.commit()
+
+    def _evict(self, first_id: int):
+        if first_id > self._first_id:
+            self.conn.execute("DELETE FROM items WHERE rowid < ?", (first_id,))
+            self._first_id = first_id
+
+    def sync(self, store) -> int:
+        """
+        Bring the index in line with a ClipboardHistoryStore
+
+        Returns:
+            Number of items indexed
+        """
+        with self._lock:
+            last_indexed = self.conn.execute("SELECT MAX(rowid) FROM items").fetchone()[0] or 0
+            latest = store.latest()
+            if latest is None or last_indexed > latest['id']:
+                # The history was cleared or replaced
+                self.conn.execute("DELETE FROM items")
+                last_indexed = 0
+                self._first_id = 0
+            missing = list(store.iter_after(last_indexed))
+            self._insert(missing)
+            first_id = store.first_id()
+            if first_id is not None:
+                self._evict(first_id)
+            self.conn.commit()
+        if missing:
+            logging.info(f"Indexed {len(missing)} clipboard history items")
+        return len(missing)
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM items")
+            self.conn.commit()
+            self._first_id = 0
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # Search
+
+    def _indexed(self, grams: List[str]) -> List[str]:
+        """The query trigrams that occur in the index, rarest first"""
+        placeholders = ",".join("?" * len(grams))
+        rows = self.conn.execute(
+            f"SELECT term, doc FROM items_vocab WHERE term IN ({placeholders})", grams).fetchall()
+        return [term for term, _ in sorted(rows, key=lambda row: row[1])]
+
+    def _candidates(self, query: str, grams: List[str], filters: str, params: List,
+                    limit: int, min_match: float) -> List[Tuple]:
+        columns = "SELECT rowid, content, operation, created FROM items"
+        if not grams:
+            # Too short for trigrams: the tokenizer still serves LIKE, with a scan
+            pattern = '%' + query.replace('%', '').replace('_', '') + '%'
+            sql = f"{columns} WHERE content LIKE ?{filters} ORDER BY rowid DESC LIMIT ?"
+            return self.conn.execute(sql, [pattern] + params + [limit]).fetchall()
+
+        # Newest items holding the query as is
+        sql = f"{columns} WHERE items MATCH ?{filters} ORDER BY rowid DESC LIMIT ?"
+        rows = self.conn.execute(sql, [_quote(query)] + params + [limit]).fetchall()
+        if len(rows) >= limit:
+            return rows
+
+        # An item holding at least k of the n indexed trigrams must hold one
+        # of any n - k + 1 of them, so matching the rarest ones finds every
+        # fuzzy match while reading the shortest posting lists
+        needed = max(1, math.ceil(min_match * len(grams)))
+        indexed = self._indexed(grams)
+        rare = indexed[:len(indexed) - needed + 1]
+        if rare:
+            match = " OR ".join(_quote(gram) for gram in rare)
+            seen = {row[0] for row in rows}
+            rows += [row for row in self.conn.execute(sql, [match] + params + [limit]).fetchall()
+                     if row[0] not in seen]
+        return rows
+
+    def search(self, query: str, limit: int = 10, operation: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               recency_weight: float = CLIPBOARD_RECENCY_WEIGHT,
+               min_match: float = CLIPBOARD_FUZZY_MIN_MATCH) -> List[Tuple[int, float]]:
+        """
+        Find items matching a query
+
+        Args:
+            operation: Only items recorded by this operation ('copy', 'paste', ...)
+            since, until: Only items created in this time window (epoch seconds)
+            recency_weight: Share of the score (0-1) that depends on the item's age
+            min_match: Minimum share of the query's trigrams an item must contain
+
+        Returns:
+            (item id, score) pairs, best first
+        """
+        query = query.strip()
+        if not query:
+            return []
+        filters, params = "", []
+        if operation:
+            filters += " AND operation = ?"
+            params.append(operation)
+        if since is not None:
+            filters += " AND created >= ?"
+            params.append(since)
+        if until is not None:
+            filters += " AND created <= ?"
+            params.append(until)
+
+        grams = trigrams(query)
+        with self._lock:
+            rows = self._candidates(query, grams, filters, params,
+                                    max(limit, CLIPBOARD_SEARCH_CANDIDATES), min_match)
+
+        lowered = query.lower()
+        now = time.time()
+        half_life = CLIPBOARD_RECENCY_HALF_LIFE_DAYS * 86400
+        results = []
+        for item_id, content, _, created in rows:
+            text = content.lower()
+            if lowered in text:
+                relevance = 1.0
+            elif grams:
+                relevance = sum(gram in text for gram in grams) / len(grams)
+                if relevance < min_match:
+                    continue
+                relevance *= 0.9  # Below any exact match of the same coverage
+            else:
+                continue
+            recency = math.pow(0.5, max(0.0, now - created) / half_life)
+            results.append((item_id, relevance * (1 - recency_weight + recency_weight * recency)))
+        results.sort(key=lambda result: (-result[1], -result[0]))
+        return results[:limit]
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Clipboard Store Module for Shadow AI
+Append-only, segmented clipboard history log with compression and compaction
+"""
+
+import os
+import json
+import zlib
+import base64
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import CLIPBOARD_HISTORY_LIMIT, CLIPBOARD_COMPRESS_BYTES, CLIPBOARD_SEGMENT_BYTES
+
+def content_digest(content: str) -> str:
+    """Short content hash used to recognise repeated clipboard content"""
+    return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+class ClipboardHistoryStore:
+    """
+    Clipboard history kept as JSON lines appended to numbered segment files.
+
+    Adding an item writes one line to the newest segment, so its cost does
+    not depend on the size of the history. Content is stored in full; items
+    longer than ``compress_bytes`` are zlib-compressed, on disk and in memory,
+    and only decompressed when read. A segment is closed once it reaches
+    ``segment_bytes``.
+
+    Items beyond ``max_items`` are dropped from memory at once and from disk
+    by compaction, which rewrites the closed segments into one holding only
+    the retained items. It runs on a background thread once the dead items
+    amount to a quarter of the limit.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_items: int = CLIPBOARD_HISTORY_LIMIT,
+                 compress_bytes: int = CLIPBOARD_COMPRESS_BYTES, segment_bytes: int = CLIPBOARD_SEGMENT_BYTES):
+        self.directory = Path(directory) if directory else Path.home() / ".shadow_ai" / "clipboard"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_items = max(1, max_items)
+        self.compress_bytes = compress_bytes
+        self.segment_bytes = segment_bytes
+        self._items: List[Dict] = []  # Oldest first; large content held compressed
+        self._digests: Dict[str, int] = {}  # Content digest -> newest item id holding it
+        self._next_id = 1
+        self._disk_items = 0  # Records in the segment files, retained or not
+        self._live_records = 0  # Records in the segment being appended to
+        self._lock = threading.RLock()
+        self._compacting: Optional[threading.Thread] = None
+        self._generation = 0  # Bumped by clear() so a running compaction is discarded
+        self._segment = None
+        self._segment_number = 0
+        self._load()
+        self._open_segment()
+
+    # Segment files
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob("segment-*.jsonl"), key=lambda p: int(p.stem.split('-')[1]))
+
+    def _open_segment(self, number: Optional[int] = None):
+        if self._segment:
+            self._segment.close()
+        segments = self._segments()
+        if number is None:
+            number = int(segments[-1].stem.split('-')[1]) if segments else 1
+        if number != self._segment_number:
+            self._live_records = 0
+        self._segment_number = number
+        self._segment = open(self.directory / f"segment-{number:06d}.jsonl", 'a', encoding='utf-8')
+
+    def _roll_segment(self):
+        self._open_segment(self._segment_number + 1)
+
+    def _load(self):
+        for segment in self._segments():
+            self._segment_number = int(segment.stem.split('-')[1])
+            self._live_records = 0
+            offset = 0
+            tail = None  # (start, parsed) of a last line without its newline
+            with open(segment, 'rb') as f:
+                for line in f:
+                    start, offset = offset, offset + len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a partial last line
+                        logging.warning(f"Skipping damaged clipboard record in {segment.name}")
+                        if not line.endswith(b"\n"):
+                            tail = (start, False)
+                        continue
+                    if not line.endswith(b"\n"):
+                        tail = (start, True)
+                    self._disk_items += 1
+                    self._live_records += 1
+                    # Segments left behind by an interrupted compaction repeat older items
+                    if record['id'] < self._next_id:
+                        continue
+                    self._items.append(self._from_record(record))
+                    self._next_id = record['id'] + 1
+            if tail:
+                self._repair_tail(segment, *tail)
+        del self._items[:-self.max_items]
+        self._digests = {item['digest']: item['id'] for item in self._items}
+        if self._items:
+            logging.info(f"Loaded {len(self._items)} clipboard history items")
+
+    @staticmethod
+    def _repair_tail(segment: Path, start: int, parsed: bool):
+        """End a segment on a full line, so the next append starts a record of its own"""
+        if parsed:
+            with open(segment, 'ab') as f:
+                f.write(b"\n")
+        else:
+            os.truncate(segment, start)
+
+    # Records
+
+    def _to_record(self, item: Dict) -> Dict:
+        record = {key: value for key, value in item.items() if key != 'blob'}
+        if 'blob' in item:
+            record['content_z'] = base64.b64encode(item['blob']).decode('ascii')
+        return record
+
+    @staticmethod
+    def _from_record(record: Dict) -> Dict:
+        if 'content_z' in record:
+            record['blob'] = base64.b64decode(record.pop('content_z'))
+        return record
+
+    @staticmethod
+    def _public(item: Dict) -> Dict:
+        public = {key: value for key, value in item.items() if key != 'blob'}
+        if 'blob' in item:
+            public['content'] = zlib.decompress(item['blob']).decode('utf-8', 'surrogatepass')
+        return public
+
+    # Writing
+
+    def append(self, content: str, operation: str, timestamp: Optional[str] = None,
+               digest: Optional[str] = None) -> Dict:
+        """Add an item and return it"""
+        with self._lock:
+            item = {
+                'id': self._next_id,
+                'timestamp': timestamp or datetime.now().isoformat(),
+                'operation': operation,
+                'length': len(content),
+                'digest': digest or content_digest(content)
+            }
+            if len(content) > self.compress_bytes:
+                item['blob'] = zlib.compress(content.encode('utf-8', 'surrogatepass'), 6)
+            else:
+                item['content'] = content
+            self._next_id += 1
+
+            self._segment.write(json.dumps(self._to_record(item)) + "\n")
+            self._segment.flush()
+            self._disk_items += 1
+            self._live_records += 1
+            self._items.append(item)
+            self._digests[item['digest']] = item['id']
+            if len(self._items) > self.max_items:
+                self._drop_oldest(len(self._items) - self.max_items)
+
+            if self._segment.tell() >= self.segment_bytes:
+                self._roll_segment()
+            if self._disk_items - len(self._items) >= max(1, self.max_items // 4):
+                self._start_compaction()
+        return self._public(item)
+
+    def _drop_oldest(self, count: int):
+        for item in self._items[:count]:
+            if self._digests.get(item['digest']) == item['id']:
+                del self._digests[item['digest']]
+        del self._items[:count]
+
+    def _start_compaction(self):
+        if self._compacting and self._compacting.is_alive():
+            return
+        self._compacting = threading.Thread(target=self.compact, name="shadow-clipboard-compact", daemon=True)
+        self._compacting.start()
+
+    def compact(self):
+        """Rewrite the closed segments, keeping only items still in the history"""
+        with self._lock:
+            # Later appends go to a fresh segment that compaction leaves alone,
+            # so the retained items are exactly the ones in closed segments
+            self._roll_segment()
+            closed = [s for s in self._segments() if int(s.stem.split('-')[1]) < self._segment_number]
+            kept = list(self._items)
+            generation = self._generation
+        if not closed:
+            return
+
+        tmp_path = self.directory / "compacting.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for item in kept:
+                    f.write(json.dumps(self._to_record(item)) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                if generation != self._generation:
+                    tmp_path.unlink()
+                    return
+                os.replace(tmp_path, closed[0])
+                for segment in closed[1:]:
+                    segment.unlink()
+                self._disk_items = len(kept) + self._live_records
+            logging.info(f"Compacted clipboard history to {len(kept)} items")
+        except Exception as e:
+            logging.error(f"Error compacting clipboard history: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete every item"""
+        with self._lock:
+            self._segment.close()
+            self._segment = None
+            for segment in self._segments():
+                segment.unlink()
+            self._items.clear()
+            self._digests.clear()
+            self._generation += 1
+            self._disk_items = 0
+            self._segment_number = 0
+            self._open_segment(1)
+
+    def close(self):
+        with self._lock:
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+
+    # Reading
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def contains(self, digest: str) -> bool:
+        """Whether any item in the history has this content digest"""
+        return digest in self._digests
+
+    def latest(self) -> Optional[Dict]:
+        """The newest item's metadata (no content)"""
+        with self._lock:
+            if not self._items:
+                return None
+            return {key: value for key, value in self._items[-1].items() if key not in ('content', 'blob')}
+
+    def recent(self, limit: int) -> List[Dict]:
+        """The newest ``limit`` items, oldest first"""
+        with self._lock:
+            items = self._items[-limit:] if limit > 0 else []
+        return [self._public(item) for item in items]
+
+    def _position(self, item_id: int) -> int:
+        """Index of the first item with an id of at least ``item_id``"""
+        # Ids are usually consecutive, so try the direct offset before bisecting
+        position = item_id - self._items[0]['id'] if self._items else 0
+        if 0 <= position < len(self._items) and self._items[position]['id'] == item_id:
+            return position
+        low, high = 0, len(self._items)
+        while low < high:
+            middle = (low + high) // 2
+            if self._items[middle]['id'] < item_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        """An item by id, if it is still in the history"""
+        with self._lock:
+            position = self._position(item_id)
+            if position >= len(self._items) or self._items[position]['id'] != item_id:
+                return None
+            item = self._items[position]
+        return self._public(item)
+
+    def first_id(self) -> Optional[int]:
+        with self._lock:
+            return self._items[0]['id'] if self._items else None
+
+    def iter_after(self, item_id: int) -> Iterator[Dict]:
+        """Items with ids above ``item_id``, oldest first"""
+        with self._lock:
+            items = self._items[self._position(item_id + 1):]
+        for item in items:
+            yield self._public(item)
+
+    def iter_newest(self) -> Iterator[Dict]:
+        """Items newest first, decompressed as they are reached"""
+        with self._lock:
+            items = list(self._items)
+        for item in reversed(items):
+            yield self._public(item)
+
+    def metadata(self) -> List[Dict]:
+        """Items without content, oldest first"""
+        with self._lock:
+            return [{key: value for key, value in item.items() if key not in ('content', 'blob')}
+                    for item in self._items]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Clipboard Watcher Module for Shadow AI
+Background detection of clipboard changes made by other applications
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from config import CLIPBOARD_WATCH_INTERVAL
+from control.clipboard_store import content_digest
+
+# Optional imports with fallbacks
+try:
+    import win32clipboard
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+try:
+    from AppKit import NSPasteboard
+    APPKIT_AVAILABLE = True
+except ImportError:
+    APPKIT_AVAILABLE = False
+
+ChangeCallback = Callable[[str, str], None]
+
+def system_change_counter() -> Optional[Callable[[], int]]:
+    """
+    A cheap counter the OS bumps whenever the clipboard changes, if there is one
+
+    Windows has the clipboard sequence number and macOS the pasteboard change
+    count; elsewhere the content itself has to be compared.
+    """
+    if WIN32_AVAILABLE:
+        return win32clipboard.GetClipboardSequenceNumber
+    if APPKIT_AVAILABLE:
+        pasteboard = NSPasteboard.generalPasteboard()
+        return pasteboard.changeCount
+    return None
+
+class ClipboardWatcher:
+    """
+    Polls for clipboard changes on a daemon thread and reports new text.
+
+    Where the OS offers a change counter, a poll only reads that counter and
+    the clipboard content is fetched after it moves. Otherwise the content
+    is read on every poll and compared by hash. Either way ``on_change`` is
+    called once per distinct content, with the text and its digest, on the
+    watcher thread.
+    """
+
+    def __init__(self, read_text: Callable[[], str], on_change: ChangeCallback,
+                 interval: float = CLIPBOARD_WATCH_INTERVAL,
+                 change_counter: Optional[Callable[[], int]] = None):
+        self.read_text = read_text
+        self.on_change = on_change
+        self.interval = interval
+        self.change_counter = change_counter
+        self.stats = {'polls': 0, 'reads': 0, 'changes': 0}
+        self._last_counter = None
+        self._last_digest = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="shadow-clipboard-watch", daemon=True)
+        self._thread.start()
+        mode = "change counter" if self.change_counter else "content polling"
+        logging.info(f"Clipboard watcher started ({mode})")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"Error watching clipboard: {e}")
+            if self._stop_event.wait(self.interval):
+                break
+
+    def poll(self) -> bool:
+        """Check the clipboard once; returns True if new content was reported"""
+        self.stats['polls'] += 1
+        if self.change_counter:
+            counter = self.change_counter()
+            if counter == self._last_counter:
+                return False
+            self._last_counter = counter
+
+        text = self.read_text()
+        self.stats['reads'] += 1
+        if not text:
+            return False
+        digest = content_digest(text)
+        if digest == self._last_digest:
+            return False
+        self._last_digest = digest
+        self.stats['changes'] += 1
+        self.on_change(text, digest)
+        return True
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, running=self.running, uses_change_counter=bool(self.change_counter))
@@ -4,7 +4,15 @@ import subprocess
 import logging
 import time
 import os
-from config import DESKTOP_PATH
+from config import (
+    DESKTOP_PATH, PYAUTOGUI_PAUSE, READINESS_TIMEOUT, SAVE_DIALOG_TIMEOUT, PASTE_THRESHOLD_CHARS,
+    TYPING_CHUNK_SIZE, TYPING_INTERVAL, CLIPBOARD_PASTE_SETTLE
+)
+from control.clipboard_manager import clipboard_manager
+from control.readiness import (
+    get_foreground_window, wait_for_foreground_change, wait_for_dialog,
+    wait_for_process, wait_for_window
+)
 
 # Optional imports with fallbacks
 try:
@@ -24,7 +32,7 @@ except ImportError:
     WIN32_AVAILABLE = False
 
 # Configure pyautogui
-pyautogui.PAUSE = 0.5
+pyautogui.PAUSE = PYAUTOGUI_PAUSE
 pyautogui.FAILSAFE = True
 
 class DesktopController:
@@ -61,11 +69,63 @@ class DesktopController:
             logging.error(f"Error opening application {app_name}: {e}")
             return False
     
+    def launch_application(self, command: list, window_title: str = None,
+                           timeout: float = READINESS_TIMEOUT, process_name: str = None) -> bool:
+        """Launch a process and wait until its window reaches the foreground
+        
+        Args:
+            process_name: Executable name to wait for before looking for the window
+        
+        Returns:
+            True once the new window is ready, False if it did not appear in time
+        """
+        previous_window, _ = get_foreground_window()
+        subprocess.Popen(command)
+        if process_name and not wait_for_process(process_name, timeout):
+            logging.warning(f"{process_name} was launched but did not start in time")
+            return False
+        ready = wait_for_foreground_change(previous_window, window_title, timeout)
+        if not ready and window_title:
+            # The window may have opened behind the current one
+            ready = wait_for_window(window_title, timeout=0)
+        if not ready:
+            logging.warning(f"{command[0]} launched but its window was not detected in time")
+        return ready
+    
+    def save_as(self, filename: str, timeout: float = READINESS_TIMEOUT) -> bool:
+        """Save the active document under a filename via the Save As dialog"""
+        try:
+            document_window, _ = get_foreground_window()
+            pyautogui.hotkey('ctrl', 's')
+            appeared, dialog = wait_for_dialog(document_window, timeout=SAVE_DIALOG_TIMEOUT)
+            if not appeared:
+                # A document that already has a file is saved in place; ask for Save As
+                pyautogui.hotkey('ctrl', 'shift', 's')
+                appeared, dialog = wait_for_dialog(document_window, timeout=timeout)
+            if not appeared:
+                logging.error("Save dialog did not appear")
+                return False
+            
+            # Replace any suggested filename
+            pyautogui.hotkey('ctrl', 'a')
+            pyautogui.typewrite(filename, interval=0.01)
+            pyautogui.press('enter')
+            
+            if dialog is not None and not wait_for_foreground_change(dialog, timeout=timeout):
+                logging.error(f"Save dialog did not close after saving {filename}")
+                return False
+            
+            logging.info(f"Saved document as {filename}")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving document as {filename}: {e}")
+            return False
+    
     def open_notepad(self) -> bool:
         """Open Notepad"""
         try:
             if platform.system() == "Windows":
-                subprocess.Popen(["notepad.exe"])
+                self.launch_application(["notepad.exe"], "Notepad")
                 logging.info("Opened Notepad")
                 return True
             else:
@@ -79,7 +139,7 @@ class DesktopController:
         """Open Calculator"""
         try:
             if platform.system() == "Windows":
-                subprocess.Popen(["calc.exe"])
+                self.launch_application(["calc.exe"], "Calculator")
                 logging.info("Opened Calculator")
                 return True
             else:
@@ -93,7 +153,7 @@ class DesktopController:
         """Open Paint"""
         try:
             if platform.system() == "Windows":
-                subprocess.Popen(["mspaint.exe"])
+                self.launch_application(["mspaint.exe"], "Paint")
                 logging.info("Opened Paint")
                 return True
             else:
@@ -107,7 +167,7 @@ class DesktopController:
         """Open Command Prompt"""
         try:
             if platform.system() == "Windows":
-                subprocess.Popen(["cmd.exe"])
+                self.launch_application(["cmd.exe"], None)
                 logging.info("Opened Command Prompt")
                 return True
             else:
@@ -121,7 +181,7 @@ class DesktopController:
         """Open File Explorer"""
         try:
             if platform.system() == "Windows":
-                subprocess.Popen(["explorer.exe"])
+                self.launch_application(["explorer.exe"], None)
                 logging.info("Opened File Explorer")
                 return True
             else:
@@ -141,7 +201,7 @@ class DesktopController:
             
             for path in chrome_paths:
                 if os.path.exists(path):
-                    subprocess.Popen([path])
+                    self.launch_application([path], "Chrome", process_name="chrome.exe")
                     logging.info("Opened Chrome")
                     return True
             
@@ -162,7 +222,7 @@ class DesktopController:
             
             for path in firefox_paths:
                 if os.path.exists(path):
-                    subprocess.Popen([path])
+                    self.launch_application([path], "Firefox", process_name="firefox.exe")
                     logging.info("Opened Firefox")
                     return True
             
@@ -175,7 +235,7 @@ class DesktopController:
     def open_edge(self) -> bool:
         """Open Microsoft Edge"""
         try:
-            subprocess.Popen(["msedge.exe"])
+            self.launch_application(["msedge.exe"], "Edge", process_name="msedge.exe")
             logging.info("Opened Edge")
             return True
         except Exception as e:
@@ -185,17 +245,18 @@ class DesktopController:
     def open_via_search(self, app_name: str) -> bool:
         """Open application via Windows search"""
         try:
-            # Press Windows key
+            # Press Windows key and wait for the search panel
+            previous_window, _ = get_foreground_window()
             pyautogui.press('win')
-            time.sleep(1)
+            wait_for_foreground_change(previous_window)
             
             # Type application name
+            search_window, _ = get_foreground_window()
             pyautogui.typewrite(app_name)
-            time.sleep(1)
             
-            # Press Enter
+            # Press Enter and wait for the application to take focus
             pyautogui.press('enter')
-            time.sleep(2)
+            wait_for_foreground_change(search_window)
             
             logging.info(f"Attempted to open {app_name} via Windows search")
             return True
@@ -214,6 +275,79 @@ class DesktopController:
             logging.error(f"Error typing text: {e}")
             return False
     
+    def insert_text(self, text: str, interval: float = TYPING_INTERVAL,
+                    paste_threshold: int = PASTE_THRESHOLD_CHARS) -> bool:
+        """
+        Insert text at the cursor using the fastest reliable method
+
+        Long text (and anything pyautogui cannot type, e.g. non-ASCII) is pasted
+        through the clipboard; short text is typed in chunks. Falls back to
+        typing when the clipboard cannot be used.
+        """
+        if not text:
+            return False
+        
+        if (len(text) >= paste_threshold or not text.isascii()) and clipboard_manager.clipboard_available:
+            if self.paste_text(text):
+                return True
+            logging.warning("Clipboard paste failed, falling back to typing")
+        
+        return self.type_text_chunked(text, interval)
+    
+    def type_text_chunked(self, text: str, interval: float = TYPING_INTERVAL,
+                          chunk_size: int = TYPING_CHUNK_SIZE) -> bool:
+        """Type text in chunks so long input can be interrupted between chunks"""
+        try:
+            for start in range(0, len(text), chunk_size):
+                pyautogui.typewrite(text[start:start + chunk_size], interval=interval)
+            logging.info(f"Typed text ({len(text)} characters): {text[:50]}...")
+            return True
+        except Exception as e:
+            logging.error(f"Error typing text: {e}")
+            return False
+    
+    def paste_text(self, text: str) -> bool:
+        """
+        Paste text through the clipboard, then put back what the clipboard held before
+
+        Returns False only when nothing was pasted (the clipboard could not be
+        set), so callers can fall back to typing without inserting the text twice.
+        """
+        # Where the platform allows, every format is saved so images and rich text survive
+        saved_formats = clipboard_manager.save_formats()
+        previous = clipboard_manager.get_clipboard_content() if saved_formats is None else None
+        pasted = False
+        try:
+            if not clipboard_manager.set_clipboard_content(text) or not clipboard_manager.wait_for_content(text):
+                logging.error("Could not place text on the clipboard")
+                return False
+            
+            modifier = 'command' if platform.system() == 'Darwin' else 'ctrl'
+            pyautogui.hotkey(modifier, 'v')
+            pasted = True
+            
+            # The target application reads the clipboard asynchronously
+            time.sleep(CLIPBOARD_PASTE_SETTLE)
+            if clipboard_manager.get_clipboard_content() != text:
+                logging.warning("Clipboard changed during paste, inserted text may be wrong")
+            
+            logging.info(f"Pasted text ({len(text)} characters): {text[:50]}...")
+            return True
+        except Exception as e:
+            logging.error(f"Error pasting text: {e}")
+            # Once the keystroke is sent, typing as well would insert the text twice
+            return pasted
+        finally:
+            if saved_formats is not None:
+                restored = clipboard_manager.restore_formats(saved_formats)
+            else:
+                # Without format access only text can be put back; an empty
+                # clipboard is cleared so the pasted text does not linger on it
+                restored = (clipboard_manager.set_clipboard_content(previous)
+                            and clipboard_manager.wait_for_content(previous))
+            if not restored:
+                logging.warning("Could not restore previous clipboard content")
+    
     def click_at(self, x: int, y: int, button: str = 'left', clicks: int = 1) -> bool:
         """Click at specific coordinates"""
         try:
@@ -465,6 +599,10 @@ def type_text(text: str) -> bool:
     """Type text"""
     return desktop_controller.type_text(text)
 
+def insert_text(text: str) -> bool:
+    """Insert text by paste or typing, whichever is faster"""
+    return desktop_controller.insert_text(text)
+
 def click_at(x: int, y: int) -> bool:
     """Click at coordinates"""
     return desktop_controller.click_at(x, y)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Duplicate Finder Module for Shadow AI
+Finds files with identical content by size, then sampled hashes, then full hashes
+"""
+
+import mmap
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import DUPLICATE_SAMPLE_BYTES, DUPLICATE_HASH_WORKERS, HASH_CHUNK_BYTES
+from control.file_scanner import file_scanner, ScanEntry
+
+def sample_hash(path: str, size: int, sample_bytes: int = DUPLICATE_SAMPLE_BYTES) -> Optional[str]:
+    """Hash the first and last ``sample_bytes`` of a file (the whole file if it is small)"""
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            digest.update(f.read(sample_bytes))
+            if size > sample_bytes:
+                f.seek(max(sample_bytes, size - sample_bytes))
+                digest.update(f.read(sample_bytes))
+        return digest.hexdigest()
+    except OSError as e:
+        logging.debug(f"Cannot read {path}: {e}")
+        return None
+
+def full_hash(path: str, chunk_bytes: int = HASH_CHUNK_BYTES) -> Optional[str]:
+    """Streaming BLAKE2b hash of a whole file, reading through mmap where possible"""
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        for start in range(0, len(view), chunk_bytes):
+                            digest.update(view[start:start + chunk_bytes])
+                    finally:
+                        view.release()
+            except (ValueError, OSError):
+                # Empty files and some special files cannot be mapped
+                f.seek(0)
+                for chunk in iter(lambda: f.read(chunk_bytes), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+    except OSError as e:
+        logging.debug(f"Cannot read {path}: {e}")
+        return None
+
+def content_key(path: str, size: int, sample_bytes: int = DUPLICATE_SAMPLE_BYTES) -> Optional[str]:
+    """
+    Key identifying a file's content: its size plus a hash of every byte
+
+    Files no larger than two samples are hashed by ``sample_hash``, which then
+    covers the whole file; larger files get a full hash.
+    """
+    digest = sample_hash(path, size, sample_bytes) if size <= 2 * sample_bytes else full_hash(path)
+    return None if digest is None else f"{size}:{digest}"
+
+class DuplicateFinder:
+    """
+    Staged content-based duplicate detection.
+
+    1. Group files by size; a file with a unique size cannot have a duplicate.
+    2. Hash the first and last ``DUPLICATE_SAMPLE_BYTES`` of same-size files.
+    3. Fully hash only files whose sampled hashes still collide. Files small
+       enough to be covered entirely by the sample skip this stage.
+
+    Hashing runs on a thread pool; hashlib releases the GIL on large buffers.
+    """
+
+    def __init__(self, max_workers: int = DUPLICATE_HASH_WORKERS,
+                 sample_bytes: int = DUPLICATE_SAMPLE_BYTES):
+        self.max_workers = max_workers
+        self.sample_bytes = sample_bytes
+        self.stats = {}
+
+    def find(self, *roots: str, min_size: int = 1,
+             cancel_event: Optional[threading.Event] = None,
+             progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict[str, List[str]]:
+        """
+        Find duplicate files below the given roots
+
+        Returns:
+            Mapping of content hash -> paths of files with that content
+        """
+        entries = file_scanner.scan_files(*roots, cancel_event=cancel_event,
+                                          progress_callback=progress_callback)
+        return self.find_in(entries, min_size=min_size, cancel_event=cancel_event)
+
+    def find_in(self, entries: Iterable[ScanEntry], min_size: int = 1,
+                cancel_event: Optional[threading.Event] = None,
+                known_keys: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
+        """
+        Find duplicates among already scanned entries
+
+        Args:
+            known_keys: Content keys (path -> key) computed earlier, e.g. cached by
+                the file index. Those files are not read again, and the keys of
+                newly hashed files are added to the mapping.
+        """
+        if known_keys is None:
+            known_keys = {}
+        stats = {'files': 0, 'total_bytes': 0, 'sampled_files': 0, 'fully_hashed_files': 0,
+                 'bytes_read': 0, 'duplicate_groups': 0}
+
+        # Stage 1: size groups; hard links to the same inode are one file
+        by_size: Dict[int, List[ScanEntry]] = {}
+        seen_inodes = set()
+        for entry in entries:
+            stats['files'] += 1
+            stats['total_bytes'] += entry.size
+            if entry.size < min_size:
+                continue
+            if entry.inode:
+                inode_key = (entry.device, entry.inode)
+                if inode_key in seen_inodes:
+                    continue
+                seen_inodes.add(inode_key)
+            by_size.setdefault(entry.size, []).append(entry)
+
+        by_content: Dict[str, List[str]] = {}
+        staged, needs_key = [], []
+        for group in by_size.values():
+            if len(group) < 2:
+                continue
+            unknown = [entry for entry in group if entry.path not in known_keys]
+            for entry in group:
+                if entry.path in known_keys:
+                    by_content.setdefault(known_keys[entry.path], []).append(entry.path)
+            if len(unknown) == len(group):
+                staged.extend(unknown)
+            else:
+                # Unknown files must be comparable with the known keys
+                needs_key.extend(unknown)
+
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        def add_key(entry: ScanEntry, key: Optional[str]):
+            if key is not None:
+                known_keys[entry.path] = key
+                by_content.setdefault(key, []).append(entry.path)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-hash") as pool:
+            # Stage 2: sampled hashes
+            if cancelled():
+                staged = []
+            sampled = pool.map(lambda e: sample_hash(e.path, e.size, self.sample_bytes), staged)
+            by_sample: Dict[Tuple[int, str], List[ScanEntry]] = {}
+            for entry, digest in zip(staged, sampled):
+                stats['sampled_files'] += 1
+                stats['bytes_read'] += min(entry.size, 2 * self.sample_bytes)
+                if digest is None:
+                    continue
+                if entry.size <= 2 * self.sample_bytes:
+                    # The sample already covered every byte
+                    add_key(entry, f"{entry.size}:{digest}")
+                else:
+                    by_sample.setdefault((entry.size, digest), []).append(entry)
+
+            # Stage 3: full hashes for remaining collisions
+            needs_key.extend(entry for group in by_sample.values() if len(group) > 1 for entry in group)
+            if cancelled():
+                needs_key = []
+            keys = pool.map(lambda e: content_key(e.path, e.size, self.sample_bytes), needs_key)
+            for entry, key in zip(needs_key, keys):
+                if entry.size > 2 * self.sample_bytes:
+                    stats['fully_hashed_files'] += 1
+                    stats['bytes_read'] += entry.size
+                else:
+                    stats['sampled_files'] += 1
+                    stats['bytes_read'] += entry.size
+                add_key(entry, key)
+
+        duplicates = {key: paths for key, paths in by_content.items() if len(paths) > 1}
+        stats['duplicate_groups'] = len(duplicates)
+        self.stats = stats
+        logging.info(f"Found {len(duplicates)} duplicate groups among {stats['files']} files "
+                     f"(read {stats['bytes_read'] // (1024 * 1024)}MB of {stats['total_bytes'] // (1024 * 1024)}MB)")
+        return duplicates
+
+# Global instance
+duplicate_finder = DuplicateFinder()
@@ -9,6 +9,7 @@ import subprocess
 import logging
 from pathlib import Path
 from control.desktop import DesktopController
+from control.readiness import wait_for_foreground_title
 
 class EnhancedController(DesktopController):
     """Enhanced version of DesktopController with AI article generation"""
@@ -36,14 +37,15 @@ class EnhancedController(DesktopController):
                 return False
             
             # Wait for Notepad to be ready
-            time.sleep(2)
+            if not wait_for_foreground_title("Notepad"):
+                logging.warning("Notepad window not detected in the foreground, typing anyway")
             
             # Step 2: Generate article content
             article_content = self._get_article_content(topic.lower())
             
-            # Step 3: Type the article
+            # Step 3: Insert the article
             logging.info("Writing article content...")
-            success = self.type_text(article_content, interval=0.02)  # Faster typing
+            success = self.insert_text(article_content)
             
             if success:
                 logging.info(f"Successfully wrote article about {topic}")
@@ -67,19 +69,8 @@ class EnhancedController(DesktopController):
             
             # Step 2: Save the file if filename is provided
             if filename:
-                time.sleep(1)  # Wait for content to be fully typed
-                
-                # Use Ctrl+S to save
-                self.key_combination(['ctrl', 's'])
-                time.sleep(1)
-                
-                # Type the filename
-                self.type_text(filename, interval=0.05)
-                time.sleep(0.5)
-                
-                # Press Enter to save
-                self.press_key('enter')
-                time.sleep(0.5)
+                if not self.save_as(filename):
+                    return False
                 
                 logging.info(f"Article saved as {filename}")
                 
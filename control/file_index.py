@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+File Index Module for Shadow AI
+Persistent SQLite index of file metadata, refreshed incrementally by directory mtimes
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import FILE_SCAN_WORKERS, FILE_INDEX_REFRESH_INTERVAL, FILE_INDEX_FULL_REFRESH_HOURS
+from control.file_scanner import FileScanner, ScanEntry
+from control.duplicate_finder import duplicate_finder
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS directories (
+        path TEXT PRIMARY KEY,
+        parent TEXT,
+        mtime_ns INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_directories_parent ON directories(parent)",
+    """CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        directory TEXT NOT NULL,
+        name TEXT NOT NULL,
+        extension TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        inode INTEGER,
+        device INTEGER,
+        content_key TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_files_directory ON files(directory)",
+    "CREATE INDEX IF NOT EXISTS idx_files_size ON files(size)",
+    "CREATE INDEX IF NOT EXISTS idx_files_extension ON files(extension)",
+    """CREATE TABLE IF NOT EXISTS roots (
+        path TEXT PRIMARY KEY,
+        full_refresh_at REAL NOT NULL DEFAULT 0
+    )""",
+]
+
+# Keeps the cached content key only while the file looks unchanged
+FILE_UPSERT_SQL = """
+    INSERT INTO files (path, directory, name, extension, size, mtime, inode, device)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        size = excluded.size,
+        mtime = excluded.mtime,
+        inode = excluded.inode,
+        device = excluded.device,
+        content_key = CASE WHEN files.size = excluded.size AND files.mtime = excluded.mtime
+                           THEN files.content_key END
+"""
+
+SIMPLE_EXTENSION_PATTERN = re.compile(r"^\*(\.[^*?\[\].]+)$")
+
+# Directory mtimes this close to the refresh are not trusted: a change made in
+# the same clock tick would not move the mtime, so such directories are relisted
+MTIME_RACE_NS = 2 * 10**9
+
+# Sorts after every path character, bounding prefix range scans
+PATH_RANGE_END = "\U0010ffff"
+
+class FileIndex:
+    """
+    File metadata (path, size, mtime, extension, optional content key) for a
+    set of root folders, kept in SQLite so lookups avoid walking the disk.
+
+    A refresh stats every known directory and only relists those whose mtime
+    changed, which is when entries were added, removed or renamed in them.
+    Files edited in place do not touch their directory's mtime, so every
+    ``FILE_INDEX_FULL_REFRESH_HOURS`` a root is relisted completely; cached
+    content keys are re-validated against the file's stat before use.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, max_workers: int = FILE_SCAN_WORKERS,
+                 refresh_interval: float = FILE_INDEX_REFRESH_INTERVAL):
+        self.db_path = Path(db_path) if db_path else Path.home() / ".shadow_ai" / "file_index.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.roots: List[str] = []
+        self.last_refresh = 0.0
+        self.last_refresh_stats: Dict = {}
+        self._lock = threading.RLock()
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("fnmatch", 2, fnmatch, deterministic=True)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    # Roots
+
+    def set_roots(self, roots: Iterable[str]):
+        """Set the folders kept in the index"""
+        with self._lock:
+            self.roots = list(dict.fromkeys(os.path.realpath(root) for root in roots))
+            self.last_refresh = 0.0
+
+    def covers(self, folder: str) -> bool:
+        """Check whether a folder lies inside an indexed root"""
+        return self._root_for(os.path.realpath(folder)) is not None
+
+    def _root_for(self, folder: str) -> Optional[str]:
+        folder = os.path.normcase(folder)
+        for root in self.roots:
+            normalized = os.path.normcase(root)
+            if folder == normalized or folder.startswith(normalized.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    # Refresh
+
+    def refresh_if_stale(self):
+        """Refresh unless the index was refreshed within ``refresh_interval`` seconds"""
+        with self._lock:
+            if time.time() - self.last_refresh >= self.refresh_interval:
+                self.refresh()
+
+    def mark_stale(self):
+        """Make the next lookup refresh first, e.g. after files were changed"""
+        self.last_refresh = 0.0
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        Bring the index up to date with the disk
+
+        Args:
+            full: Relist every directory instead of only changed ones
+
+        Returns:
+            Refresh statistics
+        """
+        with self._lock:
+            start_time = time.time()
+            stats = {'dirs_checked': 0, 'dirs_listed': 0, 'files_updated': 0, 'files_removed': 0}
+            for root in self.roots:
+                row = self.conn.execute("SELECT full_refresh_at FROM roots WHERE path = ?", (root,)).fetchone()
+                full_due = row is None or time.time() - row[0] >= FILE_INDEX_FULL_REFRESH_HOURS * 3600
+                self._refresh_root(root, full or full_due, stats)
+                if full or full_due:
+                    self.conn.execute("INSERT OR REPLACE INTO roots (path, full_refresh_at) VALUES (?, ?)",
+                                      (root, start_time))
+                self.conn.commit()
+
+            self.last_refresh = time.time()
+            stats['elapsed'] = self.last_refresh - start_time
+            self.last_refresh_stats = stats
+            logging.info(f"File index refreshed: listed {stats['dirs_listed']} of {stats['dirs_checked']} "
+                         f"directories in {stats['elapsed']:.2f}s")
+            return stats
+
+    @staticmethod
+    def _check_directory(path: str, known_mtime: Optional[int],
+                         full: bool) -> Tuple[str, Optional[int], Optional[List[ScanEntry]]]:
+        """Stat a directory and list it if it changed; entries are None when unchanged"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return path, None, None
+        if not full and known_mtime == mtime_ns:
+            return path, mtime_ns, None
+        entries, _ = FileScanner._list_directory(path, False)
+        return path, mtime_ns, entries
+
+    def _refresh_root(self, root: str, full: bool, stats: Dict):
+        """Walk a root breadth-first, relisting changed directories"""
+        low, high = self._prefix_range(root)
+        known = dict(self.conn.execute(
+            "SELECT path, mtime_ns FROM directories WHERE path = ? OR (path > ? AND path < ?)",
+            (root, low, high)))
+        children = defaultdict(list)
+        for path, parent in self.conn.execute(
+                "SELECT path, parent FROM directories WHERE path > ? AND path < ?", (low, high)):
+            children[parent].append(path)
+
+        refresh_started_ns = time.time_ns()
+        seen = set()
+        level = [root]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-index") as pool:
+            while level:
+                results = pool.map(lambda p: self._check_directory(p, known.get(p), full), level)
+                level = []
+                for path, mtime_ns, entries in results:
+                    stats['dirs_checked'] += 1
+                    if mtime_ns is None:
+                        continue
+                    seen.add(path)
+                    if entries is None:
+                        level.extend(children[path])
+                        continue
+                    stats['dirs_listed'] += 1
+                    if mtime_ns >= refresh_started_ns - MTIME_RACE_NS:
+                        mtime_ns = 0
+                    self._store_directory(path, mtime_ns, entries, stats)
+                    level.extend(entry.path for entry in entries if entry.is_dir)
+
+        removed = [(path,) for path in known if path not in seen]
+        if removed:
+            stats['files_removed'] += sum(
+                self.conn.execute("DELETE FROM files WHERE directory = ?", row).rowcount for row in removed)
+            self.conn.executemany("DELETE FROM directories WHERE path = ?", removed)
+
+    def _store_directory(self, path: str, mtime_ns: int, entries: List[ScanEntry], stats: Dict):
+        """Replace the indexed contents of one directory"""
+        parent = os.path.dirname(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (path, parent, mtime_ns))
+
+        files = [entry for entry in entries if not entry.is_dir]
+        current = {entry.path for entry in files}
+        stale = [(p,) for (p,) in self.conn.execute("SELECT path FROM files WHERE directory = ?", (path,))
+                 if p not in current]
+        self.conn.executemany("DELETE FROM files WHERE path = ?", stale)
+        self.conn.executemany(FILE_UPSERT_SQL, [
+            (entry.path, path, entry.name, entry.extension, entry.size, entry.mtime, entry.inode, entry.device)
+            for entry in files
+        ])
+        stats['files_updated'] += len(files)
+        stats['files_removed'] += len(stale)
+
+    # Queries
+
+    @staticmethod
+    def _prefix_range(folder: str) -> Tuple[str, str]:
+        """Bounds of the paths strictly inside a folder"""
+        prefix = folder.rstrip(os.sep) + os.sep
+        return prefix, prefix + PATH_RANGE_END
+
+    def _query(self, folder: str, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """Refresh if needed, then run a query whose first two parameters bound the folder's paths"""
+        self.refresh_if_stale()
+        with self._lock:
+            low, high = self._prefix_range(os.path.realpath(folder))
+            return self.conn.execute(sql, (low, high) + params).fetchall()
+
+    def find_files(self, pattern: str, folder: str, max_results: int = 100) -> List[str]:
+        """Find files whose names match a glob pattern"""
+        simple = SIMPLE_EXTENSION_PATTERN.match(pattern)
+        if simple:
+            # "*.pdf" style patterns use the extension index
+            rows = self._query(folder, "SELECT path, name FROM files WHERE path > ? AND path < ? "
+                                       "AND extension = ?", (simple.group(1).lower(),))
+            return [path for path, name in rows if fnmatch(name, pattern)][:max_results]
+        rows = self._query(folder, "SELECT path FROM files WHERE path > ? AND path < ? "
+                                   "AND fnmatch(name, ?) LIMIT ?", (pattern, max_results))
+        return [path for (path,) in rows]
+
+    def find_large_files(self, folder: str, min_size: int) -> List[Tuple[str, int]]:
+        """Get (path, size in bytes) of files of at least ``min_size`` bytes, largest first"""
+        return self._query(folder, "SELECT path, size FROM files WHERE path > ? AND path < ? "
+                                   "AND size >= ? ORDER BY size DESC", (min_size,))
+
+    def folder_info(self, folder: str) -> Dict:
+        """Get file and folder counts, total size and file type counts"""
+        file_count, total_size = self._query(
+            folder, "SELECT count(*), coalesce(sum(size), 0) FROM files WHERE path > ? AND path < ?")[0]
+        folder_count = self._query(
+            folder, "SELECT count(*) FROM directories WHERE path > ? AND path < ?")[0][0]
+        file_types = dict(self._query(
+            folder, "SELECT extension, count(*) FROM files WHERE path > ? AND path < ? "
+                    "AND extension != '' GROUP BY extension"))
+        return {
+            'file_count': file_count,
+            'folder_count': folder_count,
+            'total_size': total_size,
+            'file_types': file_types
+        }
+
+    def find_duplicates(self, folder: str) -> Dict[str, List[str]]:
+        """Find files with identical content, reusing cached content keys"""
+        rows = self._query(folder, """
+            SELECT path, name, size, mtime, inode, device, content_key FROM files
+            WHERE path > ? AND path < ? AND size > 0 AND size IN (
+                SELECT size FROM files WHERE path > ? AND path < ? GROUP BY size HAVING count(*) > 1
+            )""", self._prefix_range(os.path.realpath(folder)))
+
+        entries, known_keys = [], {}
+        for path, name, size, mtime, inode, device, key in rows:
+            entries.append(ScanEntry(path=path, name=name, is_dir=False, size=size, mtime=mtime,
+                                     inode=inode or 0, device=device or 0))
+            if key is not None:
+                # A file edited in place keeps its directory's mtime; check before trusting the key
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_size == size and stat.st_mtime == mtime:
+                    known_keys[path] = key
+        cached = set(known_keys)
+
+        duplicates = duplicate_finder.find_in(entries, known_keys=known_keys)
+        with self._lock:
+            self.conn.executemany("UPDATE files SET content_key = ? WHERE path = ?",
+                                  [(key, path) for path, key in known_keys.items() if path not in cached])
+            self.conn.commit()
+        return duplicates
+
+    def get_stats(self) -> Dict:
+        """Get index statistics"""
+        with self._lock:
+            files, total_size = self.conn.execute("SELECT count(*), coalesce(sum(size), 0) FROM files").fetchone()
+            directories = self.conn.execute("SELECT count(*) FROM directories").fetchone()[0]
+        return {
+            'roots': list(self.roots),
+            'files': files,
+            'directories': directories,
+            'total_size': total_size,
+            'last_refresh': self.last_refresh,
+            'last_refresh_stats': self.last_refresh_stats
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+# Global instance
+file_index = FileIndex()
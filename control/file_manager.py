@@ -13,6 +13,14 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 import logging
+from fnmatch import fnmatch
+
+from control.file_scanner import file_scanner
+from control.duplicate_finder import duplicate_finder
+from control.file_index import file_index
+from control.backup_engine import get_repository, BackupRepository
+from control.bulk_operations import bulk_operations, FileOperation
+from config import BACKUP_FOLDER_NAME
 
 class EnhancedFileManager:
     """Advanced file management with intelligent operations"""
@@ -28,6 +36,13 @@ class EnhancedFileManager:
             'music': os.path.join(os.path.expanduser('~'), 'Music'),
             'temp': os.environ.get('TEMP', 'C:\\Temp')
         }
+        self.scanner = file_scanner
+        self.last_backup_stats = {}
+        self.bulk = bulk_operations
+        self.duplicate_finder = duplicate_finder
+        # Everyday folders are answered from the persistent index; temp churns too much to index
+        self.file_index = file_index
+        self.file_index.set_roots(path for name, path in self.common_paths.items() if name != 'temp')
         
     def copy_file(self, source: str, destination: str, overwrite: bool = False) -> bool:
         """Copy file with advanced options"""
@@ -143,65 +158,75 @@ class EnhancedFileManager:
                 logging.error(f"Folder not found: {folder_path}")
                 return {}
             
-            file_types = {
-                'Documents': ['.txt', '.doc', '.docx', '.pdf', '.rtf', '.odt'],
-                'Images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp'],
-                'Videos': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
-                'Audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma'],
-                'Archives': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-                'Spreadsheets': ['.xls', '.xlsx', '.csv', '.ods'],
-                'Presentations': ['.ppt', '.pptx', '.odp'],
-                'Code': ['.py', '.js', '.html', '.css', '.cpp', '.java', '.cs', '.php'],
-                'Executables': ['.exe', '.msi', '.dmg', '.deb', '.rpm']
-            }
-            
             organized_count = {}
+            if not create_subfolders:
+                return organized_count
             
-            for file_path in folder.iterdir():
-                if file_path.is_file():
-                    file_ext = file_path.suffix.lower()
-                    
-                    # Find appropriate category
-                    category = None
-                    for cat, extensions in file_types.items():
-                        if file_ext in extensions:
-                            category = cat
-                            break
-                    
-                    if not category:
-                        category = 'Others'
-                    
-                    # Create subfolder if needed
-                    if create_subfolders:
-                        category_folder = folder / category
-                        category_folder.mkdir(exist_ok=True)
-                        
-                        # Move file to category folder
-                        new_path = category_folder / file_path.name
-                        if not new_path.exists():
-                            file_path.rename(new_path)
-                            organized_count[category] = organized_count.get(category, 0) + 1
-            
-            self.log_operation("organize", folder_path, f"Organized into {len(organized_count)} categories")
+            operations = self.bulk.plan_organize(folder_path)
+            result = self.bulk.execute(operations, f"Organize {folder_path} by type")
+            for operation in result['succeeded']:
+                category = Path(operation.destination).parent.name
+                organized_count[category] = organized_count.get(category, 0) + 1
+            
+            self.log_operation("organize", folder_path,
+                               f"Organized into {len(organized_count)} categories (batch {result['batch']})")
             return organized_count
             
         except Exception as e:
             logging.error(f"Error organizing folder: {e}")
             return {}
     
+    def move_files(self, moves: List[Tuple[str, str]]) -> Dict:
+        """Move many files as one undoable batch of (source, destination) pairs"""
+        return self._run_batch('move', moves)
+    
+    def copy_files(self, copies: List[Tuple[str, str]]) -> Dict:
+        """Copy many files as one undoable batch of (source, destination) pairs"""
+        return self._run_batch('copy', copies)
+    
+    def _run_batch(self, action: str, pairs: List[Tuple[str, str]]) -> Dict:
+        try:
+            result = self.bulk.execute([FileOperation(action, source, destination) for source, destination in pairs],
+                                       f"{action.capitalize()} {len(pairs)} files")
+            self.log_operation(action, f"{len(pairs)} files", f"batch {result['batch']}")
+            return {
+                "batch": result['batch'],
+                "succeeded": len(result['succeeded']),
+                "skipped": len(result['skipped']),
+                "errors": result['errors']
+            }
+        except Exception as e:
+            logging.error(f"Error running {action} batch: {e}")
+            return {"error": str(e)}
+    
+    def undo_last_batch(self, batch_id: str = None) -> Dict:
+        """Undo the last bulk operation (or a given batch)"""
+        try:
+            result = self.bulk.undo(batch_id)
+            if "error" not in result:
+                self.log_operation("undo", result['batch'], "")
+            return result
+        except Exception as e:
+            logging.error(f"Error undoing batch: {e}")
+            return {"error": str(e)}
+    
     def find_files(self, pattern: str, search_path: str = None, max_results: int = 100) -> List[str]:
         """Find files matching pattern"""
         try:
             if search_path is None:
                 search_path = os.path.expanduser('~')
             
-            search_path = Path(search_path)
+            if self.file_index.covers(search_path):
+                results = self.file_index.find_files(pattern, search_path, max_results)
+                logging.info(f"Found {len(results)} files matching '{pattern}' in the file index")
+                return results
+            
             results = []
             
-            # Use glob pattern matching
-            for file_path in search_path.rglob(pattern):
-                if file_path.is_file():
-                    results.append(str(file_path))
+            # Glob pattern matching on file names; stopping the generator cancels the scan
+            for entry in self.scanner.scan_files(search_path):
+                if fnmatch(entry.name, pattern):
+                    results.append(entry.path)
                     if len(results) >= max_results:
                         break
             
@@ -215,18 +240,17 @@ class EnhancedFileManager:
     def find_large_files(self, folder_path: str, min_size_mb: int = 100) -> List[Tuple[str, int]]:
         """Find files larger than specified size"""
         try:
-            folder = Path(folder_path)
-            large_files = []
             min_size_bytes = min_size_mb * 1024 * 1024
             
-            for file_path in folder.rglob('*'):
-                if file_path.is_file():
-                    try:
-                        size = file_path.stat().st_size
-                        if size >= min_size_bytes:
-                            large_files.append((str(file_path), size // (1024 * 1024)))
-                    except OSError:
-                        continue
+            if self.file_index.covers(folder_path):
+                return [(path, size // (1024 * 1024))
+                        for path, size in self.file_index.find_large_files(folder_path, min_size_bytes)]
+            
+            large_files = [
+                (entry.path, entry.size // (1024 * 1024))
+                for entry in self.scanner.scan_files(folder_path)
+                if entry.size >= min_size_bytes
+            ]
             
             # Sort by size (largest first)
             large_files.sort(key=lambda x: x[1], reverse=True)
@@ -239,32 +263,11 @@ class EnhancedFileManager:
             return []
     
     def find_duplicate_files(self, folder_path: str) -> Dict[str, List[str]]:
-        """Find duplicate files based on size and name"""
+        """Find files with identical content, keyed by size and content hash"""
         try:
-            folder = Path(folder_path)
-            file_info = {}
-            duplicates = {}
-            
-            for file_path in folder.rglob('*'):
-                if file_path.is_file():
-                    try:
-                        size = file_path.stat().st_size
-                        name = file_path.name.lower()
-                        key = f"{name}_{size}"
-                        
-                        if key not in file_info:
-                            file_info[key] = []
-                        file_info[key].append(str(file_path))
-                    except OSError:
-                        continue
-            
-            # Find duplicates
-            for key, paths in file_info.items():
-                if len(paths) > 1:
-                    duplicates[key] = paths
-            
-            logging.info(f"Found {len(duplicates)} sets of duplicate files")
-            return duplicates
+            if self.file_index.covers(folder_path):
+                return self.file_index.find_duplicates(folder_path)
+            return self.duplicate_finder.find(folder_path)
             
         except Exception as e:
             logging.error(f"Error finding duplicates: {e}")
@@ -278,23 +281,18 @@ class EnhancedFileManager:
                 os.path.join(os.path.expanduser('~'), 'AppData', 'Local', 'Temp'),
                 'C:\\Windows\\Temp'
             ]
+            # The same folder can appear twice (TEMP usually is AppData\Local\Temp)
+            temp_paths = list(dict.fromkeys(os.path.normcase(os.path.abspath(p)) for p in temp_paths))
             
-            cutoff_date = datetime.now() - timedelta(days=older_than_days)
+            cutoff_time = (datetime.now() - timedelta(days=older_than_days)).timestamp()
             cleaned_count = 0
             
-            for temp_path in temp_paths:
-                if os.path.exists(temp_path):
+            for entry in self.scanner.scan_files(*temp_paths):
+                if entry.mtime < cutoff_time:
                     try:
-                        for file_path in Path(temp_path).rglob('*'):
-                            if file_path.is_file():
-                                try:
-                                    file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                                    if file_time < cutoff_date:
-                                        file_path.unlink()
-                                        cleaned_count += 1
-                                except (OSError, PermissionError):
-                                    continue
-                    except PermissionError:
+                        os.unlink(entry.path)
+                        cleaned_count += 1
+                    except (OSError, PermissionError):
                         continue
             
             self.log_operation("clean_temp", "", f"Cleaned {cleaned_count} files")
@@ -305,8 +303,14 @@ class EnhancedFileManager:
             logging.error(f"Error cleaning temp files: {e}")
             return 0
     
-    def create_backup(self, source_path: str, backup_location: str = None) -> bool:
-        """Create backup of files/folders"""
+    def create_backup(self, source_path: str, backup_location: str = None, incremental: bool = True) -> bool:
+        """
+        Create backup of files/folders
+
+        Incremental backups add a snapshot to a deduplicating repository in the
+        backup location, storing only what changed since the last snapshot.
+        Otherwise the source is copied to a new timestamped folder.
+        """
         try:
             source = Path(source_path)
             
@@ -317,6 +321,15 @@ class EnhancedFileManager:
             if backup_location is None:
                 backup_location = self.common_paths['documents']
             
+            if incremental:
+                repository = self._backup_repository(backup_location)
+                stats = repository.backup(source_path)
+                if stats['errors']:
+                    logging.warning(f"{stats['errors']} files could not be backed up")
+                self.last_backup_stats = stats
+                self.log_operation("backup", source_path, f"{repository.path} ({stats['snapshot']})")
+                return True
+            
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_name = f"{source.name}_backup_{timestamp}"
             backup_path = Path(backup_location) / backup_name
@@ -334,6 +347,51 @@ class EnhancedFileManager:
             logging.error(f"Error creating backup: {e}")
             return False
     
+    def _backup_repository(self, backup_location: str = None) -> BackupRepository:
+        if backup_location is None:
+            backup_location = self.common_paths['documents']
+        return get_repository(os.path.join(backup_location, BACKUP_FOLDER_NAME))
+    
+    def list_backups(self, source_path: str = None, backup_location: str = None) -> List[Dict]:
+        """List incremental backup snapshots, oldest first"""
+        try:
+            return self._backup_repository(backup_location).list_snapshots(source_path)
+        except Exception as e:
+            logging.error(f"Error listing backups: {e}")
+            return []
+    
+    def restore_backup(self, source_path: str, target_path: str = None, snapshot_id: str = None,
+                       backup_location: str = None) -> Dict:
+        """Restore the latest (or a given) snapshot of a source into a new folder"""
+        try:
+            repository = self._backup_repository(backup_location)
+            if snapshot_id is None:
+                snapshots = repository.list_snapshots(source_path)
+                if not snapshots:
+                    return {"error": f"No backups found for {source_path}"}
+                snapshot_id = snapshots[-1]['id']
+            
+            if target_path is None:
+                # Never restore over the live files
+                target_path = os.path.join(os.path.dirname(os.path.abspath(source_path)),
+                                           f"{Path(source_path).name}_restored_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            
+            stats = repository.restore(snapshot_id, target_path)
+            self.log_operation("restore", snapshot_id, target_path)
+            return {"snapshot": snapshot_id, "target": target_path, **stats}
+            
+        except Exception as e:
+            logging.error(f"Error restoring backup: {e}")
+            return {"error": str(e)}
+    
+    def verify_backup(self, snapshot_id: str = None, backup_location: str = None) -> Dict:
+        """Check that backup snapshots can be fully restored"""
+        try:
+            return self._backup_repository(backup_location).verify(snapshot_id)
+        except Exception as e:
+            logging.error(f"Error verifying backup: {e}")
+            return {"error": str(e), "ok": False}
+    
     def get_folder_info(self, folder_path: str) -> Dict:
         """Get detailed folder information"""
         try:
@@ -342,25 +400,31 @@ class EnhancedFileManager:
             if not folder.exists():
                 return {"error": "Folder not found"}
             
+            if self.file_index.covers(folder_path):
+                info = self.file_index.folder_info(folder_path)
+                return {
+                    "path": folder_path,
+                    "total_size_mb": info['total_size'] // (1024 * 1024),
+                    "file_count": info['file_count'],
+                    "folder_count": info['folder_count'],
+                    "file_types": info['file_types']
+                }
+            
             total_size = 0
             file_count = 0
             folder_count = 0
             file_types = {}
             
-            for item in folder.rglob('*'):
-                if item.is_file():
-                    file_count += 1
-                    try:
-                        size = item.stat().st_size
-                        total_size += size
-                        
-                        ext = item.suffix.lower()
-                        if ext:
-                            file_types[ext] = file_types.get(ext, 0) + 1
-                    except OSError:
-                        continue
-                elif item.is_dir():
+            for entry in self.scanner.scan(folder_path, include_dirs=True):
+                if entry.is_dir:
                     folder_count += 1
+                    continue
+                file_count += 1
+                total_size += entry.size
+                
+                ext = entry.extension
+                if ext:
+                    file_types[ext] = file_types.get(ext, 0) + 1
             
             return {
                 "path": folder_path,
@@ -383,6 +447,8 @@ class EnhancedFileManager:
             "destination": destination
         }
         self.operation_log.append(log_entry)
+        # Every operation that changes files is logged; the next index lookup re-checks the disk
+        self.file_index.mark_stale()
         
         # Keep only last 1000 operations
         if len(self.operation_log) > 1000:
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+File Scanner Module for Shadow AI
+Parallel os.scandir directory walker shared by the file management features
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import FILE_SCAN_WORKERS, FILE_SCAN_PROGRESS_INTERVAL
+
+@dataclass
+class ScanEntry:
+    """A file or directory found by the scanner, with the stat data already read"""
+    path: str
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+    inode: int = 0
+    device: int = 0
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+
+@dataclass
+class ScanState:
+    """
+    Progress of a scan; pass it back to ``scan`` to resume after cancellation.
+
+    A directory is only marked done once all of its entries have been yielded,
+    so a resumed scan never skips entries (it may repeat the entries of the
+    directory that was being yielded when the scan was cancelled).
+    """
+    roots: List[str] = field(default_factory=list)
+    pending: Deque[str] = field(default_factory=deque)
+    started: bool = False
+    files: int = 0
+    dirs: int = 0
+    bytes: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.started and not self.pending
+
+    def progress(self, current_dir: str = "") -> Dict:
+        return {
+            'files': self.files,
+            'dirs': self.dirs,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'pending_dirs': len(self.pending),
+            'elapsed': self.elapsed,
+            'current_dir': current_dir
+        }
+
+ProgressCallback = Callable[[Dict], None]
+
+class FileScanner:
+    """
+    Walks directory trees with os.scandir, listing directories in parallel.
+
+    Each directory is listed by a worker thread, which reads the stat data of
+    its entries (free on Windows, one lstat per entry elsewhere). Results are
+    streamed to the caller as a generator in the order directories finish.
+    """
+
+    def __init__(self, max_workers: int = FILE_SCAN_WORKERS):
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _list_directory(path: str, follow_symlinks: bool) -> Tuple[List[ScanEntry], int]:
+        """List one directory; returns (entries, error count)"""
+        entries, errors = [], 0
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                        stat = entry.stat(follow_symlinks=follow_symlinks)
+                    except OSError:
+                        errors += 1
+                        continue
+                    entries.append(ScanEntry(
+                        path=entry.path,
+                        name=entry.name,
+                        is_dir=is_dir,
+                        size=0 if is_dir else stat.st_size,
+                        mtime=stat.st_mtime,
+                        inode=stat.st_ino,
+                        device=stat.st_dev
+                    ))
+        except OSError as e:
+            logging.debug(f"Cannot scan {path}: {e}")
+            errors += 1
+        return entries, errors
+
+    def scan(self, *roots: str, include_dirs: bool = False, follow_symlinks: bool = False,
+             dir_filter: Optional[Callable[[ScanEntry], bool]] = None,
+             cancel_event: Optional[threading.Event] = None,
+             progress_callback: Optional[ProgressCallback] = None,
+             progress_interval: int = FILE_SCAN_PROGRESS_INTERVAL,
+             state: Optional[ScanState] = None) -> Iterator[ScanEntry]:
+        """
+        Stream the entries below one or more root directories
+
+        Args:
+            include_dirs: Also yield directory entries
+            dir_filter: Return False to skip descending into a directory
+            cancel_event: Set to stop the scan; unfinished directories stay in ``state``
+            progress_callback: Called with a progress dict every ``progress_interval`` entries
+            state: A ScanState from an earlier, cancelled scan to resume
+        """
+        if state is None:
+            state = ScanState()
+        if not state.started:
+            state.roots = [os.path.abspath(root) for root in roots]
+            state.pending.extend(root for root in state.roots if os.path.isdir(root))
+            state.started = True
+
+        start_time = time.time() - state.elapsed
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shadow-scan")
+        in_flight = {}
+        # Directories handed to workers but not yet fully yielded
+        queued: Deque[str] = deque(state.pending)
+        state.pending.clear()
+        next_report = state.files + state.dirs + progress_interval
+        # Real paths of directories already queued when following symlinks; on
+        # Windows DirEntry.stat() reports st_ino/st_dev as 0, so they can't be the key
+        visited = {os.path.normcase(os.path.realpath(path)) for path in queued} if follow_symlinks else set()
+        current = None
+
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        try:
+            while queued or in_flight:
+                while queued and len(in_flight) < self.max_workers * 2 and not cancelled():
+                    path = queued.popleft()
+                    in_flight[executor.submit(self._list_directory, path, follow_symlinks)] = path
+
+                if cancelled():
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    entries, errors = future.result()
+                    state.errors += errors
+                    current = path
+
+                    for entry in entries:
+                        if entry.is_dir:
+                            state.dirs += 1
+                            if include_dirs:
+                                yield entry
+                        else:
+                            state.files += 1
+                            state.bytes += entry.size
+                            yield entry
+
+                    for entry in entries:
+                        if not entry.is_dir:
+                            continue
+                        if dir_filter is not None and not dir_filter(entry):
+                            continue
+                        if follow_symlinks:
+                            # Guard against symlink loops
+                            key = os.path.normcase(os.path.realpath(entry.path))
+                            if key in visited:
+                                continue
+                            visited.add(key)
+                        queued.append(entry.path)
+                    current = None
+
+                    state.elapsed = time.time() - start_time
+                    if progress_callback and state.files + state.dirs >= next_report:
+                        next_report = state.files + state.dirs + progress_interval
+                        progress_callback(state.progress(path))
+        finally:
+            # Whatever was not fully yielded can be resumed later
+            if current is not None:
+                state.pending.append(current)
+            for future, path in in_flight.items():
+                future.cancel()
+                state.pending.append(path)
+            state.pending.extend(queued)
+            state.elapsed = time.time() - start_time
+            executor.shutdown(wait=False, cancel_futures=True)
+            if progress_callback:
+                progress_callback(state.progress())
+
+    def scan_files(self, *roots: str, **options) -> Iterator[ScanEntry]:
+        """Stream only the files below the roots"""
+        options.pop('include_dirs', None)
+        return self.scan(*roots, include_dirs=False, **options)
+
+# Global instance
+file_scanner = FileScanner()
+
+def scan(*roots: str, **options) -> Iterator[ScanEntry]:
+    """Quick scan with the shared scanner"""
+    return file_scanner.scan(*roots, **options)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Hotkey Dispatcher Module for Shadow AI
+Runs hotkey actions on a bounded worker pool with debouncing and per-action limits
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from config import HOTKEY_WORKERS, HOTKEY_DEBOUNCE_SECONDS, HOTKEY_MAX_PENDING
+
+@dataclass
+class ActionPolicy:
+    """How triggers of one action are admitted"""
+    max_concurrent: int = 1  # Runs of this action at the same time
+    max_pending: int = HOTKEY_MAX_PENDING  # Triggers queued behind the running ones; more are dropped
+    debounce: float = HOTKEY_DEBOUNCE_SECONDS  # Triggers this soon after an accepted one are ignored
+    exclusive: bool = False  # Drives mouse/keyboard, so never runs alongside another exclusive action
+
+@dataclass
+class _ActionState:
+    function: Callable
+    policy: ActionPolicy
+    running: int = 0
+    pending: int = 0
+    last_accepted: float = float('-inf')
+    # Metrics
+    triggered: int = 0
+    accepted: int = 0
+    debounced: int = 0
+    dropped: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_runtime: float = 0.0
+    max_wait: float = 0.0
+    last_used: Optional[float] = None
+    queued_at: List[float] = field(default_factory=list)  # Accept times of queued triggers
+
+class HotkeyDispatcher:
+    """
+    Admits hotkey triggers and runs the actions on a fixed thread pool.
+
+    A trigger within ``debounce`` of the previous accepted trigger of the
+    same action is coalesced into it. Otherwise it runs at once if the
+    action is below ``max_concurrent``, waits if fewer than ``max_pending``
+    runs are queued, and is dropped beyond that, so holding or mashing a key
+    cannot pile up work. Queued runs start as soon as a run of the same
+    action finishes. Actions marked exclusive share one lock, so input
+    automation never interleaves.
+
+    All bookkeeping happens under a single lock, held only for counter
+    updates.
+    """
+
+    def __init__(self, max_workers: int = HOTKEY_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow-hotkey")
+        self._actions: Dict[str, _ActionState] = {}
+        self._lock = threading.Lock()
+        self._input_lock = threading.Lock()
+
+    def register(self, name: str, function: Callable, policy: Optional[ActionPolicy] = None):
+        with self._lock:
+            self._actions[name] = _ActionState(function, policy or ActionPolicy())
+
+    def dispatch(self, name: str) -> str:
+        """
+        Trigger an action; never blocks
+
+        Returns:
+            'started', 'queued', 'debounced', 'dropped' or 'unknown'
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._actions.get(name)
+            if state is None:
+                return 'unknown'
+            state.triggered += 1
+            if now - state.last_accepted < state.policy.debounce:
+                state.debounced += 1
+                return 'debounced'
+            if state.running < state.policy.max_concurrent:
+                outcome = 'started'
+                state.running += 1
+            elif state.pending < state.policy.max_pending:
+                outcome = 'queued'
+                state.pending += 1
+                state.queued_at.append(now)
+            else:
+                state.dropped += 1
+                return 'dropped'
+            state.accepted += 1
+            state.last_accepted = now
+            state.last_used = time.time()
+
+        if outcome == 'started':
+            self._submit(name, state, now)
+        return outcome
+
+    def _submit(self, name: str, state: _ActionState, accepted_at: float):
+        try:
+            self._executor.submit(self._run, name, state, accepted_at)
+        except RuntimeError:
+            # The pool was shut down
+            with self._lock:
+                state.running -= 1
+
+    def _run(self, name: str, state: _ActionState, accepted_at: float):
+        started = time.monotonic()
+        failed = False
+        try:
+            if state.policy.exclusive:
+                with self._input_lock:
+                    result = state.function()
+            else:
+                result = state.function()
+            logging.info(f"Hotkey action '{name}' executed: {result}")
+        except Exception as e:
+            failed = True
+            logging.error(f"Error executing hotkey action '{name}': {e}")
+        finished = time.monotonic()
+
+        with self._lock:
+            state.completed += 1
+            state.failed += failed
+            state.total_runtime += finished - started
+            state.max_wait = max(state.max_wait, started - accepted_at)
+            if state.pending:
+                # Hand this run's slot to the oldest queued trigger
+                state.pending -= 1
+                next_accepted = state.queued_at.pop(0)
+            else:
+                state.running -= 1
+                next_accepted = None
+        if next_accepted is not None:
+            self._submit(name, state, next_accepted)
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """Per-action counters and timings"""
+        with self._lock:
+            return {
+                name: {
+                    'triggered': state.triggered,
+                    'accepted': state.accepted,
+                    'debounced': state.debounced,
+                    'dropped': state.dropped,
+                    'completed': state.completed,
+                    'failed': state.failed,
+                    'running': state.running,
+                    'pending': state.pending,
+                    'average_runtime': round(state.total_runtime / state.completed, 4) if state.completed else None,
+                    'max_wait': round(state.max_wait, 4),
+                    'last_used': state.last_used
+                }
+                for name, state in self._actions.items()
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
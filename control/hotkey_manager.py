@@ -6,11 +6,13 @@ Provides customizable keyboard shortcuts for quick actions
 
 import logging
 import json
-import threading
 import time
 from pathlib import Path
 from typing import Dict, List, Callable, Optional, Any
 
+from control.hotkey_dispatcher import HotkeyDispatcher, ActionPolicy
+from control.hotkey_matcher import HotkeyMatcher, compile_bindings, pynput_key_name
+
 class HotkeyManager:
     """Customizable hotkey system for Shadow AI"""
     
@@ -18,6 +20,12 @@ class HotkeyManager:
         self.hotkeys = {}
         self.hotkey_thread = None
         self.is_listening = False
+        # Every binding is matched from one stream of key events, and the
+        # actions run on a bounded worker pool
+        self.matcher = HotkeyMatcher()
+        self.dispatcher = HotkeyDispatcher()
+        self._keyboard_hook = None
+        self._pynput_listener = None
         self.config_file = Path("config/hotkeys.json")
         self.config_file.parent.mkdir(exist_ok=True)
         
@@ -57,14 +65,19 @@ class HotkeyManager:
                 logging.warning("No keyboard library available. Install keyboard or pynput for hotkey support")
                 return False
     
-    def register_action(self, name: str, function: Callable, description: str = ""):
-        """Register an action that can be bound to hotkeys"""
+    def register_action(self, name: str, function: Callable, description: str = "",
+                        policy: Optional[ActionPolicy] = None):
+        """
+        Register an action that can be bound to hotkeys
+        
+        Args:
+            policy: Concurrency, queueing and debounce limits for the action
+        """
         self.actions[name] = {
             'function': function,
-            'description': description,
-            'usage_count': 0,
-            'last_used': None
+            'description': description
         }
+        self.dispatcher.register(name, function, policy)
         logging.info(f"Registered action: {name}")
     
     def register_default_actions(self):
@@ -183,11 +196,12 @@ class HotkeyManager:
                 logging.error(f"Hotkey system info error: {e}")
                 return False
         
-        # Register all actions
-        self.register_action('take_screenshot', take_screenshot, "Take a screenshot")
-        self.register_action('open_notepad', open_notepad, "Open Notepad")
-        self.register_action('copy_current_selection', copy_current_selection, "Copy current selection")
-        self.register_action('paste_clipboard', paste_clipboard, "Paste from clipboard")
+        # Register all actions; the ones sending input must not overlap
+        input_action = ActionPolicy(exclusive=True)
+        self.register_action('take_screenshot', take_screenshot, "Take a screenshot", input_action)
+        self.register_action('open_notepad', open_notepad, "Open Notepad", input_action)
+        self.register_action('copy_current_selection', copy_current_selection, "Copy current selection", input_action)
+        self.register_action('paste_clipboard', paste_clipboard, "Paste from clipboard", input_action)
         self.register_action('show_help', show_help, "Show hotkey help")
         self.register_action('show_quick_menu', show_quick_menu, "Show quick action menu")
         self.register_action('toggle_voice_mode', toggle_voice_mode, "Toggle voice mode")
@@ -195,20 +209,26 @@ class HotkeyManager:
         self.register_action('system_info', system_info, "Show system information")
     
     def add_hotkey(self, hotkey: str, action_name: str) -> bool:
-        """Add a new hotkey"""
+        """
+        Add a new hotkey
+        
+        Sequences separate their chords with commas, e.g. "ctrl+k, n".
+        """
         try:
             if action_name not in self.actions:
                 logging.error(f"Action '{action_name}' not registered")
                 return False
             
-            # Remove existing hotkey if any
-            self.remove_hotkey(hotkey)
-            
-            self.hotkeys[hotkey] = action_name
-            
-            if self.keyboard_available and self.is_listening:
-                self._register_system_hotkey(hotkey, action_name)
+            bindings = {key: action for key, action in self.hotkeys.items() if key != hotkey}
+            bindings[hotkey] = action_name
+            try:
+                compile_bindings(bindings)
+            except ValueError as e:
+                logging.error(f"Invalid hotkey {hotkey}: {e}")
+                return False
             
+            self.hotkeys = bindings
+            self._compile_bindings()
             self.save_config()
             logging.info(f"Added hotkey: {hotkey} -> {action_name}")
             return True
@@ -221,10 +241,8 @@ class HotkeyManager:
         """Remove a hotkey"""
         try:
             if hotkey in self.hotkeys:
-                if self.keyboard_available and self.is_listening:
-                    self._unregister_system_hotkey(hotkey)
-                
                 del self.hotkeys[hotkey]
+                self._compile_bindings()
                 self.save_config()
                 logging.info(f"Removed hotkey: {hotkey}")
                 return True
@@ -236,6 +254,22 @@ class HotkeyManager:
             logging.error(f"Error removing hotkey: {e}")
             return False
     
+    def _compile_bindings(self):
+        """Rebuild the matcher from the configured hotkeys, skipping invalid ones"""
+        try:
+            self.matcher.set_bindings(self.hotkeys)
+            return
+        except ValueError:
+            pass
+        valid = {}
+        for hotkey, action_name in self.hotkeys.items():
+            try:
+                compile_bindings({**valid, hotkey: action_name})
+                valid[hotkey] = action_name
+            except ValueError as e:
+                logging.error(f"Ignoring hotkey {hotkey}: {e}")
+        self.matcher.set_bindings(valid)
+    
     def start_listening(self) -> bool:
         """Start listening for hotkeys"""
         try:
@@ -247,15 +281,20 @@ class HotkeyManager:
                 logging.info("Already listening for hotkeys")
                 return True
             
-            self.is_listening = True
+            self._compile_bindings()
+            self.matcher.reset()
             
+            # One hook feeds every key event to the matcher
             if hasattr(self, 'keyboard'):
-                # Register all hotkeys
-                for hotkey, action_name in self.hotkeys.items():
-                    self._register_system_hotkey(hotkey, action_name)
-                
-                logging.info(f"Started listening for {len(self.hotkeys)} hotkeys")
+                self._keyboard_hook = self.keyboard.hook(self._on_keyboard_event)
+            elif hasattr(self, 'pynput_keyboard'):
+                self._pynput_listener = self.pynput_keyboard.Listener(
+                    on_press=self._on_pynput_press, on_release=self._on_pynput_release)
+                self._pynput_listener.daemon = True
+                self._pynput_listener.start()
             
+            self.is_listening = True
+            logging.info(f"Started listening for {len(self.hotkeys)} hotkeys")
             return True
             
         except Exception as e:
@@ -270,10 +309,12 @@ class HotkeyManager:
             
             self.is_listening = False
             
-            if hasattr(self, 'keyboard'):
-                # Unregister all hotkeys
-                for hotkey in self.hotkeys.keys():
-                    self._unregister_system_hotkey(hotkey)
+            if self._keyboard_hook is not None:
+                self.keyboard.unhook(self._keyboard_hook)
+                self._keyboard_hook = None
+            if self._pynput_listener is not None:
+                self._pynput_listener.stop()
+                self._pynput_listener = None
             
             logging.info("Stopped listening for hotkeys")
             return True
@@ -282,51 +323,35 @@ class HotkeyManager:
             logging.error(f"Error stopping hotkey listener: {e}")
             return False
     
-    def _register_system_hotkey(self, hotkey: str, action_name: str):
-        """Register hotkey with system"""
-        try:
-            if hasattr(self, 'keyboard'):
-                def callback():
-                    self._execute_action(action_name)
-                
-                self.keyboard.add_hotkey(hotkey, callback)
-                
-        except Exception as e:
-            logging.error(f"Error registering system hotkey {hotkey}: {e}")
+    def handle_key_event(self, key: Optional[str], pressed: bool):
+        """Feed one key event to the matcher and run the action it completes"""
+        if not key:
+            return
+        if not pressed:
+            self.matcher.key_up(key)
+            return
+        action_name = self.matcher.key_down(key)
+        if action_name:
+            self._execute_action(action_name)
     
-    def _unregister_system_hotkey(self, hotkey: str):
-        """Unregister hotkey from system"""
-        try:
-            if hasattr(self, 'keyboard'):
-                self.keyboard.remove_hotkey(hotkey)
-                
-        except Exception as e:
-            logging.error(f"Error unregistering system hotkey {hotkey}: {e}")
+    def _on_keyboard_event(self, event):
+        self.handle_key_event(event.name, event.event_type == 'down')
+    
+    def _on_pynput_press(self, key):
+        self.handle_key_event(pynput_key_name(key), True)
+    
+    def _on_pynput_release(self, key):
+        self.handle_key_event(pynput_key_name(key), False)
     
-    def _execute_action(self, action_name: str):
+    def _execute_action(self, action_name: str) -> str:
         """Execute hotkey action"""
-        try:
-            if action_name in self.actions:
-                action = self.actions[action_name]
-                
-                # Update usage statistics
-                action['usage_count'] += 1
-                action['last_used'] = time.time()
-                
-                # Execute action in separate thread to avoid blocking
-                def run_action():
-                    try:
-                        result = action['function']()
-                        logging.info(f"Hotkey action '{action_name}' executed: {result}")
-                    except Exception as e:
-                        logging.error(f"Error executing hotkey action '{action_name}': {e}")
-                
-                threading.Thread(target=run_action, daemon=True).start()
-            else:
-                logging.error(f"Action not found: {action_name}")
-                
-        except Exception as e:
-            logging.error(f"Error executing hotkey action: {e}")
+        # Called on the keyboard hook thread: hand off and return at once
+        outcome = self.dispatcher.dispatch(action_name)
+        if outcome == 'unknown':
+            logging.error(f"Action not found: {action_name}")
+        elif outcome == 'dropped':
+            logging.warning(f"Hotkey action '{action_name}' dropped: still busy")
+        return outcome
     
     def get_hotkey_help(self) -> str:
         """Get help text for hotkeys"""
@@ -342,6 +367,7 @@ class HotkeyManager:
     def list_hotkeys(self) -> List[Dict]:
         """List all configured hotkeys"""
         hotkey_list = []
+        metrics = self.dispatcher.get_metrics()
         
         for hotkey, action_name in self.hotkeys.items():
             if action_name in self.actions:
@@ -350,25 +376,30 @@ class HotkeyManager:
                     'hotkey': hotkey,
                     'action': action_name,
                     'description': action['description'],
-                    'usage_count': action['usage_count'],
-                    'last_used': action['last_used']
+                    'usage_count': metrics[action_name]['accepted'],
+                    'last_used': metrics[action_name]['last_used']
                 })
         
         return hotkey_list
     
     def get_usage_statistics(self) -> Dict:
         """Get hotkey usage statistics"""
+        metrics = self.dispatcher.get_metrics()
         stats = {
             'total_hotkeys': len(self.hotkeys),
             'total_actions': len(self.actions),
             'most_used_action': None,
             'total_usage': 0,
+            'debounced': sum(m['debounced'] for m in metrics.values()),
+            'dropped': sum(m['dropped'] for m in metrics.values()),
+            'failed': sum(m['failed'] for m in metrics.values()),
+            'actions': metrics,
             'listening': self.is_listening
         }
         
         max_usage = 0
         for action_name, action in self.actions.items():
-            usage_count = action['usage_count']
+            usage_count = metrics[action_name]['accepted']
             stats['total_usage'] += usage_count
             
             if usage_count > max_usage:
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Hotkey Matcher Module for Shadow AI
+Compiles chord and sequence bindings (e.g. "ctrl+k, n") into a trie matched per key event
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from config import HOTKEY_SEQUENCE_TIMEOUT
+
+MODIFIERS = ('ctrl', 'alt', 'shift', 'cmd')  # Canonical order within a chord
+
+KEY_ALIASES = {
+    'control': 'ctrl', 'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl', 'left ctrl': 'ctrl', 'right ctrl': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt', 'alt gr': 'alt', 'left alt': 'alt', 'right alt': 'alt',
+    'menu': 'alt', 'option': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift', 'left shift': 'shift', 'right shift': 'shift',
+    'cmd_l': 'cmd', 'cmd_r': 'cmd', 'command': 'cmd', 'win': 'cmd', 'windows': 'cmd',
+    'left windows': 'cmd', 'right windows': 'cmd', 'super': 'cmd',
+    'return': 'enter', 'esc': 'escape', 'del': 'delete', 'spacebar': 'space', ' ': 'space',
+    'page_up': 'page up', 'page_down': 'page down', 'caps_lock': 'caps lock'
+}
+
+def normalize_key(name: str) -> str:
+    """Canonical name of a key as reported by keyboard or pynput"""
+    name = name.strip().lower() if len(name) > 1 else name.lower()
+    return KEY_ALIASES.get(name, name)
+
+def parse_chord(text: str) -> str:
+    """Canonical form of one chord, e.g. 'Shift+Ctrl+S' -> 'ctrl+shift+s'"""
+    keys = [normalize_key(part) for part in text.split('+')]
+    if not keys or any(not key for key in keys):
+        raise ValueError(f"Invalid hotkey chord: '{text}'")
+    modifiers = {key for key in keys if key in MODIFIERS}
+    others = [key for key in keys if key not in MODIFIERS]
+    if len(others) != 1:
+        raise ValueError(f"A chord needs exactly one non-modifier key: '{text}'")
+    return '+'.join([m for m in MODIFIERS if m in modifiers] + others)
+
+def parse_binding(text: str) -> Tuple[str, ...]:
+    """Chords of a binding; a comma separates the steps of a sequence"""
+    chords = tuple(parse_chord(part) for part in text.split(','))
+    if not chords:
+        raise ValueError(f"Empty hotkey: '{text}'")
+    return chords
+
+class _Node:
+    __slots__ = ('children', 'action', 'binding')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.action: Optional[str] = None
+        self.binding: Optional[str] = None
+
+def compile_bindings(bindings: Dict[str, str]) -> _Node:
+    """
+    Build the trie of chords for ``{binding: action}``
+
+    Raises:
+        ValueError: For malformed bindings, or when one binding is a prefix
+            of another (the shorter one would always fire first)
+    """
+    root = _Node()
+    for binding, action in bindings.items():
+        node = root
+        for chord in parse_binding(binding):
+            if node.action is not None:
+                raise ValueError(f"Hotkey '{binding}' is unreachable: '{node.binding}' fires first")
+            node = node.children.setdefault(chord, _Node())
+        if node.children:
+            raise ValueError(f"Hotkey '{binding}' is a prefix of a longer sequence")
+        if node.action is not None and node.action != action:
+            raise ValueError(f"Hotkey '{binding}' conflicts with '{node.binding}'")
+        node.action = action
+        node.binding = binding
+    return root
+
+class HotkeyMatcher:
+    """
+    Matches a stream of key events against compiled bindings.
+
+    Held modifiers are tracked from down/up events; each non-modifier key
+    press forms a chord, which costs one dict lookup to follow in the trie.
+    Auto-repeat presses of a key that is already down are ignored, so
+    holding a hotkey fires it once.
+    A sequence in progress resets when its next chord does not match (that
+    chord may then start a new sequence) or when more than ``timeout``
+    seconds pass between steps.
+    """
+
+    def __init__(self, bindings: Optional[Dict[str, str]] = None, timeout: float = HOTKEY_SEQUENCE_TIMEOUT):
+        self.timeout = timeout
+        self.root = compile_bindings(bindings or {})
+        self._node = self.root
+        self._last_step = 0.0
+        self._held = set()
+        self._pressed = set()  # Non-modifier keys down without a key_up yet
+        self._lock = threading.Lock()
+
+    def set_bindings(self, bindings: Dict[str, str]):
+        """Replace the bindings; a sequence in progress is abandoned"""
+        root = compile_bindings(bindings)
+        with self._lock:
+            self.root = self._node = root
+
+    def key_down(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Feed a key press
+
+        Returns:
+            The action to run if this press completed a binding
+        """
+        key = normalize_key(key)
+        with self._lock:
+            if key in MODIFIERS:
+                self._held.add(key)
+                return None
+            if key in self._pressed:
+                return None  # Auto-repeat
+            self._pressed.add(key)
+            now = time.monotonic() if now is None else now
+            chord = '+'.join([m for m in MODIFIERS if m in self._held] + [key])
+
+            if self._node is not self.root and now - self._last_step > self.timeout:
+                self._node = self.root
+            node = self._node.children.get(chord)
+            if node is None and self._node is not self.root:
+                node = self.root.children.get(chord)
+
+            if node is None:
+                self._node = self.root
+                return None
+            if node.action is not None:
+                self._node = self.root
+                return node.action
+            self._node = node
+            self._last_step = now
+            return None
+
+    def key_up(self, key: str):
+        key = normalize_key(key)
+        with self._lock:
+            if key in MODIFIERS:
+                self._held.discard(key)
+            else:
+                self._pressed.discard(key)
+
+    def reset(self):
+        """Forget held keys and any sequence in progress"""
+        with self._lock:
+            self._held.clear()
+            self._pressed.clear()
+            self._node = self.root
+
+    @property
+    def in_sequence(self) -> bool:
+        return self._node is not self.root
+
+def pynput_key_name(key) -> Optional[str]:
+    """Key name of a pynput Key or KeyCode"""
+    name = getattr(key, 'name', None)
+    if name:
+        return name
+    char = getattr(key, 'char', None)
+    vk = getattr(key, 'vk', None)
+    # With Ctrl held, Windows reports control characters (ctrl+k -> '\x0b')
+    if (char is None or (len(char) == 1 and ord(char) < 32)) and vk is not None:
+        if 65 <= vk <= 90 or 48 <= vk <= 57:
+            return chr(vk).lower()
+    if char is None:
+        logging.debug(f"Unnamed key event: {key}")
+    return char
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Metric Alerts Module for Shadow AI
+Threshold and rate-of-change rules evaluated incrementally on metric samples
+"""
+
+import logging
+import operator
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+CONDITIONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# Notification alert types by metric name prefix
+ALERT_TYPES = (('cpu', 'cpu'), ('memory', 'memory'), ('swap', 'memory'), ('disk', 'disk'), ('net', 'network'))
+
+@dataclass
+class AlertRule:
+    """
+    Fires when a metric (or its rate of change per minute, for ``kind='rate'``)
+    meets the condition continuously for ``duration`` seconds
+    """
+    name: str
+    metric: str
+    threshold: float
+    condition: str = '>'
+    kind: str = 'threshold'  # 'threshold' or 'rate'
+    duration: float = 0.0
+    window: float = 60.0  # Seconds of history a rate is measured over
+    cooldown: float = 600.0  # Minimum seconds between notifications
+    alert_type: str = ''
+
+    def __post_init__(self):
+        if self.condition not in CONDITIONS:
+            raise ValueError(f"Unknown condition: {self.condition}")
+        if self.kind not in ('threshold', 'rate'):
+            raise ValueError(f"Unknown rule kind: {self.kind}")
+        if not self.alert_type:
+            self.alert_type = next((t for prefix, t in ALERT_TYPES if self.metric.startswith(prefix)), 'system')
+
+@dataclass
+class _RuleState:
+    since: Optional[float] = None  # When the condition started holding
+    active: bool = False
+    last_fired: float = float('-inf')
+    history: Deque[Tuple[float, float]] = field(default_factory=deque)
+
+AlertCallback = Callable[[str, str], Any]
+
+def rule_threshold(rules: Iterable[Dict], metric: str) -> Optional[float]:
+    """Threshold of the configured threshold rule on a metric, if there is one"""
+    for rule in rules:
+        if rule['metric'] == metric and rule.get('kind', 'threshold') == 'threshold':
+            return float(rule['threshold'])
+    return None
+
+class AlertEngine:
+    """
+    Evaluates rules as samples arrive, keeping O(1) state per threshold rule
+    and a window of recent values per rate rule.
+
+    A rule becomes active once its condition has held for its duration, and
+    notifies at most once per cooldown. It resets when the condition clears,
+    so a new episode can alert again.
+    """
+
+    def __init__(self, rules: Iterable[AlertRule], notify: AlertCallback):
+        self.rules = list(rules)
+        self.notify = notify
+        self._states = {rule.name: _RuleState() for rule in self.rules}
+        self.fired: Deque[Dict] = deque(maxlen=100)
+
+    @classmethod
+    def from_config(cls, rules: Iterable[Dict], notify: AlertCallback) -> 'AlertEngine':
+        return cls([AlertRule(**rule) for rule in rules], notify)
+
+    def _value(self, rule: AlertRule, state: _RuleState, timestamp: float, value: float) -> Optional[float]:
+        if rule.kind == 'threshold':
+            return value
+        state.history.append((timestamp, value))
+        while state.history and state.history[0][0] < timestamp - rule.window:
+            state.history.popleft()
+        oldest_time, oldest_value = state.history[0]
+        # Wait for most of a window before judging a rate
+        if timestamp - oldest_time < rule.window * 0.9:
+            return None
+        return (value - oldest_value) / (timestamp - oldest_time) * 60
+
+    def evaluate(self, timestamp: float, sample: Dict[str, float]) -> List[Dict]:
+        """
+        Feed one sample to every rule
+
+        Returns:
+            The alerts that fired for this sample
+        """
+        fired = []
+        for rule in self.rules:
+            value = sample.get(rule.metric)
+            if value is None or value != value:  # Missing or NaN
+                continue
+            state = self._states[rule.name]
+            observed = self._value(rule, state, timestamp, value)
+            if observed is None:
+                continue
+
+            if not CONDITIONS[rule.condition](observed, rule.threshold):
+                state.since = None
+                state.active = False
+                continue
+
+            if state.since is None:
+                state.since = timestamp
+            if state.active or timestamp - state.since < rule.duration:
+                continue
+            state.active = True
+            if timestamp - state.last_fired < rule.cooldown:
+                continue
+            state.last_fired = timestamp
+
+            unit = "/min" if rule.kind == 'rate' else ""
+            details = (f"{rule.name}: {rule.metric} is {observed:.1f}{unit} "
+                       f"({rule.condition} {rule.threshold}{unit}"
+                       f"{f' for {rule.duration:.0f}s' if rule.duration else ''})")
+            alert = {'rule': rule.name, 'alert_type': rule.alert_type, 'value': observed,
+                     'timestamp': timestamp, 'details': details}
+            fired.append(alert)
+            self.fired.append(alert)
+            logging.warning(f"System alert: {details}")
+            try:
+                self.notify(rule.alert_type, details)
+            except Exception as e:
+                logging.error(f"Error sending system alert: {e}")
+        return fired
+
+    def active_alerts(self) -> List[str]:
+        """Names of the rules whose conditions currently hold"""
+        return [rule.name for rule in self.rules if self._states[rule.name].active]
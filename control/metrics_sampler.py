@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Metrics Sampler Module for Shadow AI
+Background thread sampling system and process metrics into NumPy ring buffers
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import psutil
+
+from config import (METRICS_SAMPLE_INTERVAL, METRICS_HISTORY_SECONDS,
+                    PROCESS_SAMPLE_EVERY, PROCESS_HISTORY_SAMPLES)
+from control.process_table import process_table
+
+SYSTEM_COLUMNS = (
+    'timestamp', 'cpu_percent', 'memory_percent', 'swap_percent',
+    'disk_read_bps', 'disk_write_bps', 'net_sent_bps', 'net_recv_bps'
+)
+PROCESS_COLUMNS = ('timestamp', 'cpu_percent', 'memory_mb')
+
+class RingBuffer:
+    """Fixed-size 2-D NumPy buffer that keeps the most recent rows"""
+
+    def __init__(self, capacity: int, width: int, dtype=np.float64):
+        self.capacity = capacity
+        self._data = np.full((capacity, width), np.nan, dtype=dtype)
+        self.count = 0  # Rows ever appended
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, row: Sequence[float]):
+        self._data[self.count % self.capacity] = row
+        self.count += 1
+
+    def latest(self) -> Optional[np.ndarray]:
+        if self.count == 0:
+            return None
+        return self._data[(self.count - 1) % self.capacity].copy()
+
+    def values(self, last: Optional[int] = None) -> np.ndarray:
+        """Copy of the last ``last`` rows (all by default), oldest first"""
+        n = len(self) if last is None else min(last, len(self))
+        if n == 0:
+            return self._data[:0].copy()
+        end = self.count % self.capacity
+        indexes = np.arange(end - n, end) % self.capacity
+        return self._data[indexes]
+
+def _busy_percent(before, after) -> float:
+    """CPU busy percentage between two cpu_times readings"""
+    total = sum(after) - sum(before)
+    idle = (after.idle - before.idle) + (getattr(after, 'iowait', 0) - getattr(before, 'iowait', 0))
+    if total <= 0:
+        return 0.0
+    return float(min(100.0, max(0.0, 100.0 * (total - idle) / total)))
+
+def summarize(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Current value, mean, extremes and percentiles of a metric series"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'current': None, 'mean': None, 'min': None, 'max': None, 'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'current': round(float(values[-1]), 2),
+        'mean': round(float(values.mean()), 2),
+        'min': round(float(values.min()), 2),
+        'max': round(float(values.max()), 2),
+        'p50': round(float(p50), 2),
+        'p95': round(float(p95), 2),
+        'p99': round(float(p99), 2)
+    }
+
+SampleListener = Callable[[float, Dict[str, float]], None]
+
+class MetricsSampler:
+    """
+    Samples CPU, memory, disk I/O, network and process metrics on a daemon
+    thread.
+
+    Counters (CPU times, disk and network bytes) are turned into rates from
+    the difference between consecutive samples, so every stored value covers
+    a real interval. Queries only copy from the buffers and never block on
+    measurement.
+    """
+
+    def __init__(self, interval: float = METRICS_SAMPLE_INTERVAL,
+                 history_seconds: float = METRICS_HISTORY_SECONDS,
+                 process_every: int = PROCESS_SAMPLE_EVERY):
+        self.interval = interval
+        self.process_every = max(1, process_every)
+        capacity = max(2, int(history_seconds / interval))
+        self.cpu_count = psutil.cpu_count() or 1
+        self.system = RingBuffer(capacity, len(SYSTEM_COLUMNS))
+        self.cores = RingBuffer(capacity, self.cpu_count)
+        self.process_table: List[Dict] = []
+        self.process_history: Dict[int, RingBuffer] = {}
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._first_sample = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last = None
+        self._listeners: List[SampleListener] = []
+
+    # Lifecycle
+
+    def start(self):
+        """Start sampling in the background"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="shadow-metrics", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def ensure_started(self, wait: bool = True):
+        """Start if needed; optionally wait (once) for the first sample"""
+        self.start()
+        if wait:
+            self._first_sample.wait(timeout=self.interval * 2 + 1)
+
+    def add_listener(self, listener: SampleListener):
+        """Call ``listener(timestamp, metrics)`` on the sampler thread after every sample"""
+        self._listeners.append(listener)
+
+    def _run(self):
+        self._prime()
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Error sampling metrics: {e}")
+
+    # Sampling
+
+    def _read_counters(self) -> Dict:
+        return {
+            'time': time.time(),
+            'cpu': psutil.cpu_times(),
+            'cores': psutil.cpu_times(percpu=True),
+            'disk': psutil.disk_io_counters(),
+            'net': psutil.net_io_counters()
+        }
+
+    def _prime(self):
+        """Take the baseline readings that the first sample's rates are measured from"""
+        self._last = self._read_counters()
+        # First cpu_percent calls only set up psutil's per-process baselines
+        self._sample_processes(time.time(), record=False)
+
+    def sample(self):
+        """Take one sample; rates cover the time since the previous sample"""
+        if self._last is None:
+            self._prime()
+            return
+        current = self._read_counters()
+        last = self._last
+        elapsed = max(current['time'] - last['time'], 1e-6)
+
+        def rate(counters: str, field: str) -> float:
+            if current[counters] is None or last[counters] is None:
+                return np.nan
+            # Counters can reset (e.g. a network adapter is re-enabled)
+            return max(0.0, (getattr(current[counters], field) - getattr(last[counters], field)) / elapsed)
+
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        row = (
+            current['time'],
+            _busy_percent(last['cpu'], current['cpu']),
+            memory.percent,
+            swap.percent,
+            rate('disk', 'read_bytes'),
+            rate('disk', 'write_bytes'),
+            rate('net', 'bytes_sent'),
+            rate('net', 'bytes_recv')
+        )
+        cores = [_busy_percent(b, a) for b, a in zip(last['cores'], current['cores'])]
+        cores += [np.nan] * (self.cpu_count - len(cores))
+
+        with self._lock:
+            self.system.append(row)
+            self.cores.append(cores[:self.cpu_count])
+            self.samples += 1
+        self._last = current
+
+        if (self.samples - 1) % self.process_every == 0:
+            self._sample_processes(current['time'])
+        self._first_sample.set()
+
+        metrics = dict(zip(SYSTEM_COLUMNS[1:], row[1:]))
+        for listener in self._listeners:
+            try:
+                listener(current['time'], metrics)
+            except Exception as e:
+                logging.error(f"Error in metrics listener: {e}")
+
+    def _sample_processes(self, timestamp: float, record: bool = True):
+        """Refresh the process table; CPU percentages cover the time since the last refresh"""
+        # The shared table keeps Process objects between refreshes, which is
+        # what makes cpu_percent report usage since the previous refresh
+        table = [
+            {key: proc[key] for key in ('pid', 'name', 'cpu_percent', 'memory_percent', 'memory_mb', 'status')}
+            for proc in process_table.snapshot(with_usage=True, max_age=0)
+        ]
+
+        if not record:
+            return
+        with self._lock:
+            live = set()
+            for proc in table:
+                pid = proc['pid']
+                live.add(pid)
+                history = self.process_history.get(pid)
+                if history is None:
+                    history = self.process_history[pid] = RingBuffer(PROCESS_HISTORY_SAMPLES, len(PROCESS_COLUMNS))
+                history.append((timestamp, proc['cpu_percent'], proc['memory_mb']))
+            for pid in list(self.process_history):
+                if pid not in live:
+                    del self.process_history[pid]
+            self.process_table = table
+
+    # Queries
+
+    def history(self, metric: str, seconds: Optional[float] = None) -> np.ndarray:
+        """Rows of (timestamp, value) for a system metric, oldest first"""
+        column = SYSTEM_COLUMNS.index(metric)
+        with self._lock:
+            rows = self.system.values()
+        if seconds is not None and len(rows):
+            rows = rows[rows[:, 0] >= rows[-1, 0] - seconds]
+        return rows[:, [0, column]]
+
+    def latest(self) -> Dict[str, float]:
+        """Most recent sample as a dict"""
+        with self._lock:
+            row = self.system.latest()
+            cores = self.cores.latest()
+        if row is None:
+            return {}
+        latest = dict(zip(SYSTEM_COLUMNS, (float(v) for v in row)))
+        latest['cpu_per_core'] = [round(float(v), 1) for v in cores if not np.isnan(v)]
+        return latest
+
+    def summary(self, metric: str, seconds: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Statistics of a system metric over the last ``seconds`` (all history by default)"""
+        return summarize(self.history(metric, seconds)[:, 1])
+
+    def processes(self) -> List[Dict]:
+        """Latest process table, with average CPU over each process's recorded history"""
+        with self._lock:
+            table = [dict(proc) for proc in self.process_table]
+            averages = {pid: float(np.nanmean(history.values()[:, 1]))
+                        for pid, history in self.process_history.items() if len(history)}
+        for proc in table:
+            proc['cpu_percent_avg'] = round(averages.get(proc['pid'], proc['cpu_percent']), 2)
+        return table
+
+# Global instance
+metrics_sampler = MetricsSampler()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Metrics Store Module for Shadow AI
+On-disk time series of sampled metrics in columnar chunks with 1s/1m/1h tiers
+"""
+
+import os
+import time
+import logging
+import threading
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import METRICS_RETENTION_DAYS
+
+# (resolution in seconds, rows per sealed chunk)
+TIERS = ((1, 3600), (60, 1440), (3600, 24 * 30))
+
+class _Tier:
+    """
+    One resolution of the store.
+
+    New rows are appended to a raw binary tail file and kept in memory; once
+    ``chunk_rows`` rows have accumulated they are sealed into an immutable
+    column-major ``.npy`` chunk named after its first timestamp and the tail
+    is reset. Chunks older than the retention period are deleted whole.
+    """
+
+    def __init__(self, directory: Path, resolution: int, width: int, chunk_rows: int, retention: float):
+        self.directory = directory
+        self.resolution = resolution
+        self.width = width
+        self.chunk_rows = chunk_rows
+        self.retention = retention
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.buffer = np.full((chunk_rows, width), np.nan)
+        self.n = 0
+        self._tail_path = self.directory / "tail.bin"
+        self._load_tail()
+        self._tail = open(self._tail_path, 'ab')
+
+    def _chunks(self) -> List[Path]:
+        return sorted(self.directory.glob("*.npy"), key=lambda p: int(p.stem))
+
+    def _load_tail(self):
+        if not self._tail_path.exists():
+            return
+        rows = np.fromfile(self._tail_path, dtype=np.float64)
+        # A crash can leave a partial last row
+        rows = rows[:len(rows) // self.width * self.width].reshape(-1, self.width)
+        chunks = self._chunks()
+        if chunks and len(rows):
+            # Rows already sealed before a crash could truncate the tail
+            sealed_until = np.load(chunks[-1], mmap_mode='r')[0, -1]
+            rows = rows[rows[:, 0] > sealed_until]
+        rows = rows[-self.chunk_rows:]
+        self.buffer[:len(rows)] = rows
+        self.n = len(rows)
+        with open(self._tail_path, 'wb') as f:
+            f.write(np.ascontiguousarray(rows).tobytes())
+
+    def append(self, row: np.ndarray):
+        self._tail.write(row.tobytes())
+        self._tail.flush()
+        self.buffer[self.n] = row
+        self.n += 1
+        if self.n == self.chunk_rows:
+            self._seal()
+
+    def _seal(self):
+        rows = self.buffer[:self.n]
+        path = self.directory / f"{int(rows[0, 0])}.npy"
+        tmp_path = self.directory / "sealing.npy"
+        np.save(tmp_path, np.ascontiguousarray(rows.T))
+        os.replace(tmp_path, path)
+        self._tail.close()
+        self._tail = open(self._tail_path, 'wb')
+        self.n = 0
+        self._prune()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        chunks = self._chunks()
+        # A chunk ends where the next one starts
+        for chunk, following in zip(chunks, chunks[1:]):
+            if int(following.stem) < cutoff:
+                try:
+                    chunk.unlink()
+                except OSError:
+                    pass
+
+    def read(self, start: float, end: float) -> np.ndarray:
+        """Rows with timestamps in [start, end], oldest first"""
+        parts = []
+        chunks = self._chunks()
+        for i, chunk in enumerate(chunks):
+            chunk_start = int(chunk.stem)
+            chunk_end = int(chunks[i + 1].stem) if i + 1 < len(chunks) else float('inf')
+            if chunk_start > end or chunk_end < start:
+                continue
+            columns = np.load(chunk, mmap_mode='r')
+            timestamps = np.asarray(columns[0])
+            mask = (timestamps >= start) & (timestamps <= end)
+            parts.append(np.asarray(columns[:, mask]).T)
+        rows = self.buffer[:self.n]
+        parts.append(rows[(rows[:, 0] >= start) & (rows[:, 0] <= end)])
+        return np.concatenate(parts) if parts else np.zeros((0, self.width))
+
+    def close(self):
+        self._tail.close()
+
+class MetricsStore:
+    """
+    Persists metric samples at full resolution and as 1-minute and 1-hour
+    aggregates (mean and max of each metric).
+
+    Aggregates are built incrementally: samples accumulate in the bucket for
+    the current minute, and a finished minute is written to the 1m tier and
+    fed into the current hour.
+    """
+
+    def __init__(self, metrics: Sequence[str], directory: Optional[Path] = None,
+                 retention_days: Dict[int, float] = None):
+        self.metrics = tuple(metrics)
+        self.directory = Path(directory) if directory else Path.home() / ".shadow_ai" / "metrics"
+        retention_days = retention_days or METRICS_RETENTION_DAYS
+        m = len(self.metrics)
+        self.tiers = {
+            resolution: _Tier(self.directory / f"{resolution}s", resolution,
+                              1 + m if resolution == 1 else 1 + 2 * m,
+                              chunk_rows, retention_days[resolution] * 86400)
+            for resolution, chunk_rows in TIERS
+        }
+        # Rows (timestamp, means..., maxes...) of the bucket being aggregated per tier
+        self._pending: Dict[int, List[np.ndarray]] = {resolution: [] for resolution, _ in TIERS[1:]}
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """Store one sample"""
+        row = np.array([timestamp] + [values.get(metric, np.nan) for metric in self.metrics], dtype=np.float64)
+        with self._lock:
+            self.tiers[1].append(row)
+            # A raw sample is its own mean and max
+            self._roll_up(TIERS[1][0], np.concatenate([row, row[1:]]))
+
+    def _roll_up(self, resolution: int, row: np.ndarray):
+        pending = self._pending[resolution]
+        bucket = row[0] // resolution * resolution
+        if pending and pending[0][0] // resolution * resolution != bucket:
+            self._emit(resolution)
+        pending.append(row)
+
+    def _emit(self, resolution: int):
+        """Write the aggregate of the pending bucket and pass it to the next tier"""
+        pending = np.array(self._pending[resolution])
+        self._pending[resolution] = []
+        m = len(self.metrics)
+        with warnings.catch_warnings():
+            # Metrics that were never available aggregate to NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            aggregate = np.concatenate([
+                [pending[0, 0] // resolution * resolution],
+                np.nanmean(pending[:, 1:1 + m], axis=0),
+                np.nanmax(pending[:, 1 + m:], axis=0)
+            ])
+        self.tiers[resolution].append(aggregate)
+        following = [r for r, _ in TIERS if r > resolution]
+        if following:
+            self._roll_up(following[0], aggregate)
+
+    def query(self, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[int] = None, statistic: str = 'mean') -> np.ndarray:
+        """
+        Get (timestamp, value) rows for a metric
+
+        Args:
+            resolution: 1, 60 or 3600; by default the finest tier that keeps the
+                result under a few thousand points
+            statistic: 'mean' or 'max' for the aggregated tiers
+        """
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if resolution is None:
+            span = end - start
+            resolution = 1 if span <= 2 * 3600 else 60 if span <= 3 * 86400 else 3600
+        index = self.metrics.index(metric)
+        column = 1 + index if resolution == 1 or statistic == 'mean' else 1 + len(self.metrics) + index
+        with self._lock:
+            rows = self.tiers[resolution].read(start, end)
+        return rows[:, [0, column]]
+
+    def close(self):
+        """Write the partial aggregate buckets and close the tail files"""
+        with self._lock:
+            for resolution, _ in TIERS[1:]:
+                if self._pending[resolution]:
+                    self._emit(resolution)
+            for tier in self.tiers.values():
+                tier.close()
+        logging.info("Metrics store closed")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Process Table Module for Shadow AI
+Shared, rate-limited process snapshot that only inspects new and exited PIDs
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import psutil
+
+from config import PROCESS_TABLE_MAX_AGE_MS, PROCESS_TABLE_RECHECK_SECONDS
+
+class ProcessTable:
+    """
+    PID-keyed cache of running processes.
+
+    A refresh lists the PIDs, creates a ``psutil.Process`` (and reads its
+    name and start time) only for PIDs that were not seen before, and drops
+    the ones that exited. A known PID whose start time has not been checked
+    for ``recheck`` seconds is looked up again, so a reused PID is not
+    reported under the exited process's name. Usage figures (CPU, memory,
+    status) are read only when asked for, inside ``Process.oneshot()`` so
+    each process costs a single pass over its OS data. Keeping the
+    ``Process`` objects between refreshes is also what makes ``cpu_percent``
+    cover the interval since the previous usage refresh.
+
+    Callers within ``max_age`` of the last refresh get the cached table.
+    """
+
+    def __init__(self, max_age: float = PROCESS_TABLE_MAX_AGE_MS / 1000,
+                 recheck: float = PROCESS_TABLE_RECHECK_SECONDS):
+        self.max_age = max_age
+        self.recheck = recheck
+        self._processes: Dict[int, psutil.Process] = {}
+        self._rows: Dict[int, Dict] = {}
+        self._checked_at: Dict[int, float] = {}  # When each PID's start time was last read
+        self._refreshed_at = 0.0
+        self._usage_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'refreshes': 0, 'usage_refreshes': 0, 'started': 0, 'exited': 0, 'reused': 0}
+
+    def _add(self, pid: int) -> bool:
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                row = {'pid': pid, 'name': proc.name() or '', 'create_time': proc.create_time()}
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+        self._processes[pid] = proc
+        self._rows[pid] = row
+        self._checked_at[pid] = time.monotonic()
+        self.stats['started'] += 1
+        return True
+
+    def _remove(self, pid: int):
+        self._processes.pop(pid, None)
+        self._rows.pop(pid, None)
+        self._checked_at.pop(pid, None)
+        self.stats['exited'] += 1
+
+    def _sync_pids(self):
+        """Apply the PID delta since the previous refresh"""
+        pids = set(psutil.pids())
+        known = set(self._processes)
+        for pid in known - pids:
+            self._remove(pid)
+        for pid in pids - known:
+            self._add(pid)
+        now = time.monotonic()
+        for pid in known & pids:
+            if now - self._checked_at[pid] >= self.recheck:
+                self._recheck(pid, now)
+        self._refreshed_at = now
+        self.stats['refreshes'] += 1
+
+    def _recheck(self, pid: int, now: float):
+        """Replace a known PID's row if the PID now belongs to another process"""
+        try:
+            # Process objects cache their start time, so a fresh one reads it again
+            create_time = psutil.Process(pid).create_time()
+        except psutil.NoSuchProcess:
+            self._remove(pid)
+            return
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            self._checked_at[pid] = now
+            return
+        if create_time == self._rows[pid]['create_time']:
+            self._checked_at[pid] = now
+            return
+        self._remove(pid)
+        self.stats['reused'] += 1
+        self._add(pid)
+
+    def _read_usage(self):
+        total_memory = psutil.virtual_memory().total or 1
+        for pid, proc in list(self._processes.items()):
+            row = self._rows[pid]
+            try:
+                with proc.oneshot():
+                    rss = proc.memory_info().rss
+                    row.update({
+                        'cpu_percent': proc.cpu_percent(),
+                        'memory_percent': round(rss / total_memory * 100, 2),
+                        'memory_mb': round(rss / (1024**2), 2),
+                        'status': proc.status()
+                    })
+            except psutil.NoSuchProcess:
+                # Exited since the PID sync; a new process on the PID is added by the next one
+                self._remove(pid)
+            except psutil.AccessDenied:
+                row.setdefault('cpu_percent', 0.0)
+                row.setdefault('memory_percent', 0.0)
+                row.setdefault('memory_mb', 0.0)
+                row.setdefault('status', None)
+        self._usage_at = time.monotonic()
+        self.stats['usage_refreshes'] += 1
+
+    def snapshot(self, with_usage: bool = False, max_age: Optional[float] = None) -> List[Dict]:
+        """
+        Get the process table
+
+        Args:
+            with_usage: Include cpu_percent, memory_percent, memory_mb and status
+            max_age: Seconds a cached table may be reused for (default: self.max_age)
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            try:
+                now = time.monotonic()
+                if with_usage:
+                    if now - self._usage_at >= max_age:
+                        self._sync_pids()
+                        self._read_usage()
+                elif now - self._refreshed_at >= max_age:
+                    self._sync_pids()
+            except Exception as e:
+                logging.error(f"Error refreshing process table: {e}")
+            rows = [dict(row) for row in self._rows.values()]
+        if with_usage:
+            rows = [row for row in rows if 'cpu_percent' in row]
+        return rows
+
+    def names(self, max_age: Optional[float] = None) -> List[str]:
+        """Distinct names of the running processes"""
+        return sorted({row['name'] for row in self.snapshot(max_age=max_age) if row['name']})
+
+# Global instance
+process_table = ProcessTable()
@@ -0,0 +1,199 @@
+"""
+Readiness Waits for Shadow AI
+Polls concrete UI/process conditions with exponential backoff instead of fixed sleeps
+"""
+
+import logging
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from config import (
+    READINESS_TIMEOUT, READINESS_POLL_INITIAL, READINESS_POLL_MAX,
+    READINESS_FALLBACK_DELAY
+)
+
+# Optional imports with fallbacks
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import win32gui
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+try:
+    import pyautogui
+    PYAUTOGUI_AVAILABLE = True
+except ImportError:
+    PYAUTOGUI_AVAILABLE = False
+
+def wait_until(condition: Callable[[], Any], timeout: float = READINESS_TIMEOUT,
+               initial_delay: float = READINESS_POLL_INITIAL,
+               max_delay: float = READINESS_POLL_MAX, backoff: float = 1.5,
+               description: str = "condition") -> bool:
+    """
+    Poll a condition until it is truthy or the deadline passes
+
+    The delay between polls starts at ``initial_delay`` and grows by
+    ``backoff`` up to ``max_delay``, so fast machines return almost
+    immediately while slow ones still get the full ``timeout``.
+
+    Returns:
+        True if the condition was met, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+
+    while True:
+        try:
+            if condition():
+                return True
+        except Exception as e:
+            logging.debug(f"Readiness check for {description} raised: {e}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logging.warning(f"Timed out after {timeout}s waiting for {description}")
+            return False
+
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_delay)
+
+def can_observe_windows() -> bool:
+    """Check whether foreground window state can be queried on this system"""
+    if WIN32_AVAILABLE:
+        return True
+    return PYAUTOGUI_AVAILABLE and hasattr(pyautogui, "getActiveWindow")
+
+def get_foreground_window() -> Tuple[Optional[Any], str]:
+    """Get the (handle, title) of the foreground window"""
+    try:
+        if WIN32_AVAILABLE:
+            hwnd = win32gui.GetForegroundWindow()
+            return hwnd, win32gui.GetWindowText(hwnd)
+        if PYAUTOGUI_AVAILABLE and hasattr(pyautogui, "getActiveWindow"):
+            window = pyautogui.getActiveWindow()
+            if window is not None:
+                return getattr(window, "_hWnd", window.title), window.title
+    except Exception as e:
+        logging.debug(f"Could not read foreground window: {e}")
+    return None, ""
+
+def get_window_class(handle: Any) -> str:
+    """Get the window class name of a handle (Windows only)"""
+    if WIN32_AVAILABLE and handle:
+        try:
+            return win32gui.GetClassName(handle)
+        except Exception as e:
+            logging.debug(f"Could not read window class: {e}")
+    return ""
+
+def window_exists(title_contains: str) -> bool:
+    """Check whether any visible window title contains the given text"""
+    needle = title_contains.lower()
+    if WIN32_AVAILABLE:
+        found = []
+
+        def enum_windows_callback(hwnd, _):
+            if win32gui.IsWindowVisible(hwnd) and needle in win32gui.GetWindowText(hwnd).lower():
+                found.append(hwnd)
+            return True
+
+        win32gui.EnumWindows(enum_windows_callback, None)
+        return bool(found)
+    if PYAUTOGUI_AVAILABLE and hasattr(pyautogui, "getWindowsWithTitle"):
+        return bool(pyautogui.getWindowsWithTitle(title_contains))
+    return False
+
+def _fallback_wait(description: str) -> bool:
+    """Used when the condition cannot be observed on this platform"""
+    logging.debug(f"Cannot observe {description}, waiting {READINESS_FALLBACK_DELAY}s instead")
+    time.sleep(READINESS_FALLBACK_DELAY)
+    return True
+
+def wait_for_process(name: str, timeout: float = READINESS_TIMEOUT) -> bool:
+    """Wait until a process with the given executable name is running"""
+    if not PSUTIL_AVAILABLE:
+        return _fallback_wait(f"process {name}")
+
+    target = name.lower()
+
+    from control.process_table import process_table
+
+    def process_running():
+        # Only PIDs that appeared since the previous poll are inspected
+        return any(process_name.lower() == target for process_name in process_table.names(max_age=0))
+
+    return wait_until(process_running, timeout, description=f"process {name}")
+
+def wait_for_window(title_contains: str, timeout: float = READINESS_TIMEOUT) -> bool:
+    """Wait until a visible window whose title contains the given text exists"""
+    if not can_observe_windows():
+        return _fallback_wait(f"window '{title_contains}'")
+    return wait_until(lambda: window_exists(title_contains), timeout,
+                      description=f"window '{title_contains}'")
+
+def wait_for_foreground_title(title_contains: str, present: bool = True,
+                              timeout: float = READINESS_TIMEOUT) -> bool:
+    """Wait until the foreground window title does (or no longer does) contain the text"""
+    if not can_observe_windows():
+        return _fallback_wait(f"foreground window '{title_contains}'")
+
+    needle = title_contains.lower()
+
+    def title_matches():
+        return (needle in get_foreground_window()[1].lower()) == present
+
+    state = "in" if present else "out of"
+    return wait_until(title_matches, timeout,
+                      description=f"'{title_contains}' {state} foreground")
+
+def wait_for_foreground_change(previous_handle: Any, title_contains: Optional[str] = None,
+                               timeout: float = READINESS_TIMEOUT) -> bool:
+    """Wait until a different window (optionally with a matching title) is in the foreground"""
+    if not can_observe_windows():
+        return _fallback_wait("foreground window change")
+
+    needle = title_contains.lower() if title_contains else None
+
+    def changed():
+        handle, title = get_foreground_window()
+        if handle is None or handle == previous_handle:
+            return False
+        return needle is None or needle in title.lower()
+
+    return wait_until(changed, timeout, description="foreground window change")
+
+# Class of standard Windows dialogs, including the common Save As dialog
+DIALOG_WINDOW_CLASS = "#32770"
+
+def wait_for_dialog(previous_handle: Any, timeout: float = READINESS_TIMEOUT) -> Tuple[bool, Any]:
+    """
+    Wait until a dialog replaces the given window in the foreground
+
+    The dialog is recognised by its window class where that can be read,
+    otherwise by the foreground handle changing, never by its title.
+
+    Returns:
+        (appeared, dialog handle)
+    """
+    if not can_observe_windows():
+        return _fallback_wait("dialog"), None
+
+    dialog = []
+
+    def dialog_shown():
+        handle, _ = get_foreground_window()
+        if handle is None or handle == previous_handle:
+            return False
+        if WIN32_AVAILABLE and get_window_class(handle) != DIALOG_WINDOW_CLASS:
+            return False
+        dialog[:] = [handle]
+        return True
+
+    appeared = wait_until(dialog_shown, timeout, description="dialog")
+    return appeared, dialog[0] if dialog else None
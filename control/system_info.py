@@ -5,6 +5,7 @@ Provides comprehensive system monitoring and diagnostics
 """
 
 import os
+import atexit
 import psutil
 import platform
 import socket
@@ -15,11 +16,68 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
+from config import METRIC_ALERT_RULES
+from control.metrics_sampler import metrics_sampler, SYSTEM_COLUMNS
+from control.metrics_store import MetricsStore
+from control.metric_alerts import AlertEngine, rule_threshold
+
+try:
+    from control.notifications import notification_manager
+    NOTIFICATIONS_AVAILABLE = True
+except ImportError:
+    NOTIFICATIONS_AVAILABLE = False
+
 class SystemDiagnostics:
     """System information and diagnostics"""
     
     def __init__(self):
         self.system_info = self.get_basic_system_info()
+        # Measurements come from the background sampler, started on first use
+        self.sampler = metrics_sampler
+        self.metrics_store: Optional[MetricsStore] = None
+        self.alert_engine: Optional[AlertEngine] = None
+    
+    def start_monitoring(self, store_directory: Optional[Path] = None) -> bool:
+        """Persist every sample and evaluate the alert rules as samples arrive"""
+        try:
+            if self.metrics_store is not None:
+                return True
+            self.metrics_store = MetricsStore(SYSTEM_COLUMNS[1:], store_directory)
+            self.alert_engine = AlertEngine.from_config(METRIC_ALERT_RULES, self._send_alert)
+            self.sampler.add_listener(self._on_sample)
+            self.sampler.ensure_started(wait=False)
+            atexit.register(self.stop_monitoring)
+            logging.info("System monitoring started")
+            return True
+        except Exception as e:
+            logging.error(f"Error starting system monitoring: {e}")
+            return False
+    
+    def stop_monitoring(self):
+        """Stop sampling and write out the partial aggregates"""
+        self.sampler.stop()
+        if self.metrics_store is not None:
+            self.metrics_store.close()
+    
+    def _on_sample(self, timestamp: float, metrics: Dict[str, float]):
+        self.metrics_store.append(timestamp, metrics)
+        self.alert_engine.evaluate(timestamp, metrics)
+    
+    def _send_alert(self, alert_type: str, details: str):
+        if NOTIFICATIONS_AVAILABLE:
+            notification_manager.show_system_alert(alert_type, details)
+    
+    def get_stored_metrics(self, metric: str, hours: float = 24, resolution: int = None) -> List[Tuple[float, float]]:
+        """Get persisted (timestamp, value) history of a metric, downsampled for long spans"""
+        try:
+            if self.metrics_store is None:
+                return []
+            now = datetime.now().timestamp()
+            rows = self.metrics_store.query(metric, now - hours * 3600, now, resolution)
+            return [(float(t), float(v)) for t, v in rows]
+        except Exception as e:
+            logging.error(f"Error reading stored metrics: {e}")
+            return []
     
     def get_basic_system_info(self) -> Dict:
         """Get basic system information"""
@@ -41,12 +99,14 @@ class SystemDiagnostics:
     def get_cpu_info(self) -> Dict:
         """Get detailed CPU information"""
         try:
+            self.sampler.ensure_started()
+            latest = self.sampler.latest()
             cpu_freq = psutil.cpu_freq()
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
             
             return {
-                'cpu_percent_total': psutil.cpu_percent(interval=1),
-                'cpu_percent_per_core': cpu_percent,
+                'cpu_percent_total': round(latest.get('cpu_percent', 0.0), 1),
+                'cpu_percent_per_core': latest.get('cpu_per_core', []),
+                'cpu_percent_1min': self.sampler.summary('cpu_percent', 60),
                 'cpu_frequency_current': cpu_freq.current if cpu_freq else None,
                 'cpu_frequency_min': cpu_freq.min if cpu_freq else None,
                 'cpu_frequency_max': cpu_freq.max if cpu_freq else None,
@@ -58,6 +118,25 @@ class SystemDiagnostics:
             logging.error(f"Error getting CPU info: {e}")
             return {}
     
+    def get_io_rates(self, seconds: float = 60) -> Dict:
+        """Get disk and network throughput (bytes per second) over the last ``seconds``"""
+        try:
+            self.sampler.ensure_started()
+            return {metric: self.sampler.summary(metric, seconds)
+                    for metric in ('disk_read_bps', 'disk_write_bps', 'net_sent_bps', 'net_recv_bps')}
+        except Exception as e:
+            logging.error(f"Error getting I/O rates: {e}")
+            return {}
+    
+    def get_metric_history(self, metric: str, seconds: float = 300) -> List[Tuple[float, float]]:
+        """Get (timestamp, value) samples of a metric such as 'cpu_percent' or 'net_recv_bps'"""
+        try:
+            self.sampler.ensure_started()
+            return [(float(t), float(v)) for t, v in self.sampler.history(metric, seconds)]
+        except Exception as e:
+            logging.error(f"Error getting metric history: {e}")
+            return []
+    
     def get_memory_info(self) -> Dict:
         """Get memory information"""
         try:
@@ -105,6 +184,7 @@ class SystemDiagnostics:
     def get_network_info(self) -> Dict:
         """Get network information"""
         try:
+            self.sampler.ensure_started()
             network_stats = psutil.net_io_counters()
             network_interfaces = psutil.net_if_addrs()
             
@@ -122,6 +202,8 @@ class SystemDiagnostics:
             return {
                 'bytes_sent': network_stats.bytes_sent,
                 'bytes_received': network_stats.bytes_recv,
+                'send_rate_bps': self.sampler.latest().get('net_sent_bps'),
+                'receive_rate_bps': self.sampler.latest().get('net_recv_bps'),
                 'packets_sent': network_stats.packets_sent,
                 'packets_received': network_stats.packets_recv,
                 'interfaces': interfaces,
@@ -135,15 +217,8 @@ class SystemDiagnostics:
     def get_running_processes(self, limit: int = 20) -> List[Dict]:
         """Get list of running processes"""
         try:
-            processes = []
-            
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-                try:
-                    proc_info = proc.info
-                    proc_info['memory_mb'] = round(proc.memory_info().rss / (1024**2), 2)
-                    processes.append(proc_info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            self.sampler.ensure_started()
+            processes = self.sampler.processes()
             
             # Sort by CPU usage
             processes.sort(key=lambda x: x.get('cpu_percent', 0), reverse=True)
@@ -232,17 +307,28 @@ class SystemDiagnostics:
                 'recommendations': []
             }
             
-            # Check CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            if cpu_percent > 90:
-                health_status['warnings'].append(f"High CPU usage: {cpu_percent}%")
-                health_status['overall_status'] = 'Warning'
+            # CPU and memory limits come from the alert rules so both agree
+            cpu_limit = rule_threshold(METRIC_ALERT_RULES, 'cpu_percent') or 90.0
+            memory_limit = rule_threshold(METRIC_ALERT_RULES, 'memory_percent') or 90.0
             
-            # Check memory usage
+            # Check CPU usage, averaged over the last minute so short spikes don't count
+            self.sampler.ensure_started()
+            cpu_percent = self.sampler.summary('cpu_percent', 60)['mean'] or 0.0
             memory = psutil.virtual_memory()
-            if memory.percent > 90:
-                health_status['warnings'].append(f"High memory usage: {memory.percent}%")
-                health_status['overall_status'] = 'Warning'
+            
+            if self.alert_engine is not None:
+                # Alert rules currently firing on the sampled metrics
+                for name in self.alert_engine.active_alerts():
+                    health_status['warnings'].append(f"Alert active: {name}")
+                    health_status['overall_status'] = 'Warning'
+            else:
+                # Monitoring not started, so compare the current readings directly
+                if cpu_percent > cpu_limit:
+                    health_status['warnings'].append(f"High CPU usage: {cpu_percent}%")
+                    health_status['overall_status'] = 'Warning'
+                if memory.percent > memory_limit:
+                    health_status['warnings'].append(f"High memory usage: {memory.percent}%")
+                    health_status['overall_status'] = 'Warning'
             
             # Check disk space
             for partition in psutil.disk_partitions():
@@ -268,16 +354,16 @@ class SystemDiagnostics:
                 pass  # Temperature sensors not available
             
             # Add recommendations
-            if cpu_percent > 80:
+            if cpu_percent > cpu_limit - 10:
                 health_status['recommendations'].append("Consider closing unnecessary applications to reduce CPU usage")
             
-            if memory.percent > 80:
+            if memory.percent > memory_limit - 10:
                 health_status['recommendations'].append("Consider closing memory-intensive applications")
             
-            # Check if there are any errors
+            # Critical once a reading is halfway from its limit to saturation
             if health_status['warnings']:
-                if any('High' in warning or 'Low' in warning for warning in health_status['warnings']):
-                    health_status['overall_status'] = 'Critical' if cpu_percent > 95 or memory.percent > 95 else 'Warning'
+                if cpu_percent > (cpu_limit + 100) / 2 or memory.percent > (memory_limit + 100) / 2:
+                    health_status['overall_status'] = 'Critical'
             
             return health_status
             
@@ -342,8 +428,22 @@ class SystemDiagnostics:
             cpu_info = self.get_cpu_info()
             report.append(f"CPU Usage: {cpu_info.get('cpu_percent_total', 'N/A')}%")
             report.append(f"CPU Frequency: {cpu_info.get('cpu_frequency_current', 'N/A')} MHz")
+            cpu_stats = cpu_info.get('cpu_percent_1min') or {}
+            if cpu_stats.get('mean') is not None:
+                report.append(f"CPU Last Minute: avg {cpu_stats['mean']}%, p95 {cpu_stats['p95']}%, max {cpu_stats['max']}%")
             report.append("")
             
+            # I/O rates
+            io_rates = self.get_io_rates()
+            if io_rates:
+                report.append("I/O RATES (last minute average):")
+                report.append("-" * 35)
+                for metric, label in (('disk_read_bps', 'Disk Read'), ('disk_write_bps', 'Disk Write'),
+                                      ('net_sent_bps', 'Network Sent'), ('net_recv_bps', 'Network Received')):
+                    mean = io_rates[metric]['mean']
+                    report.append(f"{label}: {mean / 1024:.1f} KB/s" if mean is not None else f"{label}: N/A")
+                report.append("")
+            
             # Memory info
             report.append("MEMORY INFORMATION:")
             report.append("-" * 25)
@@ -34,7 +34,7 @@ except ImportError:
         enhanced_controller = None
 
 try:
-    from brain.gpt_agent import process_command
+    from brain.gpt_agent import process_command, agent as chat_agent
     AI_AVAILABLE = True
 except ImportError:
     AI_AVAILABLE = False
@@ -834,6 +834,10 @@ For more information, visit the Settings tab or check the documentation.
                 else:
                     self.add_chat_message("🤖 Shadow AI", "❌ Desktop controller not available", "assistant")
                     
+            elif AI_AVAILABLE and chat_agent.client_available:
+                self.stream_chat_response(command)
+                self.log_activity("AI response streamed", "success")
+                
             else:
                 self.add_chat_message("🤖 Shadow AI", "🤔 I'm not sure how to handle that command. Try:\n• 'write an article about AI'\n• 'write an article about ASI and save it as ASI.txt'\n• 'open notepad'\n• 'take a screenshot'", "assistant")
                 
@@ -841,6 +845,21 @@ For more information, visit the Settings tab or check the documentation.
             self.add_chat_message("🤖 Shadow AI", f"❌ Error executing command: {e}", "assistant")
             self.log_activity(f"Command error: {e}", "error")
             
+    def stream_chat_response(self, prompt):
+        """Stream an AI response into the chat display as it is generated"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.root.after(0, self.append_chat_text, f"[{timestamp}] ")
+        
+        for chunk in chat_agent.generate_stream(prompt):
+            self.root.after(0, self.append_chat_text, chunk)
+            
+        self.root.after(0, self.append_chat_text, "\n\n")
+        
+    def append_chat_text(self, text):
+        """Append raw text to the chat display"""
+        self.chat_display.insert("end", text)
+        self.chat_display.see("end")
+        
     def add_chat_message(self, sender, message, msg_type):
         """Add message to chat display"""
         timestamp = datetime.now().strftime("%H:%M:%S")
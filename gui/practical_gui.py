@@ -40,6 +40,12 @@ try:
 except ImportError:
     SHADOW_AI_AVAILABLE = False
 
+try:
+    from brain.gpt_agent import agent as chat_agent
+    CHAT_AVAILABLE = True
+except ImportError:
+    CHAT_AVAILABLE = False
+
 class PracticalShadowAI:
     """Shadow AI GUI with practical, working features"""
     
@@ -373,6 +379,27 @@ class PracticalShadowAI:
             self.chat_display.insert(tk.END, formatted)
             self.chat_display.see(tk.END)
     
+    def is_chat_question(self, command):
+        """Check whether a command is a conversational question for the AI"""
+        command_lower = command.lower().strip()
+        return command_lower.startswith("ask ") or command_lower.endswith("?")
+    
+    def stream_chat_response(self, prompt):
+        """Stream an AI response into the chat as it is generated"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.root.after(0, self.append_chat_text, f"[{timestamp}] 🤖 ")
+        
+        for chunk in chat_agent.generate_stream(prompt):
+            self.root.after(0, self.append_chat_text, chunk)
+        
+        self.root.after(0, self.append_chat_text, "\n")
+    
+    def append_chat_text(self, text):
+        """Append raw text to the chat display"""
+        end = "end" if CTK_AVAILABLE else tk.END
+        self.chat_display.insert(end, text)
+        self.chat_display.see(end)
+    
     def update_status(self, status):
         """Update status"""
         if hasattr(self, 'status_label'):
@@ -415,6 +442,8 @@ class PracticalShadowAI:
                 self.write_article_about(topic)
             elif "open" in command_lower and any(app in command_lower for app in ["notepad", "calculator", "paint", "browser"]):
                 self.handle_open_command(command)
+            elif self.is_chat_question(command) and CHAT_AVAILABLE and chat_agent.client_available:
+                self.stream_chat_response(command)
             elif self.shadow_ai:
                 # Use Shadow AI for other commands
                 result = self.shadow_ai.handle_enhanced_commands(command)
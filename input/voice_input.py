@@ -3,6 +3,9 @@ import speech_recognition as sr
 import logging
 import pyttsx3
 import threading
+import queue
+import re
+from typing import Iterable, Iterator
 from config import VOICE_ENABLED, VOICE_LANGUAGE, VOICE_TIMEOUT, VOICE_PHRASE_TIME_LIMIT
 
 class VoiceInput:
@@ -67,6 +70,45 @@ class VoiceInput:
         except Exception as e:
             logging.error(f"Error in text-to-speech: {e}")
     
+    def speak_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Speak streamed text sentence by sentence while passing the chunks through"""
+        if not hasattr(self, '_tts_lock'):
+            self._tts_lock = threading.Lock()
+        
+        sentences = queue.Queue()
+        
+        def speaker_thread():
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    break
+                with self._tts_lock:
+                    try:
+                        self.tts_engine.say(sentence)
+                        self.tts_engine.runAndWait()
+                    except RuntimeError as e:
+                        logging.error(f"Error in text-to-speech: {e}")
+        
+        thread = threading.Thread(target=speaker_thread)
+        thread.daemon = True
+        thread.start()
+        
+        buffer = ""
+        try:
+            for chunk in chunks:
+                yield chunk
+                buffer += chunk
+                # Queue every completed sentence so speech starts before the stream ends
+                parts = re.split(r'(?<=[.!?])\s+', buffer)
+                for sentence in parts[:-1]:
+                    if sentence.strip():
+                        sentences.put(sentence)
+                buffer = parts[-1]
+        finally:
+            if buffer.strip():
+                sentences.put(buffer)
+            sentences.put(None)
+    
     def listen(self, prompt: str = None) -> str:
         """Listen for voice input and return recognized text"""
         if not VOICE_ENABLED:
@@ -156,6 +198,10 @@ def speak_response(text: str):
     """Speak a response to the user"""
     voice_input.speak(text)
 
+def speak_response_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """Speak a streamed response as it arrives, yielding the chunks for display"""
+    return voice_input.speak_stream(chunks)
+
 def confirm_action(question: str) -> bool:
     """Ask for voice confirmation"""
     return voice_input.listen_for_confirmation(question)
@@ -46,9 +46,10 @@ def safe_import_with_fallback(module_name, fallback_value=None, required=False):
 # Try to import pyautogui with fallback
 try:
     import pyautogui
+    from config import PYAUTOGUI_PAUSE
     PYAUTOGUI_AVAILABLE = True
-    # Configure pyautogui if available
-    pyautogui.PAUSE = 0.5
+    # Configure pyautogui if available; readiness waits handle synchronization
+    pyautogui.PAUSE = PYAUTOGUI_PAUSE
     pyautogui.FAILSAFE = True
 except ImportError:
     print("⚠️  pyautogui not available - desktop automation will be limited")
@@ -103,7 +104,7 @@ from control.documents import document_controller
 from input.text_input import get_text_input, show_message
 from input.voice_input import get_voice_input, speak_response
 from config import VOICE_ENABLED, REQUIRE_CONFIRMATION
-from utils.rag import search_knowledge_base
+from utils.rag import search_passages
 from automation.whatsapp_automation import WhatsAppAutomator
 from utils.orpheus_tts import speak as orpheus_speak
 
@@ -144,6 +145,13 @@ try:
 except ImportError:
     HOTKEYS_AVAILABLE = False
 
+# Undoing a batch moves files on disk, so only explicit requests reach it
+UNDO_FILE_PHRASES = (
+    "undo file organization", "undo the file organization", "undo folder organization",
+    "undo organizing", "undo the organizing", "undo last file operation",
+    "undo the last file operation", "undo file operation", "undo bulk file"
+)
+
 class ShadowAI:
     def __init__(self):
         self.running = False
@@ -256,10 +264,12 @@ class ShadowAI:
             
             # Initialize system diagnostics
             if SYSTEM_INFO_AVAILABLE:
+                system_diagnostics.start_monitoring()
                 logging.info("System diagnostics ready")
             
             # Initialize clipboard manager
             if CLIPBOARD_AVAILABLE:
+                clipboard_manager.start_watching()
                 logging.info("Clipboard management ready")
             
         except Exception as e:
@@ -477,11 +487,12 @@ class ShadowAI:
         try:
             logging.info(f"Processing universal command: {command}")
             # RAG: Search knowledge base for relevant info
-            kb_results = search_knowledge_base(command)
+            kb_results = search_passages(command)
             if kb_results:
                 print("📚 Found relevant info in knowledge base:")
-                for line in kb_results:
-                    print(f"  • {line}")
+                for passage in kb_results:
+                    source = f"{os.path.basename(passage['file'])}@{passage['offset']}"
+                    print(f"  • {passage['text'][:200]} ({source})")
             # Use Universal Processor to understand the command
             task = process_universal_command(command)
             if not task:
@@ -562,7 +573,9 @@ class ShadowAI:
             
             # File management commands
             if FILE_MANAGER_AVAILABLE:
-                if "organize" in command_lower and "folder" in command_lower:
+                if any(phrase in command_lower for phrase in UNDO_FILE_PHRASES):
+                    return self.handle_undo_file_operation(command)
+                elif "organize" in command_lower and "folder" in command_lower:
                     return self.handle_file_organization(command)
                 elif "find large files" in command_lower:
                     return self.handle_find_large_files(command)
@@ -793,12 +806,13 @@ class ShadowAI:
         🔥 Hotkeys: {'✅ Available' if HOTKEYS_AVAILABLE else '❌ Not Available'}
         
         🎯 Enhanced Commands Available:
-        • "organize Downloads folder by type"
+        • "organize Downloads folder by type" / "undo file organization"
         • "search Google for Python tutorials"
         • "show system information"
         • "copy this text to clipboard"
         • "find large files over 100MB"
         • "create backup of Documents"
+        • "restore backup of Documents" / "verify backups"
         • "show hotkey help"
         """
         print(features_status)
@@ -879,9 +893,35 @@ class ShadowAI:
             speak_response("Error finding large files")
             return True
     
+    def handle_undo_file_operation(self, command: str) -> bool:
+        """Handle undoing the last bulk file operation"""
+        try:
+            result = file_manager.undo_last_batch()
+            if "error" in result:
+                speak_response(result["error"])
+            else:
+                message = f"Undid {result['operations']} file operations"
+                if result['errors']:
+                    message += f", {len(result['errors'])} could not be reversed"
+                speak_response(message)
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error undoing file operation: {e}")
+            speak_response("Error undoing file operation")
+            return True
+    
     def handle_backup_command(self, command: str) -> bool:
         """Handle backup commands"""
         try:
+            if "verify" in command.lower():
+                result = file_manager.verify_backup()
+                if result.get("ok"):
+                    speak_response(f"All backups verified, {result['chunks_checked']} chunks intact")
+                else:
+                    speak_response("Backup verification found missing or damaged data")
+                return True
+            
             # Extract source from command
             if "documents" in command.lower():
                 source_path = os.path.join(os.path.expanduser('~'), 'Documents')
@@ -893,10 +933,21 @@ class ShadowAI:
                 speak_response("Please specify what to backup (documents, desktop, pictures)")
                 return True
             
+            if "restore" in command.lower():
+                result = file_manager.restore_backup(source_path)
+                if "error" in result:
+                    speak_response(result["error"])
+                else:
+                    speak_response(f"Restored {result['files']} files to {result['target']}")
+                return True
+            
             result = file_manager.create_backup(source_path)
             
             if result:
+                stats = file_manager.last_backup_stats
                 message = f"Backup created successfully"
+                if stats:
+                    message += f", {stats['changed_files']} files changed since the last backup"
                 speak_response(message)
                 if NOTIFICATIONS_AVAILABLE:
                     notify_success(message)
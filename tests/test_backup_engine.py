@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Backup Engine Test - Shadow AI
+Tests incremental deduplicating backups, restore and verify
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+backup_engine = pytest.importorskip("control.backup_engine")
+
+CHUNK = 4096
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Folder with text files, a shared large file and an empty folder"""
+    docs = tmp_path / "Documents"
+    (docs / "notes").mkdir(parents=True)
+    (docs / "empty").mkdir()
+    for i in range(5):
+        (docs / "notes" / f"note{i}.txt").write_text(f"note {i}\n" * 100)
+    payload = os.urandom(CHUNK * 3)
+    (docs / "data.bin").write_bytes(payload)
+    (docs / "data copy.bin").write_bytes(payload)
+    return docs
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return backup_engine.BackupRepository(str(tmp_path / "repo"), chunk_size=CHUNK, max_workers=2)
+
+
+def test_second_backup_only_reads_changes(repository, source):
+    """Unchanged files are skipped and identical chunks are stored once"""
+    first = repository.backup(str(source))
+    assert first['changed_files'] == 7
+    # The copy of data.bin shares all of its chunks
+    assert repository.get_stats()['chunks'] == 5 + 3
+
+    (source / "notes" / "note0.txt").write_text("edited")
+    (source / "new.txt").write_text("new file")
+    second = repository.backup(str(source))
+
+    assert second['unchanged_files'] == 6
+    assert second['changed_files'] == 2
+    assert second['bytes_read'] == len("edited") + len("new file")
+    assert [s['id'] for s in repository.list_snapshots(str(source))] == [first['snapshot'], second['snapshot']]
+
+
+def test_restore_round_trip(repository, source, tmp_path):
+    """A restored snapshot matches the source, including empty folders and mtimes"""
+    snapshot = repository.backup(str(source))['snapshot']
+    target = tmp_path / "restored"
+
+    stats = repository.restore(snapshot, str(target))
+
+    assert stats['files'] == 7 and not stats['errors']
+    for path in source.rglob("*"):
+        restored = target / path.relative_to(source)
+        if path.is_dir():
+            assert restored.is_dir()
+        else:
+            assert restored.read_bytes() == path.read_bytes()
+            assert restored.stat().st_mtime == pytest.approx(path.stat().st_mtime, abs=1e-3)
+
+    # Existing files are kept unless overwrite is requested
+    partial = repository.restore(snapshot, str(target), paths=["notes"])
+    assert partial['files'] == 0 and len(partial['errors']) == 5
+
+
+def test_verify_reports_damaged_chunks(repository, source):
+    """Missing and corrupted chunks are detected"""
+    repository.backup(str(source))
+    assert repository.verify()['ok']
+
+    chunk_files = sorted(p for p in (repository.chunks_dir).rglob("*") if p.is_file())
+    chunk_files[0].unlink()
+    chunk_files[1].write_bytes(b"r" + b"garbage")
+
+    result = repository.verify()
+    assert not result['ok']
+    assert len(result['missing']) == 1 and len(result['corrupt']) == 1
+
+
+def test_repository_inside_source_is_skipped(tmp_path, source):
+    """Backing up a folder that contains the repository does not back up the repository"""
+    repository = backup_engine.BackupRepository(str(source / "Shadow Backups"), chunk_size=CHUNK)
+    repository.backup(str(source))
+    second = repository.backup(str(source))
+
+    assert second['files'] == 7
+    assert second['changed_files'] == 0
+
+
+def test_backup_loads_only_the_previous_manifest(repository, source, monkeypatch):
+    """Finding the previous snapshot reads headers, not every manifest in the repository"""
+    for _ in range(3):
+        repository.backup(str(source))
+    loaded = []
+    load_snapshot = repository.load_snapshot
+    monkeypatch.setattr(repository, "load_snapshot", lambda sid: loaded.append(sid) or load_snapshot(sid))
+
+    stats = repository.backup(str(source))
+
+    assert stats['changed_files'] == 0
+    assert len(loaded) == 1
+
+
+def test_missing_headers_are_rebuilt_from_manifests(repository, source):
+    """Snapshots written without a header are still listed"""
+    first = repository.backup(str(source))['snapshot']
+    for header in repository.headers_dir.glob("*.json"):
+        header.unlink()
+
+    assert [s['id'] for s in repository.list_snapshots(str(source))] == [first]
+    assert (repository.headers_dir / f"{first}.json").exists()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bulk File Operations Test - Shadow AI
+Tests planned batch moves, the undo journal and organize by type
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+bulk_operations = pytest.importorskip("control.bulk_operations")
+
+
+@pytest.fixture
+def bulk(tmp_path):
+    return bulk_operations.BulkFileOperations(journal_dir=tmp_path / "journal", max_workers=4)
+
+
+@pytest.fixture
+def downloads(tmp_path):
+    folder = tmp_path / "Downloads"
+    folder.mkdir()
+    for name in ["a.PDF", "b.txt", "c.jpg", "d.mp3", "e.unknown", "f"]:
+        (folder / name).write_text(name)
+    (folder / "Images").mkdir()
+    (folder / "Images" / "c.jpg").write_text("already there")
+    return folder
+
+
+def test_extension_lookup():
+    """Categories come from one precomputed table"""
+    assert bulk_operations.get_category(".PDF") == "Documents"
+    assert bulk_operations.get_category(".py") == "Code"
+    assert bulk_operations.get_category("") == "Others"
+
+
+def test_organize_and_undo(bulk, downloads):
+    """A batch moves everything it can and undo restores the folder"""
+    before = sorted(p.relative_to(downloads).as_posix() for p in downloads.rglob("*"))
+
+    result = bulk.execute(bulk.plan_organize(str(downloads)), "organize")
+
+    assert len(result['succeeded']) == 5
+    assert len(result['skipped']) == 1  # c.jpg would overwrite Images/c.jpg
+    assert (downloads / "Documents" / "a.PDF").exists()
+    assert (downloads / "Others" / "f").exists()
+    assert bulk.list_batches()[0]['status'] == 'done'
+
+    undo = bulk.undo()
+
+    assert undo['errors'] == []
+    assert sorted(p.relative_to(downloads).as_posix() for p in downloads.rglob("*")) == before
+    assert bulk.list_batches()[0]['status'] == 'undone'
+    assert 'error' in bulk.undo(result['batch'])
+
+
+def test_undo_after_interrupted_batch(bulk, downloads):
+    """A batch without an outcome record (crash) is still undone from its plan"""
+    operations = bulk.plan_organize(str(downloads))
+    result = bulk.execute(operations[:2], "partial")
+    # Simulate a crash before the outcome record was written
+    journal = bulk._journal_path(result['batch'])
+    plan = journal.read_text().splitlines()[0]
+    journal.write_text(plan + "\n")
+
+    undo = bulk.undo()
+
+    assert undo['errors'] == []
+    assert all((downloads / name).exists() for name in ["a.PDF", "b.txt", "c.jpg", "d.mp3", "e.unknown", "f"])
+
+
+def test_copies_are_removed_by_undo(bulk, downloads, tmp_path):
+    """Undoing a copy batch deletes the copies and the folders it created"""
+    target = tmp_path / "copies" / "nested"
+    result = bulk.execute([bulk_operations.FileOperation('copy', str(downloads / "b.txt"), str(target / "b.txt"))])
+    assert (target / "b.txt").read_text() == "b.txt"
+
+    bulk.undo(result['batch'])
+
+    assert not (tmp_path / "copies").exists()
+    assert (downloads / "b.txt").exists()
+
+
+def test_undo_skips_failed_operations(bulk, downloads, tmp_path):
+    """A copy that failed because its destination existed is not deleted by undo"""
+    target = tmp_path / "copies"
+    operations = [bulk_operations.FileOperation('copy', str(downloads / name), str(target / name))
+                  for name in ["a.PDF", "b.txt"]]
+    # The destination appears after planning, so the copy fails at run time
+    original_run = bulk._run
+
+    def run(operation):
+        if operation.destination.endswith("b.txt"):
+            (target / "b.txt").write_text("not ours")
+        return original_run(operation)
+
+    bulk._run = run
+    result = bulk.execute(operations)
+    assert len(result['errors']) == 1
+
+    undo = bulk.undo(result['batch'])
+
+    assert undo['operations'] == 1
+    assert not (target / "a.PDF").exists()
+    assert (target / "b.txt").read_text() == "not ours"
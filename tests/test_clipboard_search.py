@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Clipboard Search Test - Shadow AI
+Tests the full-text clipboard history index
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+clipboard_store = pytest.importorskip("control.clipboard_store")
+clipboard_search = pytest.importorskip("control.clipboard_search")
+
+if not clipboard_search.FTS5_TRIGRAM_AVAILABLE:
+    pytest.skip("SQLite FTS5 trigram tokenizer not available", allow_module_level=True)
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=100)
+    index = clipboard_search.ClipboardSearchIndex(tmp_path / "search.db")
+
+    def add(content, operation="copy", timestamp=None):
+        item = store.append(content, operation, timestamp=timestamp)
+        index.add(item, store.first_id())
+        return item['id']
+
+    yield store, index, add
+    index.close()
+    store.close()
+
+
+def test_typos_still_match(history):
+    """Items sharing most of the query's trigrams are found, below exact matches"""
+    _, index, add = history
+    exact = add("ssh deploy@production-server")
+    typo = add("production server password")
+    add("shopping list: milk, eggs")
+
+    results = index.search("producton server")
+    assert [item_id for item_id, _ in results] == [typo, exact]
+
+    results = index.search("production-server")
+    assert results[0][0] == exact and results[0][1] > results[1][1]
+
+
+def test_recent_items_rank_higher(history):
+    _, index, add = history
+    old = add("meeting notes", timestamp=datetime.fromtimestamp(time.time() - 60 * 86400).isoformat())
+    new = add("meeting notes")
+
+    results = index.search("meeting notes")
+    assert [item_id for item_id, _ in results] == [new, old]
+    assert index.search("meeting notes", recency_weight=0)[0][1] == pytest.approx(1.0)
+
+
+def test_filters_by_operation_and_time(history):
+    _, index, add = history
+    week_ago = time.time() - 7 * 86400
+    copied = add("invoice 2024", "copy", datetime.fromtimestamp(week_ago).isoformat())
+    pasted = add("invoice 2025", "paste")
+
+    assert [i for i, _ in index.search("invoice", operation="paste")] == [pasted]
+    assert [i for i, _ in index.search("invoice", until=week_ago + 1)] == [copied]
+    assert [i for i, _ in index.search("invoice", since=week_ago + 1)] == [pasted]
+
+
+def test_index_follows_the_history(tmp_path):
+    """Evicted items leave the index and a reopened index catches up"""
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=3)
+    index = clipboard_search.ClipboardSearchIndex(tmp_path / "search.db")
+    for i in range(5):
+        index.add(store.append(f"note number {i}", "copy"), store.first_id())
+    assert sorted(i for i, _ in index.search("note number")) == [3, 4, 5]
+    index.close()
+
+    store.append("note number 5", "copy")
+    reopened = clipboard_search.ClipboardSearchIndex(tmp_path / "search.db")
+    assert reopened.sync(store) == 1
+    assert sorted(i for i, _ in reopened.search("note number")) == [4, 5, 6]
+    reopened.close()
+    store.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Clipboard Store Test - Shadow AI
+Tests the append-only clipboard history log
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+clipboard_store = pytest.importorskip("control.clipboard_store")
+
+
+def test_items_survive_reopening_with_full_content(tmp_path):
+    """Large items are compressed on disk and come back unchanged"""
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10, compress_bytes=100)
+    big = "line of copied text\n" * 500
+    store.append("short", "copy")
+    store.append(big, "copy")
+    store.close()
+
+    assert big.encode() not in b"".join(p.read_bytes() for p in tmp_path.glob("*.jsonl"))
+
+    reopened = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10, compress_bytes=100)
+    items = reopened.recent(5)
+    assert [item['content'] for item in items] == ["short", big]
+    assert items[1]['length'] == len(big)
+    assert reopened.latest()['digest'] == clipboard_store.content_digest(big)
+    reopened.close()
+
+
+def test_adding_appends_without_rewriting(tmp_path):
+    """Each item adds one line to the newest segment"""
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=1000, segment_bytes=1000)
+    for i in range(50):
+        store.append(f"item {i} " + "x" * 50, "copy")
+
+    segments = sorted(tmp_path.glob("segment-*.jsonl"))
+    assert len(segments) > 1
+    assert sum(len(p.read_text().splitlines()) for p in segments) == 50
+    assert store.recent(1)[0]['content'].startswith("item 49")
+    store.close()
+
+
+def test_compaction_drops_items_beyond_the_limit(tmp_path):
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=20, segment_bytes=500)
+    for i in range(100):
+        store.append(f"item {i}", "copy")
+    store.compact()
+
+    lines = sum(len(p.read_text().splitlines()) for p in tmp_path.glob("segment-*.jsonl"))
+    assert lines < 100
+    store.close()
+
+    reopened = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=20)
+    assert [item['content'] for item in reopened.recent(20)] == [f"item {i}" for i in range(80, 100)]
+    reopened.close()
+
+
+def test_interrupted_compaction_does_not_duplicate_items(tmp_path):
+    """Segments left over after a compaction replaced the first one are ignored"""
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=100, segment_bytes=200)
+    for i in range(30):
+        store.append(f"item {i}", "copy")
+    store.close()
+
+    segments = sorted(tmp_path.glob("segment-*.jsonl"))
+    leftover = segments[1].read_text()
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=100, segment_bytes=200)
+    store.compact()
+    store.close()
+    segments[1].write_text(leftover)  # As if the crash came before it was deleted
+
+    reopened = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=100)
+    assert [item['content'] for item in reopened.recent(100)] == [f"item {i}" for i in range(30)]
+    reopened.close()
+
+
+def test_partial_last_line_is_cut_before_appending(tmp_path):
+    """A record torn by a crash does not swallow the next one"""
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10)
+    store.append("first", "copy")
+    store.close()
+    segment = next(tmp_path.glob("*.jsonl"))
+    with open(segment, 'a', encoding='utf-8') as f:
+        f.write('{"id": 2, "content": "torn')
+
+    reopened = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10)
+    reopened.append("second", "copy")
+    reopened.close()
+
+    loaded = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10)
+    assert [(item['id'], item['content']) for item in loaded.recent(5)] == [(1, "first"), (2, "second")]
+    loaded.close()
+
+
+def test_lookup_by_id_survives_id_gaps(tmp_path):
+    """Items are found by their id even when earlier ids are missing"""
+    segment = tmp_path / "segment-000001.jsonl"
+    segment.write_text("".join(
+        f'{{"id": {item_id}, "timestamp": "2024-01-01T00:00:00", "operation": "copy", '
+        f'"length": 1, "digest": "d{item_id}", "content": "item {item_id}"}}\n'
+        for item_id in [1, 2, 5, 6]))
+
+    store = clipboard_store.ClipboardHistoryStore(tmp_path, max_items=10)
+
+    assert store.get(5)['content'] == "item 5"
+    assert store.get(3) is None
+    assert store.get(7) is None
+    assert [item['id'] for item in store.iter_after(2)] == [5, 6]
+    assert [item['id'] for item in store.iter_after(3)] == [5, 6]
+    store.close()
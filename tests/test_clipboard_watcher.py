@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Clipboard Watcher Test - Shadow AI
+Tests clipboard change detection and deduplicated history recording
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+clipboard_watcher = pytest.importorskip("control.clipboard_watcher")
+
+
+class FakeClipboard:
+    def __init__(self):
+        self.text = ""
+        self.sequence = 0
+        self.reads = 0
+
+    def set(self, text):
+        self.text = text
+        self.sequence += 1
+
+    def read(self):
+        self.reads += 1
+        return self.text
+
+
+def test_change_counter_avoids_reading_unchanged_clipboard():
+    clipboard, changes = FakeClipboard(), []
+    watcher = clipboard_watcher.ClipboardWatcher(clipboard.read, lambda text, digest: changes.append(text),
+                                                 change_counter=lambda: clipboard.sequence)
+    clipboard.set("first")
+    for _ in range(5):
+        watcher.poll()
+    assert clipboard.reads == 1
+
+    clipboard.set("second")
+    watcher.poll()
+    clipboard.set("second")  # Copied again: the counter moves but the content is the same
+    watcher.poll()
+    assert changes == ["first", "second"]
+    assert clipboard.reads == 3
+
+
+def test_polling_compares_content_hashes():
+    clipboard, changes = FakeClipboard(), []
+    watcher = clipboard_watcher.ClipboardWatcher(clipboard.read, lambda text, digest: changes.append((text, digest)))
+    watcher.poll()  # Empty clipboard is ignored
+    clipboard.set("hello")
+    watcher.poll()
+    watcher.poll()
+    assert [text for text, _ in changes] == ["hello"]
+    assert changes[0][1] == clipboard_watcher.content_digest("hello")
+
+
+def test_external_copies_are_deduplicated_against_whole_history(tmp_path, monkeypatch):
+    clipboard_manager = pytest.importorskip("control.clipboard_manager")
+    clipboard_store = pytest.importorskip("control.clipboard_store")
+    # The manager imports a legacy logs/clipboard_history.json relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    store = clipboard_store.ClipboardHistoryStore(tmp_path / "history")
+    manager = clipboard_manager.ClipboardManager(store)
+    assert manager.history_store is store
+
+    manager.add_to_history("alpha", "copy")
+    manager.add_to_history("beta", "copy")
+    manager._on_clipboard_change("alpha", clipboard_watcher.content_digest("alpha"))
+    manager._on_clipboard_change("gamma", clipboard_watcher.content_digest("gamma"))
+    assert manager.flush_history()
+
+    history = manager.get_history()
+    assert [item['content'] for item in history] == ["alpha", "beta", "gamma"]
+    assert history[-1]['operation'] == "external"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Context Store Test - Shadow AI
+Tests WAL setup, schema migrations and group-committed writes for the context database
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+context_store = pytest.importorskip("brain.context_store")
+universal_context = pytest.importorskip("brain.universal_context")
+
+
+def test_migrates_existing_database(tmp_path):
+    """A pre-migration memory.db keeps its rows and gains indexes and WAL"""
+    db_path = tmp_path / "memory.db"
+    conn = sqlite3.connect(str(db_path))
+    for statement in universal_context.MIGRATIONS[0]:
+        conn.execute(statement)
+    conn.execute(
+        "INSERT INTO task_history (task_id, user_command, task_category, execution_time, success, timestamp) "
+        "VALUES ('old', 'open notepad', 'app', 1.0, 1, '2024-01-01')"
+    )
+    conn.commit()
+    conn.close()
+
+    manager = universal_context.UniversalContextManager(db_path)
+
+    assert manager.schema_version == len(universal_context.MIGRATIONS)
+    assert manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[0] for row in manager.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_task_history_timestamp" in indexes
+    assert "idx_conversation_session" in indexes
+    assert manager.get_similar_tasks("open notepad")[0]['task_id'] == "old"
+    manager.close()
+
+
+def test_writes_are_visible_to_consistent_reads(tmp_path):
+    """Consistent reads wait for queued writes; other reads do not wait on the writer"""
+    manager = universal_context.UniversalContextManager(tmp_path / "memory.db")
+
+    manager.learn_user_preference("editor", "default", "notepad")
+    manager.add_user_query("write an article about space")
+
+    assert manager.get_user_preference("editor", "default") == "notepad"
+    count = manager._query("SELECT COUNT(*) FROM conversation_history", consistent=True)[0][0]
+    assert count == 1
+
+    flushes = []
+    flush = manager.writer.flush
+    manager.writer.flush = lambda *args: flushes.append(args) or flush(*args)
+    manager.get_top_patterns('word_frequency')
+    manager.get_pattern_frequency('word_frequency', 'space')
+    assert flushes == []
+    manager.close()
+
+
+def test_writer_groups_commits(tmp_path):
+    """A burst of writes is committed in far fewer transactions"""
+    db_path = tmp_path / "writes.db"
+    conn = context_store.connect(db_path)
+    conn.execute("CREATE TABLE items (value INTEGER)")
+    conn.commit()
+
+    writer = context_store.BackgroundWriter(db_path, batch_size=500)
+    gate = threading.Event()
+    writer.submit(lambda c: gate.wait(5))
+    for i in range(300):
+        writer.execute("INSERT INTO items (value) VALUES (?)", (i,))
+    gate.set()
+
+    assert writer.flush()
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 300
+    assert writer.get_stats()['batches_committed'] <= 2
+    writer.close()
+    conn.close()
+
+
+def test_pattern_counters_and_top_n(tmp_path):
+    """Repeated words increment one keyed counter and rank in top-N queries"""
+    manager = universal_context.UniversalContextManager(tmp_path / "memory.db")
+
+    manager.add_user_query("write article about space")
+    manager.add_user_query("write poem about space space")
+    assert manager.flush()
+    time_of_day = manager._get_time_context()['time_of_day']
+
+    assert manager.get_pattern_frequency('word_frequency', 'space') == 3
+    assert manager.get_pattern_frequency('temporal', f"time_pattern_{time_of_day}") == 2
+    top = manager.get_top_patterns('word_frequency', 2)
+    assert (top[0]['key'], top[0]['frequency']) == ('space', 3)
+    assert top[1]['frequency'] == 2
+    by_time = manager.get_top_patterns('word_by_time', 1, key_prefix=f"{time_of_day}:")
+    assert (by_time[0]['key'], by_time[0]['frequency']) == ('space', 3)
+    rows = manager._query("SELECT COUNT(*) FROM learning_patterns WHERE pattern_type = 'word_frequency'")
+    assert rows[0][0] == 5
+    manager.close()
+
+
+def test_legacy_temporal_patterns_are_migrated(tmp_path):
+    """Unkeyed legacy rows collapse into keyed temporal counters"""
+    db_path = tmp_path / "memory.db"
+    conn = sqlite3.connect(str(db_path))
+    context_store.apply_migrations(conn, universal_context.MIGRATIONS[:2])
+    for frequency in (2, 3):
+        conn.execute(
+            "INSERT INTO learning_patterns (pattern_type, pattern_data, frequency, last_seen, confidence) "
+            "VALUES ('temporal', '{\"time_of_day\": \"morning\"}', ?, '2024-01-01', 0.5)", (frequency,)
+        )
+    conn.execute(
+        "INSERT INTO learning_patterns (pattern_type, pattern_data, frequency, last_seen, confidence) "
+        "VALUES ('word_frequency', '{\"count\": 1}', 1, '2024-01-01', 0.5)"
+    )
+    conn.commit()
+    conn.close()
+
+    manager = universal_context.UniversalContextManager(db_path)
+
+    assert manager.get_pattern_frequency('temporal', 'time_pattern_morning') == 5
+    assert manager.get_top_patterns('word_frequency') == []
+    manager.close()
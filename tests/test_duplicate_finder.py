@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Duplicate Finder Test - Shadow AI
+Tests staged content-hash duplicate detection
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+duplicate_finder = pytest.importorskip("control.duplicate_finder")
+
+SAMPLE = 1024
+
+
+def find(*roots):
+    finder = duplicate_finder.DuplicateFinder(max_workers=2, sample_bytes=SAMPLE)
+    return finder, finder.find(*roots)
+
+
+def test_renamed_copies_are_duplicates(tmp_path):
+    """Copies are found whatever their names; same name and size is not enough"""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "report.txt").write_bytes(b"hello world")
+    (tmp_path / "b" / "copy of report.txt").write_bytes(b"hello world")
+    (tmp_path / "a" / "notes.txt").write_bytes(b"aaaaaaaaaaa")
+    (tmp_path / "b" / "notes.txt").write_bytes(b"bbbbbbbbbbb")
+
+    finder, duplicates = find(str(tmp_path))
+
+    assert sorted(map(sorted, duplicates.values())) == [
+        sorted([str(tmp_path / "a" / "report.txt"), str(tmp_path / "b" / "copy of report.txt")])
+    ]
+    # Small files are settled by the sampled hash alone
+    assert finder.stats['fully_hashed_files'] == 0
+
+
+def test_large_files_differing_in_the_middle(tmp_path):
+    """Files with equal heads and tails are told apart by the full hash"""
+    head, tail = b"h" * SAMPLE, b"t" * SAMPLE
+    (tmp_path / "one.bin").write_bytes(head + b"1" * 5000 + tail)
+    (tmp_path / "two.bin").write_bytes(head + b"2" * 5000 + tail)
+    (tmp_path / "three.bin").write_bytes(head + b"1" * 5000 + tail)
+
+    finder, duplicates = find(str(tmp_path))
+
+    assert list(map(sorted, duplicates.values())) == [
+        sorted([str(tmp_path / "one.bin"), str(tmp_path / "three.bin")])
+    ]
+    assert finder.stats['sampled_files'] == 3
+    assert finder.stats['fully_hashed_files'] == 3
+
+
+def test_unique_sizes_are_never_read(tmp_path):
+    """Files without a same-size partner skip hashing entirely"""
+    for i in range(1, 6):
+        (tmp_path / f"f{i}.bin").write_bytes(b"x" * i * 100)
+    (tmp_path / "empty1").write_bytes(b"")
+    (tmp_path / "empty2").write_bytes(b"")
+
+    finder, duplicates = find(str(tmp_path))
+
+    assert duplicates == {}
+    assert finder.stats['sampled_files'] == 0
+    assert finder.stats['bytes_read'] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "link"), reason="hard links not supported")
+def test_hard_links_are_not_duplicates(tmp_path):
+    """Two names for the same inode are one file"""
+    (tmp_path / "original").write_bytes(b"content")
+    try:
+        os.link(tmp_path / "original", tmp_path / "link")
+    except OSError:
+        pytest.skip("hard links not supported here")
+
+    _, duplicates = find(str(tmp_path))
+
+    assert duplicates == {}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Executor Test - Shadow AI
+Tests step timeouts and cancellation in the Universal Executor
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+step_runner = pytest.importorskip("brain.step_runner")
+
+
+def test_step_runner_returns_result_and_wall_time():
+    """Fast handlers return their result with the measured wall time"""
+    runner = step_runner.StepRunner(max_workers=2)
+    result, wall_time = runner.run(lambda x: x * 2, 21, timeout=1)
+
+    assert result == 42
+    assert 0 <= wall_time < 1
+    runner.shutdown()
+
+
+def test_step_runner_interrupts_stuck_handler():
+    """A busy handler is interrupted once it overruns its timeout"""
+    runner = step_runner.StepRunner(max_workers=1, cancel_grace_seconds=1)
+
+    def busy_handler():
+        while True:
+            time.sleep(0.01)
+
+    with pytest.raises(TimeoutError):
+        runner.run(busy_handler, timeout=0.1)
+
+    # The same worker is free again for the next step
+    assert runner.run(lambda: "next", timeout=1)[0] == "next"
+    assert runner.get_stats()["abandoned_workers"] == 0
+    runner.shutdown()
+
+
+def test_step_runner_replaces_unresponsive_worker():
+    """A handler blocked outside Python bytecode is abandoned and replaced"""
+    runner = step_runner.StepRunner(max_workers=1, cancel_grace_seconds=0.1)
+    release = threading.Event()
+
+    with pytest.raises(TimeoutError):
+        runner.run(release.wait, timeout=0.1)
+
+    assert runner.run(lambda: "still responsive", timeout=1)[0] == "still responsive"
+    stats = runner.get_stats()
+    assert stats["abandoned_workers"] == 1
+    assert stats["live_workers"] == 1
+    release.set()
+    runner.shutdown()
+
+
+def test_step_runner_keeps_handler_timeout_error():
+    """A TimeoutError raised by the handler itself is not a step timeout"""
+    runner = step_runner.StepRunner(max_workers=1)
+
+    def handler():
+        raise TimeoutError("connection timed out")
+
+    with pytest.raises(TimeoutError) as excinfo:
+        runner.run(handler, timeout=1)
+
+    assert not isinstance(excinfo.value, step_runner.StepTimeoutError)
+    runner.shutdown()
+
+
+def test_step_runner_does_not_interrupt_finished_job():
+    """An interrupt for a job that already finished never reaches the next job"""
+    runner = step_runner.StepRunner(max_workers=1)
+    job = runner.submit(lambda: "done")
+    assert job.future.result(timeout=1) == "done"
+
+    worker = runner._workers[0]
+    assert not worker.interrupt(job)
+    assert runner.run(lambda: (time.sleep(0.05), "next")[1], timeout=1)[0] == "next"
+    runner.shutdown()
+
+
+def test_executor_reports_timeouts():
+    """Timed-out steps are flagged in the step result and ExecutionResult"""
+    universal_executor = pytest.importorskip("brain.universal_executor")
+    from brain.universal_processor import TaskStep
+
+    executor = universal_executor.universal_executor
+    executor.action_handlers["slow_test_action"] = lambda step, context: time.sleep(5)
+    step = TaskStep(
+        step_number=1,
+        action="slow_test_action",
+        application="system",
+        parameters={},
+        expected_result="never",
+        error_handling="continue",
+        timeout_seconds=0.2
+    )
+
+    start = time.time()
+    result = executor._execute_step(step)
+    assert time.time() - start < 4
+    assert result["timed_out"] is True
+    assert result["success"] is False
+
+    execution = universal_executor.ExecutionResult(success=False, step_results=[result])
+    assert execution.timed_out_steps == [1]
+    assert execution.step_timings[1] >= 0.2
+
+
+def make_step(number, action, parameters=None, **kwargs):
+    from brain.universal_processor import TaskStep
+    return TaskStep(
+        step_number=number,
+        action=action,
+        application="test",
+        parameters=parameters or {},
+        expected_result="done",
+        error_handling="continue",
+        **kwargs
+    )
+
+
+def test_dependency_graph_inference():
+    """Placeholders, explicit dependencies and foreground ordering become edges"""
+    step_scheduler = pytest.importorskip("brain.step_scheduler")
+    steps = [
+        make_step(1, "open_notepad"),
+        make_step(2, "generate_article_content", {"topic": "AI"}),
+        make_step(3, "type_content", {"text": "{{generated_content}}"}),
+        make_step(4, "analyze_command", {"command": "log"}, depends_on=[1]),
+    ]
+
+    graph = step_scheduler.build_dependency_graph(steps)
+
+    assert graph[0] == set()
+    assert graph[1] == set()
+    assert graph[2] == {0, 1}
+    assert graph[3] == {0}
+
+
+def test_file_writing_steps_run_before_later_foreground_steps():
+    """A saved file is in place before a later step opens it by path"""
+    step_scheduler = pytest.importorskip("brain.step_scheduler")
+    steps = [
+        make_step(1, "create_document", {"filename": "notes.txt"}),
+        make_step(2, "save_file", {"path": "notes.txt", "content": "x"}),
+        make_step(3, "open_file", {"path": "notes.txt"}),
+    ]
+
+    graph = step_scheduler.build_dependency_graph(steps)
+
+    assert graph[1] == {0}
+    assert graph[2] == {1}
+
+
+def test_dependency_cycle_falls_back_to_sequential():
+    """Cyclic explicit dependencies run in plan order"""
+    step_scheduler = pytest.importorskip("brain.step_scheduler")
+    steps = [
+        make_step(1, "create_content", depends_on=[2]),
+        make_step(2, "create_content", depends_on=[1]),
+    ]
+
+    assert step_scheduler.build_dependency_graph(steps) == {0: set(), 1: {0}}
+
+
+def test_independent_steps_run_concurrently(monkeypatch):
+    """Background and foreground steps without dependencies overlap"""
+    universal_executor = pytest.importorskip("brain.universal_executor")
+    from brain.universal_processor import UniversalTask, TaskCategory, TaskComplexity
+
+    executor = universal_executor.universal_executor
+    spans = {}
+
+    def slow_generate(step, context):
+        start = time.time()
+        time.sleep(0.3)
+        spans["generate"] = (start, time.time())
+        return {"success": True, "context_updates": {"generated_content": "text"}}
+
+    def slow_open(step, context):
+        start = time.time()
+        time.sleep(0.3)
+        spans["open"] = (start, time.time())
+        return {"success": True}
+
+    typed = {}
+
+    def record_type(step, context):
+        typed["text"] = step.parameters["text"].replace("{{generated_content}}", context["generated_content"])
+        return {"success": True}
+
+    executor.action_handlers.update({
+        "test_generate": slow_generate,
+        "test_open": slow_open,
+        "test_type": record_type,
+    })
+    steps = [
+        make_step(1, "test_open"),
+        make_step(2, "test_generate", produces=["generated_content"]),
+        make_step(3, "test_type", {"text": "{{generated_content}}"}),
+    ]
+    task = UniversalTask(
+        task_id="parallel_test",
+        original_command="test",
+        category=TaskCategory.UNIVERSAL,
+        complexity=TaskComplexity.MODERATE,
+        description="Parallel scheduling test",
+        steps=steps,
+        estimated_duration=1,
+        risk_level="low",
+        requires_user_confirmation=False,
+        context_requirements=[],
+        success_criteria="Task completed"
+    )
+    step_scheduler = pytest.importorskip("brain.step_scheduler")
+    monkeypatch.setattr(step_scheduler, "BACKGROUND_ACTIONS",
+                        step_scheduler.BACKGROUND_ACTIONS | {"test_generate"})
+
+    result = executor.execute_task(task)
+
+    assert result.success
+    assert typed["text"] == "text"
+    assert [r["step_number"] for r in result.step_results] == [1, 2, 3]
+    # The two independent steps overlapped in time
+    assert spans["generate"][0] < spans["open"][1]
+    assert spans["open"][0] < spans["generate"][1]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+File Index Test - Shadow AI
+Tests the persistent file metadata index and its incremental refresh
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+file_index = pytest.importorskip("control.file_index")
+
+
+@pytest.fixture
+def root(tmp_path):
+    """Documents-like folder with a few nested files"""
+    docs = tmp_path / "docs"
+    for d in range(5):
+        folder = docs / f"project{d}" / "notes"
+        folder.mkdir(parents=True)
+        (folder / "readme.txt").write_text(f"project {d}")
+        (folder / "report.pdf").write_bytes(b"%PDF" + bytes([d]) * 100)
+    (docs / "big.iso").write_bytes(b"\0" * (3 * 1024 * 1024))
+    (docs / "copy.iso").write_bytes(b"\0" * (3 * 1024 * 1024))
+    return docs
+
+
+@pytest.fixture
+def index(tmp_path, root):
+    idx = file_index.FileIndex(db_path=tmp_path / "index.db", refresh_interval=3600)
+    idx.set_roots([str(root)])
+    yield idx
+    idx.close()
+
+
+def test_queries_are_answered_from_the_index(index, root):
+    """Lookups return the same answers as walking the folder"""
+    assert index.covers(str(root / "project1"))
+    assert not index.covers(str(root.parent))
+
+    assert len(index.find_files("*.pdf", str(root))) == 5
+    assert index.find_files("read*", str(root / "project2")) == [str(root / "project2" / "notes" / "readme.txt")]
+    assert [p for p, _ in index.find_large_files(str(root), 1024 * 1024)] == sorted(
+        [str(root / "big.iso"), str(root / "copy.iso")])
+
+    info = index.folder_info(str(root))
+    assert (info['file_count'], info['folder_count']) == (12, 10)
+    assert info['file_types'] == {'.txt': 5, '.pdf': 5, '.iso': 2}
+
+    duplicates = index.find_duplicates(str(root))
+    assert list(map(sorted, duplicates.values())) == [sorted([str(root / "big.iso"), str(root / "copy.iso")])]
+
+
+def test_refresh_only_relists_changed_directories(index, root):
+    """Unchanged directories are skipped; additions and deletions are picked up"""
+    index.refresh()
+    # Directory mtimes close to a refresh are not trusted, so age them first
+    for folder in [root] + [p for p in root.rglob("*") if p.is_dir()]:
+        os.utime(folder, ns=(10**18, 10**18))
+    index.refresh(full=True)
+
+    stats = index.refresh()
+    assert stats['dirs_checked'] == 11
+    assert stats['dirs_listed'] == 0
+
+    (root / "project3" / "notes" / "new.pdf").write_bytes(b"new")
+    (root / "project4" / "notes" / "report.pdf").unlink()
+    stats = index.refresh()
+    assert stats['dirs_listed'] == 2
+    assert len(index.find_files("*.pdf", str(root))) == 5
+    assert str(root / "project3" / "notes" / "new.pdf") in index.find_files("*.pdf", str(root))
+
+
+def test_removed_folders_leave_the_index(index, root):
+    """Deleting a folder tree removes its files and subfolders"""
+    index.refresh()
+    for path in sorted((root / "project0").rglob("*"), reverse=True):
+        path.rmdir() if path.is_dir() else path.unlink()
+    (root / "project0").rmdir()
+
+    index.mark_stale()
+    info = index.folder_info(str(root))
+    assert (info['file_count'], info['folder_count']) == (10, 8)
+
+
+def test_content_keys_are_cached(index, root):
+    """Duplicate detection reuses hashes until the file changes"""
+    index.find_duplicates(str(root))
+    keys = dict(index.conn.execute("SELECT path, content_key FROM files WHERE content_key IS NOT NULL"))
+    assert keys[str(root / "big.iso")] == keys[str(root / "copy.iso")]
+    assert len(keys) == 12
+
+    # An in-place edit with the same size is caught by the stat check
+    with open(root / "copy.iso", "r+b") as f:
+        f.write(b"changed")
+    os.utime(root / "copy.iso", (1, 1))
+    assert index.find_duplicates(str(root)) == {}
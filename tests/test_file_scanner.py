@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+File Scanner Test - Shadow AI
+Tests the parallel directory scanner and the file manager features built on it
+"""
+
+import dataclasses
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+file_scanner = pytest.importorskip("control.file_scanner")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """20 folders with 10 files each, plus one large file"""
+    for d in range(20):
+        folder = tmp_path / f"dir{d}" / "nested"
+        folder.mkdir(parents=True)
+        for f in range(10):
+            (folder / f"file{f}.txt").write_text("x" * f)
+    (tmp_path / "big.bin").write_bytes(b"\0" * (2 * 1024 * 1024))
+    return tmp_path
+
+
+def test_scan_streams_every_file_with_stat_data(tree):
+    """All files are yielded once with their sizes"""
+    entries = list(file_scanner.FileScanner(max_workers=4).scan(str(tree)))
+
+    assert len(entries) == 201
+    assert len({e.path for e in entries}) == 201
+    sizes = {e.name: e.size for e in entries if e.name in ("file7.txt", "big.bin")}
+    assert sizes == {"file7.txt": 7, "big.bin": 2 * 1024 * 1024}
+
+
+def test_following_symlinks_without_inodes(tree, monkeypatch):
+    """Every folder is walked and loops are cut even where stat reports no inode (Windows)"""
+    try:
+        os.symlink(tree, tree / "dir0" / "nested" / "loop", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Cannot create symbolic links here")
+    list_directory = file_scanner.FileScanner._list_directory
+
+    def without_inodes(path, follow_symlinks):
+        entries, errors = list_directory(path, follow_symlinks)
+        return [dataclasses.replace(entry, inode=0, device=0) for entry in entries], errors
+
+    monkeypatch.setattr(file_scanner.FileScanner, "_list_directory", staticmethod(without_inodes))
+    entries = list(file_scanner.FileScanner(max_workers=4).scan(str(tree), follow_symlinks=True))
+
+    assert len([e for e in entries if not e.is_dir]) == 201
+
+
+def test_scan_can_be_cancelled_and_resumed(tree):
+    """A cancelled scan resumes from its state without missing entries"""
+    scanner = file_scanner.FileScanner(max_workers=2)
+    cancel = threading.Event()
+    state = file_scanner.ScanState()
+    seen = set()
+
+    for entry in scanner.scan(str(tree), cancel_event=cancel, state=state):
+        seen.add(entry.path)
+        if len(seen) >= 30:
+            cancel.set()
+
+    assert not state.finished
+    assert len(seen) < 201
+
+    seen.update(entry.path for entry in scanner.scan(state=state))
+    assert state.finished
+    assert len(seen) == 201
+
+
+def test_progress_callback_reports_counts(tree):
+    """Progress is reported periodically and once at the end"""
+    reports = []
+    entries = list(file_scanner.FileScanner().scan(str(tree), include_dirs=True,
+                                                   progress_callback=reports.append, progress_interval=50))
+
+    assert len(reports) >= 4
+    assert reports[-1]['files'] == 201
+    assert reports[-1]['dirs'] == 40
+    assert len(entries) == 241
+
+
+def test_file_manager_features_use_scanner(tree):
+    """File manager lookups return the same answers as before"""
+    file_manager = pytest.importorskip("control.file_manager")
+    manager = file_manager.EnhancedFileManager()
+
+    assert len(manager.find_files("file3.*", str(tree))) == 20
+    assert len(manager.find_files("*.txt", str(tree), max_results=5)) == 5
+    assert manager.find_large_files(str(tree), min_size_mb=1) == [(str(tree / "big.bin"), 2)]
+    # Empty file0.txt copies are not reported as duplicates
+    assert len(manager.find_duplicate_files(str(tree))) == 9
+    info = manager.get_folder_info(str(tree))
+    assert (info["file_count"], info["folder_count"]) == (201, 40)
+    assert info["file_types"] == {".txt": 200, ".bin": 1}
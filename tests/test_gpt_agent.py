@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+GPT Agent Test - Shadow AI
+Tests the Ollama transport against a local fake Ollama HTTP server
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+gpt_agent = pytest.importorskip("brain.gpt_agent")
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive implementation of the Ollama endpoints we use"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self._send_json({"models": []})
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        words = ["echo:", " ", request["prompt"]]
+
+        if not request.get("stream"):
+            self._send_json({"response": "".join(words), "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, word in enumerate(words + [""]):
+            line = json.dumps({"response": word, "done": index == len(words)}) + "\n"
+            data = line.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def fake_ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.connections = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_agent(server):
+    return gpt_agent.GPTAgent("ollama", ollama_url=f"http://127.0.0.1:{server.server_port}")
+
+
+def test_generate_response_reuses_connection(fake_ollama):
+    """The availability probe and repeated requests share one keep-alive socket"""
+    agent = make_agent(fake_ollama)
+    assert agent.client_available
+
+    for prompt in ["one", "two", "three"]:
+        assert agent.generate_response(prompt) == f"echo: {prompt}"
+
+    assert len(fake_ollama.connections) == 1
+    agent.close()
+
+
+def test_generate_stream_yields_chunks(fake_ollama):
+    """Streaming returns the partial chunks in order"""
+    agent = make_agent(fake_ollama)
+
+    assert list(agent.generate_stream("hello")) == ["echo:", " ", "hello"]
+    agent.close()
+
+
+def test_agenerate_response_concurrent(fake_ollama):
+    """Concurrent async callers each get their own response"""
+    agent = make_agent(fake_ollama)
+    prompts = [f"prompt {i}" for i in range(5)]
+
+    async def run():
+        try:
+            return await asyncio.gather(*(agent.agenerate_response(p) for p in prompts))
+        finally:
+            await agent.aclose()
+
+    assert asyncio.run(run()) == [f"echo: {p}" for p in prompts]
+    agent.close()
+
+
+def test_unreachable_server_marks_client_unavailable():
+    """A failed probe falls back to the offline response"""
+    agent = gpt_agent.GPTAgent("ollama", ollama_url="http://127.0.0.1:1")
+
+    assert not agent.client_available
+    assert "don't have access" in agent.generate_response("hi")
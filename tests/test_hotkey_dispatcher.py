@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Hotkey Dispatcher Test - Shadow AI
+Tests admission, queueing and metrics of hotkey actions
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+hotkey_dispatcher = pytest.importorskip("control.hotkey_dispatcher")
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_mashing_a_hotkey_is_bounded():
+    """Extra triggers beyond the running and queued runs are dropped"""
+    release = threading.Event()
+    runs = []
+    dispatcher = hotkey_dispatcher.HotkeyDispatcher(max_workers=4)
+    dispatcher.register('slow', lambda: (runs.append(1), release.wait(2)),
+                        hotkey_dispatcher.ActionPolicy(max_concurrent=1, max_pending=1, debounce=0))
+
+    outcomes = [dispatcher.dispatch('slow') for _ in range(20)]
+    assert outcomes[:2] == ['started', 'queued']
+    assert outcomes[2:] == ['dropped'] * 18
+
+    release.set()
+    assert wait_for(lambda: dispatcher.get_metrics()['slow']['completed'] == 2)
+    metrics = dispatcher.get_metrics()['slow']
+    assert len(runs) == 2
+    assert metrics['dropped'] == 18 and metrics['running'] == 0 and metrics['pending'] == 0
+    dispatcher.shutdown()
+
+
+def test_repeats_within_debounce_window_are_coalesced():
+    runs = []
+    dispatcher = hotkey_dispatcher.HotkeyDispatcher()
+    dispatcher.register('quick', lambda: runs.append(1), hotkey_dispatcher.ActionPolicy(debounce=0.2))
+
+    assert dispatcher.dispatch('quick') == 'started'
+    assert dispatcher.dispatch('quick') == 'debounced'
+    time.sleep(0.25)
+    assert dispatcher.dispatch('quick') == 'started'
+    assert dispatcher.dispatch('missing') == 'unknown'
+
+    assert wait_for(lambda: len(runs) == 2)
+    assert dispatcher.get_metrics()['quick']['debounced'] == 1
+    dispatcher.shutdown()
+
+
+def test_exclusive_actions_never_overlap():
+    active, overlaps = [], []
+
+    def input_action():
+        active.append(1)
+        if len(active) > 1:
+            overlaps.append(1)
+        time.sleep(0.05)
+        active.pop()
+
+    dispatcher = hotkey_dispatcher.HotkeyDispatcher(max_workers=4)
+    for name in ('copy', 'paste', 'screenshot'):
+        dispatcher.register(name, input_action, hotkey_dispatcher.ActionPolicy(exclusive=True))
+        dispatcher.dispatch(name)
+
+    assert wait_for(lambda: all(m['completed'] == 1 for m in dispatcher.get_metrics().values()))
+    assert overlaps == []
+    dispatcher.shutdown()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Hotkey Matcher Test - Shadow AI
+Tests chord and sequence hotkey matching
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+hotkey_matcher = pytest.importorskip("control.hotkey_matcher")
+
+
+def press(matcher, combo, now=0.0):
+    """Press and release a chord like 'ctrl+k'; returns the matched action"""
+    *modifiers, key = combo.split('+')
+    for modifier in modifiers:
+        matcher.key_down(modifier, now)
+    action = matcher.key_down(key, now)
+    matcher.key_up(key)
+    for modifier in modifiers:
+        matcher.key_up(modifier)
+    return action
+
+
+def test_bindings_are_normalized():
+    assert hotkey_matcher.parse_binding("Shift+Ctrl+S") == ("ctrl+shift+s",)
+    assert hotkey_matcher.parse_binding("ctrl+k, N") == ("ctrl+k", "n")
+    with pytest.raises(ValueError):
+        hotkey_matcher.parse_binding("ctrl+shift")
+
+
+def test_chords_and_sequences_match():
+    matcher = hotkey_matcher.HotkeyMatcher({
+        'ctrl+shift+s': 'screenshot',
+        'ctrl+k, n': 'notepad',
+        'ctrl+k, ctrl+w': 'web_search',
+    })
+    # Side-specific modifier names from the keyboard libraries
+    matcher.key_down('left ctrl')
+    matcher.key_down('shift_r')
+    assert matcher.key_down('S') == 'screenshot'
+    matcher.key_up('S')
+    matcher.key_up('shift_r')
+    matcher.key_up('left ctrl')
+
+    assert press(matcher, 'ctrl+k') is None and matcher.in_sequence
+    assert press(matcher, 'n') == 'notepad'
+    assert not matcher.in_sequence
+
+    assert press(matcher, 'ctrl+k') is None
+    assert press(matcher, 'ctrl+w') == 'web_search'
+    assert press(matcher, 'n') is None  # Not in a sequence any more
+
+
+def test_auto_repeat_fires_once():
+    matcher = hotkey_matcher.HotkeyMatcher({'ctrl+shift+s': 'screenshot'})
+    matcher.key_down('ctrl')
+    matcher.key_down('shift')
+    assert matcher.key_down('s', now=0.0) == 'screenshot'
+    # Holding the key repeats key_down without a key_up
+    assert all(matcher.key_down('s', now=t / 10) is None for t in range(1, 20))
+    matcher.key_up('s')
+    assert matcher.key_down('s', now=2.0) == 'screenshot'
+
+
+def test_sequences_reset_after_timeout_or_wrong_key():
+    matcher = hotkey_matcher.HotkeyMatcher({'ctrl+k, n': 'notepad', 'x': 'other'}, timeout=1.0)
+
+    press(matcher, 'ctrl+k', now=0.0)
+    assert press(matcher, 'n', now=1.5) is None
+
+    press(matcher, 'ctrl+k', now=2.0)
+    assert press(matcher, 'x', now=2.1) == 'other'  # A wrong step can start a new binding
+    assert press(matcher, 'n', now=2.2) is None
+
+
+def test_conflicting_bindings_are_rejected():
+    with pytest.raises(ValueError):
+        hotkey_matcher.compile_bindings({'ctrl+k': 'a', 'ctrl+k, n': 'b'})
+    with pytest.raises(ValueError):
+        hotkey_matcher.compile_bindings({'ctrl+shift+s': 'a', 'shift+ctrl+s': 'b'})
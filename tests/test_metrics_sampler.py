@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Metrics Sampler Test - Shadow AI
+Tests the ring buffers and the background metrics sampler
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+np = pytest.importorskip("numpy")
+metrics_sampler = pytest.importorskip("control.metrics_sampler")
+
+
+def test_ring_buffer_keeps_latest_rows_in_order():
+    """Old rows are overwritten and values come back oldest first"""
+    ring = metrics_sampler.RingBuffer(capacity=4, width=2)
+    assert len(ring) == 0 and ring.latest() is None
+
+    for i in range(10):
+        ring.append((i, i * 10))
+
+    assert len(ring) == 4
+    assert ring.values()[:, 0].tolist() == [6, 7, 8, 9]
+    assert ring.values(last=2)[:, 1].tolist() == [80, 90]
+    assert ring.latest().tolist() == [9, 90]
+
+
+def test_summarize_reports_percentiles():
+    """Summaries ignore missing values"""
+    values = np.array([np.nan] + list(range(1, 101)), dtype=float)
+    summary = metrics_sampler.summarize(values)
+
+    assert summary['current'] == 100
+    assert summary['min'] == 1 and summary['max'] == 100
+    assert summary['p50'] == pytest.approx(50.5)
+    assert summary['p95'] == pytest.approx(95.05)
+    assert metrics_sampler.summarize(np.array([np.nan]))['mean'] is None
+
+
+def test_samples_are_rates_over_real_intervals():
+    """Each sample turns counter deltas into percentages and rates"""
+    sampler = metrics_sampler.MetricsSampler(interval=0.05, history_seconds=1, process_every=1)
+    sampler.sample()  # Baseline only
+    assert sampler.latest() == {}
+
+    for _ in range(3):
+        time.sleep(0.05)
+        sampler.sample()
+
+    latest = sampler.latest()
+    assert 0 <= latest['cpu_percent'] <= 100
+    assert len(latest['cpu_per_core']) >= 1
+    assert latest['net_recv_bps'] >= 0
+    assert len(sampler.history('memory_percent')) == 3
+    assert sampler.summary('cpu_percent')['max'] <= 100
+
+    processes = sampler.processes()
+    assert any(proc['pid'] == os.getpid() for proc in processes)
+    assert all('cpu_percent_avg' in proc for proc in processes)
+
+
+def test_background_thread_fills_buffers():
+    """Queries return instantly once the sampler thread is running"""
+    sampler = metrics_sampler.MetricsSampler(interval=0.05, history_seconds=10)
+    try:
+        sampler.ensure_started()
+        assert sampler.samples >= 1
+
+        start = time.time()
+        sampler.summary('cpu_percent', 60)
+        sampler.processes()
+        assert time.time() - start < 0.1
+    finally:
+        sampler.stop()
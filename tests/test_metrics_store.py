@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Metrics Store Test - Shadow AI
+Tests persisted metric tiers and incremental alert rules
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+np = pytest.importorskip("numpy")
+metrics_store = pytest.importorskip("control.metrics_store")
+metric_alerts = pytest.importorskip("control.metric_alerts")
+
+START = 1_700_000_000 // 3600 * 3600  # An hour boundary
+RETENTION = {1: 36500, 60: 36500, 3600: 36500}
+
+
+def fill(store, seconds, start=START):
+    for t in range(seconds):
+        store.append(start + t, {'cpu': t % 60, 'memory': 50.0})
+
+
+def test_samples_roll_up_into_minutes_and_hours(tmp_path):
+    """Raw samples are kept and aggregated per minute and per hour"""
+    store = metrics_store.MetricsStore(['cpu', 'memory'], tmp_path, RETENTION)
+    fill(store, 2 * 3600 + 90)
+
+    raw = store.query('cpu', START, START + 59, resolution=1)
+    assert raw[:, 1].tolist() == list(range(60))
+
+    minutes = store.query('cpu', START, START + 3 * 3600, resolution=60)
+    assert len(minutes) == 121  # The minute in progress is not written yet
+    assert minutes[0].tolist() == [START, 29.5]
+    assert store.query('cpu', START, START + 3600, resolution=60, statistic='max')[0, 1] == 59
+
+    # An hour is written once the first minute of the next hour is
+    hours = store.query('cpu', START, START + 3 * 3600, resolution=3600)
+    assert hours[:, 0].tolist() == [START, START + 3600]
+
+    # Raw data was sealed into columnar chunk files
+    assert len(list((tmp_path / "1s").glob("*.npy"))) == 2
+    store.close()
+
+
+def test_store_reloads_after_restart(tmp_path):
+    """The unsealed tail survives a restart"""
+    store = metrics_store.MetricsStore(['cpu', 'memory'], tmp_path, RETENTION)
+    fill(store, 3600 + 100)
+    store.close()
+
+    reopened = metrics_store.MetricsStore(['cpu', 'memory'], tmp_path, RETENTION)
+    raw = reopened.query('memory', START, START + 4000, resolution=1)
+    assert len(raw) == 3700
+    assert reopened.tiers[1].n == 100
+    reopened.close()
+
+
+def test_threshold_rule_needs_duration_and_respects_cooldown():
+    """A threshold rule fires once the condition has held long enough"""
+    alerts = []
+    engine = metric_alerts.AlertEngine(
+        [metric_alerts.AlertRule('High CPU', 'cpu_percent', 90, duration=10, cooldown=100)],
+        lambda alert_type, details: alerts.append((alert_type, details)))
+
+    for t in range(5):
+        engine.evaluate(t, {'cpu_percent': 95})
+    engine.evaluate(5, {'cpu_percent': 10})  # Spike ends before the duration
+    for t in range(6, 30):
+        engine.evaluate(t, {'cpu_percent': 95})
+
+    assert len(alerts) == 1
+    assert alerts[0][0] == 'cpu'
+    assert engine.active_alerts() == ['High CPU']
+
+    # A new episode inside the cooldown does not notify again
+    engine.evaluate(30, {'cpu_percent': 10})
+    for t in range(31, 60):
+        engine.evaluate(t, {'cpu_percent': 95})
+    assert len(alerts) == 1
+
+
+def test_rate_rule_measures_change_per_minute():
+    """A rate rule compares against the value a window ago"""
+    alerts = []
+    engine = metric_alerts.AlertEngine.from_config(
+        [{'name': 'Memory climbing', 'metric': 'memory_percent', 'kind': 'rate', 'threshold': 10, 'window': 60}],
+        lambda alert_type, details: alerts.append(details))
+
+    for t in range(120):
+        engine.evaluate(t, {'memory_percent': 40 + t * 0.1})  # 6 per minute
+    assert alerts == []
+
+    for t in range(120, 240):
+        engine.evaluate(t, {'memory_percent': 52 + (t - 120) * 0.5})  # 30 per minute
+    assert len(alerts) == 1 and "/min" in alerts[0]
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        metric_alerts.AlertRule('bad', 'cpu_percent', 1, condition='!=')
+
+
+def test_rule_threshold_ignores_rate_rules():
+    rules = [{'name': 'Memory climbing', 'metric': 'memory_percent', 'threshold': 10, 'kind': 'rate'},
+             {'name': 'High memory', 'metric': 'memory_percent', 'threshold': 85}]
+    assert metric_alerts.rule_threshold(rules, 'memory_percent') == 85
+    assert metric_alerts.rule_threshold(rules, 'cpu_percent') is None
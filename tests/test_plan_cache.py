@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Plan Cache Test - Shadow AI
+Tests for the persistent task plan cache
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+plan_cache = pytest.importorskip("brain.plan_cache")
+
+
+def test_normalized_commands_share_entry(tmp_path):
+    """Whitespace does not change the key"""
+    cache = plan_cache.PlanCache(tmp_path / "plans.db")
+    cache.put("Open Notepad!", {"category": "desktop", "steps": []})
+
+    assert cache.get("  Open   Notepad!") == {"category": "desktop", "steps": []}
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_literal_text_is_part_of_key(tmp_path):
+    """Commands differing in the case or punctuation of their text get their own plans"""
+    cache = plan_cache.PlanCache(tmp_path / "plans.db")
+    cache.put("write 'hello world' to notes.txt", {"steps": [{"text": "hello world"}]})
+
+    assert cache.get("write 'Hello World' to Notes.txt") is None
+    assert cache.get("write 'hello world' to notes.txt!") is None
+
+
+def test_context_fields_are_part_of_key(tmp_path):
+    """Only the configured context keys affect the cache key"""
+    cache = plan_cache.PlanCache(tmp_path / "plans.db", context_keys=("user_intent",))
+    cache.put("write an article", {"description": "a"}, {"user_intent": "creation"})
+
+    assert cache.get("write an article", {"user_intent": "creation", "hour": 9}) is not None
+    assert cache.get("write an article", {"user_intent": "general"}) is None
+
+
+def test_ttl_expiry(tmp_path):
+    """Expired plans are treated as misses"""
+    cache = plan_cache.PlanCache(tmp_path / "plans.db", ttl_seconds=1)
+    cache.put("take a screenshot", {"steps": []})
+    cache.conn.execute("UPDATE plan_cache SET created_at = ?", (time.time() - 5,))
+
+    assert cache.get("take a screenshot") is None
+
+
+def test_lru_eviction(tmp_path):
+    """The least recently used plan is evicted once the cache is full"""
+    cache = plan_cache.PlanCache(tmp_path / "plans.db", max_entries=2)
+    cache.put("first", {})
+    time.sleep(0.01)
+    cache.put("second", {})
+    time.sleep(0.01)
+    cache.get("first")
+    time.sleep(0.01)
+    cache.put("third", {})
+
+    assert cache.get("second") is None
+    assert cache.get("first") == {}
+    assert cache.get("third") == {}
+
+
+def test_plans_are_cached_only_after_success(tmp_path):
+    """A new plan is cached once it has run successfully; a cached plan that fails is dropped"""
+    universal_processor = pytest.importorskip("brain.universal_processor")
+    processor = universal_processor.UniversalProcessor()
+    processor.plan_cache = plan_cache.PlanCache(tmp_path / "plans.db")
+    plan = {"category": "desktop", "steps": []}
+
+    task = processor._build_task_from_data("open notepad", plan)
+    task.plan_data = plan
+    processor.record_task_outcome(task, success=False)
+    assert processor._get_cached_task("open notepad") is None
+
+    processor.record_task_outcome(task, success=True)
+    cached = processor._get_cached_task("open notepad")
+    assert cached.from_plan_cache
+
+    processor.record_task_outcome(cached, success=False)
+    assert processor._get_cached_task("open notepad") is None
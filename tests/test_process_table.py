@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Process Table Test - Shadow AI
+Tests the shared, delta-tracking process snapshot
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+process_table_module = pytest.importorskip("control.process_table")
+
+
+def test_snapshot_includes_usage_on_request():
+    """Names are always present, usage only when asked for"""
+    table = process_table_module.ProcessTable(max_age=0)
+
+    names_only = {row['pid']: row for row in table.snapshot()}
+    assert os.getpid() in names_only
+    assert 'cpu_percent' not in names_only[os.getpid()]
+
+    with_usage = {row['pid']: row for row in table.snapshot(with_usage=True)}
+    assert with_usage[os.getpid()]['memory_mb'] > 0
+
+
+def test_refresh_only_inspects_new_and_exited_processes():
+    """Unchanged PIDs are not looked up again"""
+    table = process_table_module.ProcessTable(max_age=0)
+    table.snapshot()
+    started = table.stats['started']
+
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        pids = {row['pid'] for row in table.snapshot()}
+        assert child.pid in pids
+        assert table.stats['started'] - started <= 5  # The child, plus any unrelated newcomers
+    finally:
+        child.kill()
+        child.wait()
+
+    assert child.pid not in {row['pid'] for row in table.snapshot()}
+    assert table.stats['exited'] >= 1
+
+
+def test_cached_snapshot_is_reused_within_max_age():
+    table = process_table_module.ProcessTable(max_age=60)
+    table.snapshot()
+    table.names()
+    assert table.stats['refreshes'] == 1
+    table.snapshot(max_age=0)
+    assert table.stats['refreshes'] == 2
+
+
+def test_reused_pid_is_picked_up_by_name_refresh():
+    """A known PID whose start time changed is replaced, not reported under the old name"""
+    table = process_table_module.ProcessTable(max_age=0, recheck=0)
+    table.snapshot()
+    # Pretend this PID belonged to another, since exited, process
+    table._rows[os.getpid()].update({'name': 'exited.exe', 'create_time': 1.0})
+
+    names = table.names()
+
+    assert 'exited.exe' not in names
+    assert table.stats['reused'] == 1
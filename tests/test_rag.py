@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+RAG Test - Shadow AI
+Tests the persistent BM25 knowledge base index
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# utils/__init__ pulls in the confirmation GUI, which needs a display
+try:
+    from utils import rag
+except Exception as e:
+    pytest.skip(f"utils.rag unavailable: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def knowledge_base(tmp_path):
+    kb_dir = tmp_path / "kb"
+    kb_dir.mkdir()
+    (kb_dir / "python.txt").write_text(
+        "Python is a programming language.\n\n"
+        "Use pip to install Python packages from PyPI.\n"
+    )
+    (kb_dir / "shadow.txt").write_text(
+        "Shadow AI automates the desktop.\n\n"
+        "Say open notepad to start Notepad.\n"
+    )
+    return kb_dir
+
+
+def make_index(kb_dir, tmp_path):
+    return rag.KnowledgeIndex(kb_dir, tmp_path / "index", refresh_interval=0)
+
+
+def test_search_returns_ranked_passages_with_provenance(knowledge_base, tmp_path):
+    """The best passage comes first and points back into its file"""
+    index = make_index(knowledge_base, tmp_path)
+
+    results = index.search("how to install packages with pip")
+
+    assert results[0]['text'] == "Use pip to install Python packages from PyPI."
+    assert results[0]['file'].endswith("python.txt")
+    data = (knowledge_base / "python.txt").read_bytes()
+    offset, length = results[0]['offset'], results[0]['length']
+    assert data[offset:offset + length].decode().strip() == results[0]['text']
+    assert index.search("completely unrelated zebra") == []
+
+
+def test_index_persists_and_loads_memory_mapped(knowledge_base, tmp_path):
+    """A new instance loads the saved index without re-reading unchanged files"""
+    make_index(knowledge_base, tmp_path).refresh()
+
+    reloaded = make_index(knowledge_base, tmp_path)
+
+    assert isinstance(reloaded.posting_passages, rag.np.memmap)
+    assert not reloaded.refresh()
+    assert reloaded.search("notepad")[0]['file'].endswith("shadow.txt")
+
+
+def test_refresh_only_reindexes_changed_files(knowledge_base, tmp_path):
+    """Edited, added and deleted files are reflected after a refresh"""
+    index = make_index(knowledge_base, tmp_path)
+    index.refresh()
+
+    time.sleep(0.01)
+    (knowledge_base / "shadow.txt").write_text("Shadow AI can take screenshots.\n")
+    (knowledge_base / "email.txt").write_text("Send email with the compose command.\n")
+    (knowledge_base / "python.txt").unlink()
+
+    assert index.refresh()
+    assert index.search("notepad") == []
+    assert index.search("python pip") == []
+    assert index.search("screenshots")[0]['file'].endswith("shadow.txt")
+    assert index.search("email")[0]['file'].endswith("email.txt")
+    assert index.get_stats()['files'] == 2
+
+
+def test_split_passages_caps_size():
+    """Long paragraphs are split into passages no larger than the cap"""
+    data = b"".join(f"line number {i}\n".encode() for i in range(100))
+
+    passages = rag.split_passages(data, max_chars=200)
+
+    assert len(passages) > 1
+    assert all(length <= 200 for _, length in passages)
+    assert passages[0][0] == 0
+
+
+def make_embedding_index(kb_dir, tmp_path):
+    return rag.EmbeddingIndex(kb_dir, tmp_path / "vectors", refresh_interval=0)
+
+
+def test_embedding_search_matches_word_forms(knowledge_base, tmp_path):
+    """Character n-grams let related word forms match"""
+    index = make_embedding_index(knowledge_base, tmp_path)
+
+    results = index.search("installing packages")
+
+    assert results[0]['text'] == "Use pip to install Python packages from PyPI."
+    assert results[0]['file'].endswith("python.txt")
+
+
+def test_embedding_refresh_only_embeds_changed_files(knowledge_base, tmp_path, monkeypatch):
+    """Unchanged files are not read again and replaced passages disappear"""
+    index = make_embedding_index(knowledge_base, tmp_path)
+    index.refresh()
+
+    embedded = []
+    original = rag.embed_text
+    monkeypatch.setattr(rag, "embed_text", lambda text, *args: embedded.append(text) or original(text, *args))
+    time.sleep(0.01)
+    (knowledge_base / "shadow.txt").write_text("Shadow AI can take screenshots.\n")
+
+    reloaded = make_embedding_index(knowledge_base, tmp_path)
+    assert reloaded.refresh()
+    assert embedded == ["Shadow AI can take screenshots.\n"]
+    assert all("notepad" not in p['text'].lower() for p in reloaded.search("open notepad", 5))
+    assert reloaded.get_stats()['live_rows'] == 3
+
+
+def test_retrieve_context_fuses_keyword_and_embedding_results(knowledge_base, tmp_path, monkeypatch):
+    """Passages found by both retrievers rank first and appear once"""
+    monkeypatch.setattr(rag, "get_knowledge_index", lambda: make_index(knowledge_base, tmp_path))
+    monkeypatch.setattr(rag, "get_embedding_index", lambda: make_embedding_index(knowledge_base, tmp_path))
+
+    passages = rag.retrieve_context("install python packages with pip", 2)
+
+    assert passages[0]['text'] == "Use pip to install Python packages from PyPI."
+    assert len({(p['file'], p['offset']) for p in passages}) == len(passages)
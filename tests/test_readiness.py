@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Readiness Test - Shadow AI
+Tests the condition-polling waits used by desktop automation
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+readiness = pytest.importorskip("control.readiness")
+
+
+def test_wait_until_returns_as_soon_as_ready():
+    """A condition that becomes true quickly does not wait for the full timeout"""
+    ready_at = time.monotonic() + 0.1
+
+    start = time.monotonic()
+    assert readiness.wait_until(lambda: time.monotonic() >= ready_at, timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_wait_until_respects_deadline():
+    """A condition that never holds times out close to the deadline"""
+    start = time.monotonic()
+    assert not readiness.wait_until(lambda: False, timeout=0.3)
+    assert 0.3 <= time.monotonic() - start < 0.6
+
+
+def test_wait_until_backs_off():
+    """Polling gets less frequent over time"""
+    calls = []
+    readiness.wait_until(lambda: calls.append(time.monotonic()), timeout=0.5,
+                         initial_delay=0.01, max_delay=0.2, backoff=2)
+
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert len(calls) < 12
+    assert gaps[-1] > gaps[0]
+
+
+def test_foreground_change_detects_new_window(monkeypatch):
+    """A new foreground handle with the expected title satisfies the wait"""
+    windows = iter([(1, "Desktop"), (1, "Desktop"), (2, "Untitled - Notepad")])
+    monkeypatch.setattr(readiness, "can_observe_windows", lambda: True)
+    monkeypatch.setattr(readiness, "get_foreground_window", lambda: next(windows, (2, "Untitled - Notepad")))
+
+    assert readiness.wait_for_foreground_change(1, "notepad", timeout=2)
+
+
+def test_dialog_detected_by_handle_not_title(monkeypatch):
+    """A document named after 'save' does not count as the dialog; a new handle does"""
+    windows = iter([(1, "savefile.txt - Notepad"), (7, "Enregistrer sous")])
+    monkeypatch.setattr(readiness, "WIN32_AVAILABLE", False)
+    monkeypatch.setattr(readiness, "can_observe_windows", lambda: True)
+    monkeypatch.setattr(readiness, "get_foreground_window", lambda: next(windows, (7, "Enregistrer sous")))
+
+    assert readiness.wait_for_dialog(1, timeout=2) == (True, 7)
+
+
+def test_missing_dialog_times_out(monkeypatch):
+    """When no dialog opens the wait gives up after its own timeout"""
+    monkeypatch.setattr(readiness, "can_observe_windows", lambda: True)
+    monkeypatch.setattr(readiness, "get_foreground_window", lambda: (1, "notes.txt - Notepad"))
+
+    assert readiness.wait_for_dialog(1, timeout=0.2) == (False, None)
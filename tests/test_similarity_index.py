@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Similarity Index Test - Shadow AI
+Tests the TF-IDF task similarity index used for similar-task lookups
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+similarity_index = pytest.importorskip("brain.similarity_index")
+
+
+def test_search_ranks_closest_command_first():
+    """The command sharing the rarest terms ranks highest"""
+    index = similarity_index.TaskSimilarityIndex()
+    index.add("t1", "open notepad and write an article about AI")
+    index.add("t2", "open calculator")
+    index.add("t3", "send an email to my manager")
+
+    results = index.search("write an article about space in notepad", limit=2)
+
+    assert results[0][0]['id'] == "t1"
+    assert 0 < results[0][1] <= 1
+    assert index.search("open calculator")[0][0]['id'] == "t2"
+    assert index.search("open calculator")[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_incremental_adds_are_searchable():
+    """Documents added after a search are found by the next search"""
+    index = similarity_index.TaskSimilarityIndex()
+    index.add("t1", "open calculator")
+    assert index.search("take a screenshot", min_score=0.1) == []
+
+    index.add("t2", "take a screenshot of the desktop")
+    assert not index.add("t2", "duplicate id is ignored")
+
+    assert index.search("take a screenshot", min_score=0.1)[0][0]['id'] == "t2"
+    assert len(index) == 2
+
+
+def test_search_over_large_history_is_fast():
+    """Top-k over tens of thousands of tasks stays in the millisecond range"""
+    index = similarity_index.TaskSimilarityIndex()
+    verbs = ["open", "write", "search", "send", "organize", "delete", "create", "play"]
+    nouns = ["notepad", "article", "email", "files", "music", "report", "photos", "browser"]
+    for i in range(20000):
+        index.add(f"t{i}", f"{verbs[i % 8]} {nouns[(i // 8) % 8]} item {i}")
+    index.add("needle", "translate quarterly budget spreadsheet")
+    index.search("warm up")
+
+    start = time.perf_counter()
+    results = index.search("translate the budget spreadsheet", limit=5)
+    elapsed = time.perf_counter() - start
+
+    assert results[0][0]['id'] == "needle"
+    assert elapsed < 0.1
+
+
+def test_context_manager_finds_tasks_beyond_recent_window(tmp_path):
+    """Similar tasks are found across the whole history, not just the last 50"""
+    universal_context = pytest.importorskip("brain.universal_context")
+    manager = universal_context.UniversalContextManager(tmp_path / "memory.db")
+
+    manager.store_task_result("old", "compose a haiku about autumn leaves", "creative", 1.0, True, {})
+    manager.get_similar_tasks("warm up the index")
+    for i in range(60):
+        manager.store_task_result(f"t{i}", f"open application number {i}", "app", 1.0, True, {})
+
+    similar = manager.get_similar_tasks("write a haiku about autumn")
+
+    assert similar[0]['task_id'] == "old"
+    assert similar[0]['category'] == "creative"
+    manager.close()
+
+
+def test_similar_task_timestamps_and_cleanup(tmp_path):
+    """Indexed tasks carry ISO timestamp strings and cleaned-up tasks are no longer found"""
+    universal_context = pytest.importorskip("brain.universal_context")
+    manager = universal_context.UniversalContextManager(tmp_path / "memory.db")
+
+    manager.store_task_result("stored", "convert the quarterly report to pdf", "docs", 1.0, False, {})
+    manager.flush()
+    manager.get_similar_tasks("warm up the index")
+    manager.store_task_result("added", "convert the annual report to pdf", "docs", 1.0, False, {})
+
+    similar = manager.get_similar_tasks("convert the report to pdf")
+    assert {task['task_id'] for task in similar} == {"stored", "added"}
+    assert all(isinstance(task['timestamp'], str) and 'T' in task['timestamp'] for task in similar)
+
+    manager.cleanup_old_data(days_to_keep=-1)
+
+    assert manager.get_similar_tasks("convert the report to pdf") == []
+    manager.close()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Text Insertion Test - Shadow AI
+Tests choosing between clipboard paste and chunked typing for bulk text
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+desktop = pytest.importorskip("control.desktop")
+
+
+class FakeClipboard:
+    """In-memory clipboard; pasting records the current content as inserted text"""
+
+    def __init__(self, content="user data"):
+        self.content = content
+        self.clipboard_available = True
+        self.inserted = []
+
+    def get_clipboard_content(self):
+        return self.content
+
+    def set_clipboard_content(self, text):
+        self.content = text
+        return True
+
+    def wait_for_content(self, text, timeout=1.0):
+        return self.content == text
+
+    def save_formats(self):
+        return None
+
+
+@pytest.fixture
+def fake_ui(monkeypatch):
+    clipboard = FakeClipboard()
+    typed = []
+    monkeypatch.setattr(desktop, "clipboard_manager", clipboard)
+    monkeypatch.setattr(desktop, "CLIPBOARD_PASTE_SETTLE", 0)
+    monkeypatch.setattr(desktop.pyautogui, "hotkey", lambda *keys: clipboard.inserted.append(clipboard.content))
+    monkeypatch.setattr(desktop.pyautogui, "typewrite", lambda text, interval=0: typed.append(text))
+    return clipboard, typed
+
+
+def test_long_text_is_pasted_and_clipboard_restored(fake_ui):
+    """Large payloads go through the clipboard, which is restored afterwards"""
+    clipboard, typed = fake_ui
+    article = "word " * 500
+
+    assert desktop.desktop_controller.insert_text(article)
+    assert clipboard.inserted == [article]
+    assert typed == []
+    assert clipboard.content == "user data"
+
+
+def test_short_text_is_typed_in_chunks(fake_ui):
+    """Small payloads are typed without touching the clipboard"""
+    clipboard, typed = fake_ui
+
+    assert desktop.desktop_controller.insert_text("hello world", paste_threshold=100)
+    assert "".join(typed) == "hello world"
+    assert clipboard.inserted == []
+
+
+def test_paste_failure_falls_back_to_typing(fake_ui):
+    """If the clipboard cannot be set the text is typed instead"""
+    clipboard, typed = fake_ui
+    clipboard.set_clipboard_content = lambda text: False
+
+    assert desktop.desktop_controller.insert_text("x" * 300)
+    assert "".join(typed) == "x" * 300
+
+
+def test_clipboard_change_after_paste_does_not_type_again(fake_ui, monkeypatch):
+    """Once ctrl+v was sent the text is not typed a second time"""
+    clipboard, typed = fake_ui
+
+    def paste_then_overwrite(*keys):
+        clipboard.inserted.append(clipboard.content)
+        clipboard.content = "changed by another app"
+
+    monkeypatch.setattr(desktop.pyautogui, "hotkey", paste_then_overwrite)
+
+    assert desktop.desktop_controller.insert_text("y" * 300)
+    assert clipboard.inserted == ["y" * 300]
+    assert typed == []
+
+
+def test_empty_previous_clipboard_is_cleared(fake_ui):
+    """Without format access an empty clipboard is cleared rather than left holding the pasted text"""
+    clipboard, typed = fake_ui
+    clipboard.content = ""
+
+    assert desktop.desktop_controller.paste_text("z" * 300)
+    assert clipboard.inserted == ["z" * 300]
+    assert clipboard.content == ""
+
+
+def test_saved_formats_are_restored(fake_ui):
+    """Where every clipboard format can be saved (Windows), all of them are put back"""
+    clipboard, typed = fake_ui
+    image = {8: b"DIB image data"}
+    restored = []
+    clipboard.content = ""
+    clipboard.save_formats = lambda: dict(image)
+    clipboard.restore_formats = lambda formats: restored.append(formats) or True
+
+    assert desktop.desktop_controller.paste_text("z" * 300)
+    assert restored == [image]
+
+
+def test_watcher_does_not_record_pasted_text(tmp_path, monkeypatch):
+    """Text passed through the clipboard by paste_text is not stored as an external copy"""
+    clipboard_manager = pytest.importorskip("control.clipboard_manager")
+    clipboard_store = pytest.importorskip("control.clipboard_store")
+    monkeypatch.chdir(tmp_path)
+    manager = clipboard_manager.ClipboardManager(clipboard_store.ClipboardHistoryStore(tmp_path / "history"))
+
+    class FakePyperclip:
+        content = "copied by the user"
+
+        def copy(self, text):
+            self.content = text
+
+        def paste(self):
+            return self.content
+
+    manager.pyperclip = FakePyperclip()
+    manager.clipboard_available = True
+    # The fake clipboard has no OS change counter or other formats, so the watcher compares content
+    monkeypatch.setattr(clipboard_manager, "system_change_counter", lambda: None)
+    monkeypatch.setattr(clipboard_manager, "WIN32_AVAILABLE", False)
+    assert manager.start_watching(interval=60)
+    manager.watcher.poll()
+    monkeypatch.setattr(desktop, "clipboard_manager", manager)
+    monkeypatch.setattr(desktop, "CLIPBOARD_PASTE_SETTLE", 0)
+    # The watcher sees the clipboard while the paste is in progress and after it is restored
+    monkeypatch.setattr(desktop.pyautogui, "hotkey", lambda *keys: manager.watcher.poll())
+
+    article = "paragraph of generated text " * 100
+    assert desktop.desktop_controller.paste_text(article)
+    manager.watcher.poll()
+    manager.stop_watching()
+
+    assert manager.get_clipboard_content() == "copied by the user"
+    assert [item['content'] for item in manager.get_history()] == ["copied by the user"]
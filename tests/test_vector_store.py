@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Vector Store Test - Shadow AI
+Tests the memory-mapped vector store used for embedding retrieval
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# utils/__init__ pulls in the confirmation GUI, which needs a display
+try:
+    from utils import vector_store
+except Exception as e:
+    pytest.skip(f"utils.vector_store unavailable: {e}", allow_module_level=True)
+
+np = vector_store.np
+
+
+def random_unit_vectors(n, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_flat_search_finds_exact_match(tmp_path):
+    """Below the IVF threshold every row is scored"""
+    store = vector_store.VectorStore(tmp_path, 32, ("doc",))
+    vectors = random_unit_vectors(500, 32)
+    store.append(vectors, np.arange(500)[:, None])
+
+    row, score = store.search(vectors[123], k=3)[0]
+
+    assert row == 123
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_ivf_search_matches_flat_results(tmp_path):
+    """The IVF index returns the same nearest neighbour for stored vectors"""
+    store = vector_store.VectorStore(tmp_path, 32, ("doc",), ivf_min_vectors=1000, nprobe=8)
+    vectors = random_unit_vectors(5000, 32)
+    store.append(vectors, np.arange(5000)[:, None])
+    store.maintain()
+
+    assert store.get_stats()['ivf_lists'] > 0
+    hits = sum(store.search(vectors[i], k=1)[0][0] == i for i in range(0, 5000, 100))
+    assert hits == 50
+
+    # Appends after training are assigned to lists immediately
+    extra = random_unit_vectors(1, 32, seed=1)
+    row = store.append(extra, [[9999]])[0]
+    assert store.search(extra[0], k=1)[0][0] == row
+
+
+def test_deletes_compaction_and_reload(tmp_path):
+    """Deleted rows are never returned and compaction keeps metadata aligned"""
+    store = vector_store.VectorStore(tmp_path, 16, ("doc",))
+    vectors = random_unit_vectors(100, 16)
+    store.append(vectors, (np.arange(100) // 10)[:, None])
+
+    assert store.delete_where("doc", [0, 1, 2, 3]) == 40
+    store.maintain()
+    store.save()
+
+    reloaded = vector_store.VectorStore(tmp_path, 16, ("doc",))
+    assert reloaded.get_stats()['rows'] == 60
+    row, score = reloaded.search(vectors[55], k=1)[0]
+    assert reloaded.data[row, 0] == 5
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert all(reloaded.data[r, 0] >= 4 for r, _ in reloaded.search(vectors[5], k=10))
+
+
+def test_unsaved_appends_are_discarded_on_load(tmp_path):
+    """Rows appended after the last save are dropped, keeping the file consistent"""
+    store = vector_store.VectorStore(tmp_path, 8, ("doc",))
+    store.append(random_unit_vectors(10, 8), np.zeros((10, 1)))
+    store.save()
+    store.append(random_unit_vectors(5, 8, seed=1), np.ones((5, 1)))
+
+    reloaded = vector_store.VectorStore(tmp_path, 8, ("doc",))
+    reloaded.append(random_unit_vectors(1, 8, seed=2), [[7]])
+
+    assert reloaded.count == 11
+    assert reloaded.vectors_path.stat().st_size == 11 * 8 * 4
@@ -1,28 +1,512 @@
 """
 Simple RAG (Retrieval-Augmented Generation) utility for Shadow AI
+Persistent BM25 and embedding indexes over the knowledge base, updated incrementally
 """
 import os
 import glob
-from typing import List
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    RAG_PASSAGE_MAX_CHARS, RAG_REFRESH_INTERVAL, BM25_K1, BM25_B, RAG_EMBEDDING_DIM
+)
+from utils.vector_store import VectorStore
+
+TOKEN_PATTERN = re.compile(r"\w+")
+RRF_K = 60  # Reciprocal rank fusion damping constant
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "please", "the", "to",
+    "what", "with", "you"
+}
+
+def get_knowledge_base_dir() -> str:
+    return os.path.join(os.path.dirname(__file__), 'knowledge_base')
 
 def list_knowledge_files():
-    kb_dir = os.path.join(os.path.dirname(__file__), 'knowledge_base')
+    kb_dir = get_knowledge_base_dir()
     return glob.glob(os.path.join(kb_dir, '*'))
 
-def search_knowledge_base(query: str, max_results=3) -> List[str]:
-    """Naive search: return lines containing the query from all files."""
-    results = []
-    for fpath in list_knowledge_files():
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def split_passages(data: bytes, max_chars: int = RAG_PASSAGE_MAX_CHARS) -> List[Tuple[int, int]]:
+    """
+    Split file content into passages at blank lines, capping passage size
+
+    Returns:
+        List of (byte offset, byte length) pairs
+    """
+    passages = []
+    start = None
+    end = 0
+    offset = 0
+
+    for line in data.splitlines(keepends=True):
+        if not line.strip():
+            if start is not None:
+                passages.append((start, end - start))
+                start = None
+        else:
+            if start is not None and offset + len(line) - start > max_chars:
+                passages.append((start, end - start))
+                start = None
+            if start is None:
+                start = offset
+            end = offset + len(line)
+        offset += len(line)
+
+    if start is not None:
+        passages.append((start, end - start))
+    return passages
+
+def scan_knowledge_files(kb_dir: Path) -> Dict[str, List[int]]:
+    """Get [mtime_ns, size] for every file in the knowledge base"""
+    files = {}
+    if not kb_dir.is_dir():
+        return files
+    with os.scandir(kb_dir) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                continue
+    return files
+
+def read_passage(kb_dir: Path, name: str, offset: int, length: int, score: float) -> Dict[str, Any]:
+    """Read a passage's text from its source file"""
+    path = kb_dir / name
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            text = f.read(length).decode('utf-8', errors='ignore').strip()
+    except OSError:
+        text = ""
+    return {'text': text, 'file': str(path), 'offset': offset, 'length': length, 'score': score}
+
+def file_passages(data: bytes) -> List[Tuple[int, int, List[str]]]:
+    """Split file content into (offset, length, tokens) passages, skipping passages without tokens"""
+    passages = []
+    for offset, length in split_passages(data):
+        tokens = tokenize(data[offset:offset + length].decode('utf-8', errors='ignore'))
+        if tokens:
+            passages.append((offset, length, tokens))
+    return passages
+
+class KnowledgeIndex:
+    """
+    BM25 inverted index over the files in the knowledge base.
+
+    Postings are stored term-major in flat NumPy arrays on disk and
+    memory-mapped on load. Each refresh stats the knowledge base and
+    re-tokenizes only files whose mtime or size changed; their old passages are
+    dropped from the postings and the arrays are rewritten as a new generation.
+    """
+
+    def __init__(self, kb_dir: Optional[str] = None, index_dir: Optional[Path] = None,
+                 refresh_interval: float = RAG_REFRESH_INTERVAL):
+        self.kb_dir = Path(kb_dir or get_knowledge_base_dir())
+        self.index_dir = Path(index_dir) if index_dir else Path.home() / ".shadow_ai" / "rag_index"
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    # Persistence
+
+    def _array_path(self, name: str, generation: int) -> Path:
+        return self.index_dir / f"{name}_{generation}.npy"
+
+    def _empty(self):
+        self.generation = 0
+        self.files: Dict[str, List[int]] = {}
+        self.vocabulary: Dict[str, int] = {}
+        self.passages: List[List[Any]] = []  # [file name, byte offset, byte length]
+        self.term_starts = np.zeros(1, dtype=np.int64)
+        self.posting_passages = np.zeros(0, dtype=np.int32)
+        self.posting_tfs = np.zeros(0, dtype=np.uint16)
+        self.passage_lengths = np.zeros(0, dtype=np.int32)
+
+    def _load(self):
+        """Load the on-disk index, memory-mapping the postings"""
+        self._empty()
+        meta_path = self.index_dir / "meta.json"
+        if not meta_path.exists():
+            return
         try:
-            with open(fpath, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    if query.lower() in line.lower():
-                        results.append(line.strip())
-                        if len(results) >= max_results:
-                            return results
-        except Exception:
-            continue
-    return results
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            generation = meta['generation']
+            self.term_starts = np.load(self._array_path("term_starts", generation))
+            self.posting_passages = np.load(self._array_path("posting_passages", generation), mmap_mode='r')
+            self.posting_tfs = np.load(self._array_path("posting_tfs", generation), mmap_mode='r')
+            self.passage_lengths = np.load(self._array_path("passage_lengths", generation))
+            self.generation = generation
+            self.files = meta['files']
+            self.passages = meta['passages']
+            self.vocabulary = {term: i for i, term in enumerate(meta['vocabulary'])}
+            logging.info(f"Loaded knowledge index with {len(self.passages)} passages")
+        except Exception as e:
+            logging.warning(f"Could not load knowledge index, rebuilding: {e}")
+            self._empty()
+
+    def _save(self):
+        """Write a new index generation; meta.json is replaced last so readers never see a partial index"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        previous = self.generation
+        generation = previous + 1
+
+        arrays = {
+            "term_starts": self.term_starts,
+            "posting_passages": self.posting_passages,
+            "posting_tfs": self.posting_tfs,
+            "passage_lengths": self.passage_lengths,
+        }
+        for name, array in arrays.items():
+            np.save(self._array_path(name, generation), array)
+
+        vocabulary = [None] * len(self.vocabulary)
+        for term, term_id in self.vocabulary.items():
+            vocabulary[term_id] = term
+        meta = {
+            'generation': generation,
+            'files': self.files,
+            'passages': self.passages,
+            'vocabulary': vocabulary,
+        }
+        tmp_path = self.index_dir / "meta.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.index_dir / "meta.json")
+        self.generation = generation
+
+        # Reopen the postings from the new files so the old generation is released
+        self.posting_passages = np.load(self._array_path("posting_passages", generation), mmap_mode='r')
+        self.posting_tfs = np.load(self._array_path("posting_tfs", generation), mmap_mode='r')
+        for name in arrays:
+            try:
+                self._array_path(name, previous).unlink()
+            except OSError:
+                pass
+
+    # Incremental updates
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Bring the index up to date with the knowledge base
+
+        Returns:
+            True if the index changed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return False
+            self._last_refresh = now
+
+            current = scan_knowledge_files(self.kb_dir)
+            changed = {name for name, state in current.items() if self.files.get(name) != state}
+            removed = set(self.files) - set(current)
+            if not changed and not removed:
+                return False
+
+            start_time = time.time()
+            self._update(changed, removed, current)
+            self._save()
+            logging.info(f"Knowledge index updated ({len(changed)} changed, {len(removed)} removed) "
+                         f"in {time.time() - start_time:.2f}s")
+            return True
+
+    def _update(self, changed: set, removed: set, current: Dict[str, List[int]]):
+        """Drop passages of changed/removed files and index the changed files again"""
+        stale = changed | removed
+        alive = np.array([p[0] not in stale for p in self.passages], dtype=bool)
+        new_ids = np.cumsum(alive, dtype=np.int64) - 1
+
+        # Expand the term-major postings, keep the live ones and renumber their passages
+        posting_terms = np.repeat(np.arange(len(self.term_starts) - 1, dtype=np.int32),
+                                  np.diff(self.term_starts))
+        posting_passages = np.asarray(self.posting_passages)
+        keep = alive[posting_passages] if len(posting_passages) else np.zeros(0, dtype=bool)
+        terms = [posting_terms[keep]]
+        passage_ids = [new_ids[posting_passages[keep]].astype(np.int32)]
+        tfs = [np.asarray(self.posting_tfs)[keep]]
+
+        self.passages = [p for p, is_alive in zip(self.passages, alive) if is_alive]
+        lengths = [self.passage_lengths[alive]]
+        self.files = {name: state for name, state in self.files.items() if name not in stale}
+
+        for name in sorted(changed):
+            try:
+                data = (self.kb_dir / name).read_bytes()
+            except OSError as e:
+                logging.warning(f"Could not read knowledge file {name}: {e}")
+                continue
+
+            new_terms, new_passages, new_tfs, new_lengths = [], [], [], []
+            for offset, length, tokens in file_passages(data):
+                passage_id = len(self.passages)
+                self.passages.append([name, offset, length])
+                new_lengths.append(len(tokens))
+                for term, count in Counter(tokens).items():
+                    new_terms.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                    new_passages.append(passage_id)
+                    new_tfs.append(min(count, np.iinfo(np.uint16).max))
+
+            terms.append(np.array(new_terms, dtype=np.int32))
+            passage_ids.append(np.array(new_passages, dtype=np.int32))
+            tfs.append(np.array(new_tfs, dtype=np.uint16))
+            lengths.append(np.array(new_lengths, dtype=np.int32))
+            self.files[name] = current[name]
+
+        terms = np.concatenate(terms)
+        passage_ids = np.concatenate(passage_ids)
+        tfs = np.concatenate(tfs)
+        order = np.lexsort((passage_ids, terms))
+
+        self.posting_passages = passage_ids[order]
+        self.posting_tfs = tfs[order]
+        counts = np.bincount(terms, minlength=len(self.vocabulary))
+        self.term_starts = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.passage_lengths = np.concatenate(lengths).astype(np.int32)
 
+    # Search
+
+    def search(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Rank passages against a query with BM25
+
+        Returns:
+            List of passages with text, file, offset, length and score, best first
+        """
+        self.refresh()
+        terms = set(tokenize(query))
+
+        with self._lock:
+            n_passages = len(self.passages)
+            if not terms or n_passages == 0:
+                return []
+
+            avg_length = float(self.passage_lengths.mean()) or 1.0
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.passage_lengths / avg_length)
+            scores = np.zeros(n_passages, dtype=np.float64)
+
+            for term in terms:
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    continue
+                start, end = self.term_starts[term_id], self.term_starts[term_id + 1]
+                if start == end:
+                    continue
+                ids = np.asarray(self.posting_passages[start:end])
+                tf = np.asarray(self.posting_tfs[start:end], dtype=np.float64)
+                df = end - start
+                idf = np.log(1 + (n_passages - df + 0.5) / (df + 0.5))
+                scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + length_norm[ids])
+
+            k = min(limit, n_passages)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits = [(self.passages[i], float(scores[i])) for i in top if scores[i] > 0]
+
+        return [read_passage(self.kb_dir, name, offset, length, score)
+                for (name, offset, length), score in hits]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        return {
+            'files': len(self.files),
+            'passages': len(self.passages),
+            'terms': len(self.vocabulary),
+            'postings': int(len(self.posting_passages)),
+            'generation': self.generation
+        }
+
+def embed_text(text: str, dim: int = RAG_EMBEDDING_DIM) -> np.ndarray:
+    """
+    Encode text as a unit-length hashed n-gram vector
+
+    Features are words, word bigrams and character trigrams of each word, so
+    related word forms ("install", "installing") land close together.
+    """
+    words = tokenize(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes >> 31, -1.0, 1.0)
+    counts = np.bincount((hashes % dim).astype(np.int64), weights=signs, minlength=dim)
+    vector = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+class EmbeddingIndex:
+    """
+    Semantic passage index over the knowledge base.
+
+    Passages are embedded with the local hashed n-gram encoder and kept in a
+    memory-mapped VectorStore. Each refresh only reads and embeds files whose
+    mtime or size changed; rows of their previous versions are deleted.
+    """
+
+    def __init__(self, kb_dir: Optional[str] = None, index_dir: Optional[Path] = None,
+                 refresh_interval: float = RAG_REFRESH_INTERVAL, **store_options):
+        self.kb_dir = Path(kb_dir or get_knowledge_base_dir())
+        self.index_dir = Path(index_dir) if index_dir else Path.home() / ".shadow_ai" / "rag_vectors"
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self.store = VectorStore(self.index_dir, RAG_EMBEDDING_DIM, ("file_id", "offset", "length"),
+                                 **store_options)
+        # name -> [mtime_ns, size, file_id]; a file gets a new id each time it is re-indexed
+        self.files: Dict[str, List[int]] = self.store.meta.get('files', {})
+        self.next_file_id = self.store.meta.get('next_file_id', 0)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Embed new and changed knowledge files
+
+        Returns:
+            True if the index changed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return False
+            self._last_refresh = now
+
+            current = scan_knowledge_files(self.kb_dir)
+            changed = {name for name, state in current.items() if self.files.get(name, [None, None])[:2] != state}
+            removed = set(self.files) - set(current)
+            if not changed and not removed:
+                return False
+
+            start_time = time.time()
+            self.store.delete_where('file_id', [self.files[name][2] for name in changed | removed if name in self.files])
+            for name in removed:
+                del self.files[name]
+
+            for name in sorted(changed):
+                self.files.pop(name, None)
+                try:
+                    data = (self.kb_dir / name).read_bytes()
+                except OSError as e:
+                    logging.warning(f"Could not read knowledge file {name}: {e}")
+                    continue
+
+                file_id = self.next_file_id
+                self.next_file_id += 1
+                passages = file_passages(data)
+                if passages:
+                    vectors = np.stack([
+                        embed_text(data[offset:offset + length].decode('utf-8', errors='ignore'))
+                        for offset, length, _ in passages
+                    ])
+                    rows = np.array([(file_id, offset, length) for offset, length, _ in passages], dtype=np.int64)
+                    self.store.append(vectors, rows)
+                self.files[name] = current[name] + [file_id]
+
+            self.store.maintain()
+            self.store.meta = {'files': self.files, 'next_file_id': self.next_file_id}
+            self.store.save()
+            logging.info(f"Embedding index updated ({len(changed)} changed, {len(removed)} removed) "
+                         f"in {time.time() - start_time:.2f}s")
+            return True
+
+    def search(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the passages closest to a query in embedding space
+
+        Returns:
+            List of passages with text, file, offset, length and score, best first
+        """
+        self.refresh()
+        vector = embed_text(query)
+        if not vector.any():
+            return []
+
+        with self._lock:
+            names = {entry[2]: name for name, entry in self.files.items()}
+            hits = []
+            for row, score in self.store.search(vector, limit):
+                file_id, offset, length = (int(v) for v in self.store.data[row])
+                if score > 0 and file_id in names:
+                    hits.append((names[file_id], offset, length, score))
+
+        return [read_passage(self.kb_dir, *hit) for hit in hits]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        return {'files': len(self.files), **self.store.get_stats()}
+
+_knowledge_index = None
+_embedding_index = None
+_knowledge_index_lock = threading.Lock()
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Get the shared knowledge index, loading it on first use"""
+    global _knowledge_index
+    with _knowledge_index_lock:
+        if _knowledge_index is None:
+            _knowledge_index = KnowledgeIndex()
+        return _knowledge_index
+
+def get_embedding_index() -> EmbeddingIndex:
+    """Get the shared embedding index, loading it on first use"""
+    global _embedding_index
+    with _knowledge_index_lock:
+        if _embedding_index is None:
+            _embedding_index = EmbeddingIndex()
+        return _embedding_index
+
+def search_passages(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+    """Return ranked knowledge base passages with file/offset provenance"""
+    try:
+        return get_knowledge_index().search(query, max_results)
+    except Exception as e:
+        logging.error(f"Knowledge base search failed: {e}")
+        return []
+
+def search_knowledge_base(query: str, max_results=3) -> List[str]:
+    """Return the text of the best matching knowledge base passages"""
+    return [passage['text'] for passage in search_passages(query, max_results)]
+
+def retrieve_context(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+    """
+    Retrieve passages for prompt context from both keyword and embedding search
+
+    The two rankings are merged with reciprocal rank fusion, so a passage that
+    both retrievers rank highly comes first.
+    """
+    rankings = []
+    for get_index in (get_knowledge_index, get_embedding_index):
+        try:
+            rankings.append(get_index().search(query, max_results * 2))
+        except Exception as e:
+            logging.error(f"Knowledge retrieval failed: {e}")
 
+    fused = {}
+    for ranking in rankings:
+        for rank, passage in enumerate(ranking):
+            key = (passage['file'], passage['offset'])
+            entry = fused.setdefault(key, {**passage, 'score': 0.0})
+            entry['score'] += 1.0 / (RRF_K + rank + 1)
 
+    return sorted(fused.values(), key=lambda p: p['score'], reverse=True)[:max_results]
@@ -290,7 +290,8 @@ class RobustShadowAI:
         try:
             if self.dep_manager.is_available('pyautogui'):
                 import pyautogui
-                pyautogui.PAUSE = 0.5
+                from config import PYAUTOGUI_PAUSE
+                pyautogui.PAUSE = PYAUTOGUI_PAUSE
                 pyautogui.FAILSAFE = True
                 self.automation_available = True
                 logging.info("PyAutoGUI initialized successfully")
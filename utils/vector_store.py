@@ -0,0 +1,314 @@
+"""
+Vector Store for Shadow AI
+Append-only, memory-mapped float32 vector matrix with flat and IVF top-k search
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import RAG_IVF_MIN_VECTORS, RAG_IVF_NPROBE, RAG_COMPACT_RATIO
+
+SEARCH_BLOCK_ROWS = 65536  # Rows scored per matrix product in flat search
+KMEANS_SAMPLE_SIZE = 32768
+KMEANS_ITERATIONS = 10
+
+class VectorStore:
+    """
+    Unit-length float32 vectors in a raw file that is only appended to between
+    compactions.
+
+    Each row carries integer metadata columns (e.g. file id and byte offset).
+    Deleting rows only clears their live flag; the file is compacted once the
+    dead fraction passes ``RAG_COMPACT_RATIO``. Searches scan everything while
+    the store is small and switch to an inverted-file (IVF) index over k-means
+    centroids once it has ``RAG_IVF_MIN_VECTORS`` live rows, probing only the
+    ``nprobe`` closest lists.
+
+    Appends become durable when ``save()`` writes the state file; rows beyond
+    the saved count are discarded on load.
+    """
+
+    def __init__(self, directory: Path, dim: int, columns: Sequence[str],
+                 ivf_min_vectors: int = RAG_IVF_MIN_VECTORS, nprobe: int = RAG_IVF_NPROBE):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.columns = tuple(columns)
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = nprobe
+        self._replaced_vectors_path: Optional[Path] = None
+        self.meta: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._vectors = None
+        self._load()
+
+    # Persistence
+
+    def _array_path(self, name: str, generation: int) -> Path:
+        return self.directory / f"{name}_{generation}.npy"
+
+    def _reset(self):
+        self.generation = 0
+        self.vectors_path = self.directory / "vectors_0.f32"
+        self.count = 0
+        self.trained_at = 0
+        self.live = np.zeros(0, dtype=bool)
+        self.data = np.zeros((0, len(self.columns)), dtype=np.int64)
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._build_lists()
+
+    def _load(self):
+        self._reset()
+        state_path = self.directory / "state.json"
+        if not state_path.exists():
+            self._truncate_vectors()
+            return
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state['dim'] != self.dim or tuple(state['columns']) != self.columns:
+                raise ValueError("vector store layout changed")
+            generation = state['generation']
+            self.live = np.load(self._array_path("live", generation))
+            self.data = np.load(self._array_path("data", generation))
+            if state.get('trained_at'):
+                self.centroids = np.load(self._array_path("centroids", generation))
+                self.assignments = np.load(self._array_path("assignments", generation))
+            self.generation = generation
+            self.vectors_path = self.directory / state['vectors_file']
+            self.count = state['count']
+            self.trained_at = state.get('trained_at', 0)
+            self.meta = state.get('meta', {})
+            self._truncate_vectors()
+            self._build_lists()
+        except Exception as e:
+            logging.warning(f"Could not load vector store, starting empty: {e}")
+            self._reset()
+            self.meta = {}
+            self._truncate_vectors()
+
+    def _truncate_vectors(self):
+        """Drop rows appended after the last save (e.g. after a crash)"""
+        expected = self.count * self.dim * 4
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size > expected:
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(expected)
+
+    def save(self):
+        """Persist the live flags, metadata and IVF state as a new generation"""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            previous = self.generation
+            generation = previous + 1
+            arrays = {"live": self.live, "data": self.data}
+            if self.centroids is not None:
+                arrays.update(centroids=self.centroids, assignments=self.assignments)
+            for name, array in arrays.items():
+                np.save(self._array_path(name, generation), array)
+
+            state = {
+                'dim': self.dim,
+                'columns': list(self.columns),
+                'generation': generation,
+                'count': self.count,
+                'vectors_file': self.vectors_path.name,
+                'trained_at': self.trained_at if self.centroids is not None else 0,
+                'meta': self.meta,
+            }
+            tmp_path = self.directory / "state.json.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.directory / "state.json")
+            self.generation = generation
+
+            stale = [self._array_path(name, previous) for name in ("live", "data", "centroids", "assignments")]
+            if self._replaced_vectors_path is not None:
+                stale.append(self._replaced_vectors_path)
+                self._replaced_vectors_path = None
+            for path in stale:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _matrix(self) -> np.ndarray:
+        """Memory-mapped view of the stored vectors"""
+        if self.count == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._vectors is None or self._vectors.shape[0] != self.count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                      shape=(self.count, self.dim))
+        return self._vectors
+
+    # Updates
+
+    def append(self, vectors: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """
+        Append unit-length vectors with their metadata rows
+
+        Returns:
+            The new row ids
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        data = np.asarray(data, dtype=np.int64).reshape(-1, len(self.columns))
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+
+            rows = np.arange(self.count, self.count + len(vectors))
+            self.count += len(vectors)
+            self.live = np.concatenate([self.live, np.ones(len(vectors), dtype=bool)])
+            self.data = np.concatenate([self.data, data])
+            if self.centroids is not None:
+                self.assignments = np.concatenate([self.assignments, self._assign(vectors)])
+                self._build_lists()
+            return rows
+
+    def delete_where(self, column: str, values: Sequence[int]) -> int:
+        """Mark every row whose column value is in ``values`` as deleted"""
+        with self._lock:
+            if not len(values) or self.count == 0:
+                return 0
+            hits = self.live & np.isin(self.data[:, self.columns.index(column)], list(values))
+            self.live[hits] = False
+            return int(hits.sum())
+
+    def live_count(self) -> int:
+        return int(self.live.sum())
+
+    def maintain(self):
+        """Compact dead rows and (re)train the IVF index when worthwhile"""
+        with self._lock:
+            if self.count and 1 - self.live_count() / self.count > RAG_COMPACT_RATIO:
+                self._compact()
+            live = self.live_count()
+            if live >= self.ivf_min_vectors and (self.centroids is None or live >= 2 * self.trained_at):
+                self._train()
+            elif live < self.ivf_min_vectors and self.centroids is not None:
+                self.centroids = None
+                self.trained_at = 0
+                self._build_lists()
+
+    def _compact(self):
+        """Copy the live rows into a new vector file; the old one is removed by the next save"""
+        keep = np.flatnonzero(self.live)
+        new_path = self.directory / f"vectors_{self.generation + 1}.f32"
+        matrix = self._matrix()
+        with open(new_path, 'wb') as f:
+            for start in range(0, len(keep), SEARCH_BLOCK_ROWS):
+                f.write(np.ascontiguousarray(matrix[keep[start:start + SEARCH_BLOCK_ROWS]]).tobytes())
+
+        # Release the memory map so the old file can be deleted on Windows
+        self._vectors = None
+        del matrix
+        self._replaced_vectors_path = self.vectors_path
+        self.vectors_path = new_path
+
+        logging.info(f"Compacted vector store from {self.count} to {len(keep)} rows")
+        self.count = len(keep)
+        self.data = self.data[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+        if self.centroids is not None:
+            self.assignments = self.assignments[keep]
+        self._build_lists()
+
+    def _train(self):
+        """Train IVF centroids with spherical k-means on a sample of live rows"""
+        live_rows = np.flatnonzero(self.live)
+        n_lists = int(np.clip(np.sqrt(len(live_rows)), 16, 4096))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, min(len(live_rows), max(KMEANS_SAMPLE_SIZE, 8 * n_lists)),
+                                         replace=False))
+        sample = np.asarray(self._matrix()[sample_rows])
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = np.concatenate([
+            self._assign(self._matrix()[start:start + SEARCH_BLOCK_ROWS])
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS)
+        ]) if self.count else np.zeros(0, dtype=np.int32)
+        self.trained_at = len(live_rows)
+        self._build_lists()
+        logging.info(f"Trained IVF index with {n_lists} lists over {len(live_rows)} vectors")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(np.asarray(vectors) @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _build_lists(self):
+        """Group row ids by IVF list"""
+        if self.centroids is None:
+            self._list_rows = None
+            self._list_starts = None
+            return
+        self._list_rows = np.argsort(self.assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self._list_starts = np.concatenate(([0], np.cumsum(counts)))
+
+    # Search
+
+    def search(self, query: np.ndarray, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find the rows with the highest inner product with a unit-length query
+
+        Returns:
+            List of (row id, score) pairs, best first
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if self.count == 0:
+                return []
+            matrix = self._matrix()
+
+            if self.centroids is None:
+                rows_list, scores_list = [], []
+                for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                    block = matrix[start:start + SEARCH_BLOCK_ROWS] @ query
+                    block[~self.live[start:start + SEARCH_BLOCK_ROWS]] = -np.inf
+                    top = self._top(block, k)
+                    rows_list.append(top + start)
+                    scores_list.append(block[top])
+                rows = np.concatenate(rows_list)
+                scores = np.concatenate(scores_list)
+            else:
+                probe = self._top(self.centroids @ query, nprobe or self.nprobe)
+                rows = np.concatenate([self._list_rows[self._list_starts[c]:self._list_starts[c + 1]]
+                                       for c in probe])
+                rows = np.sort(rows[self.live[rows]])
+                if len(rows) == 0:
+                    return []
+                scores = matrix[rows] @ query
+
+            top = self._top(scores, k)
+            return [(int(rows[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indexes of the k largest scores, best first"""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        return {
+            'rows': self.count,
+            'live_rows': self.live_count(),
+            'ivf_lists': 0 if self.centroids is None else len(self.centroids),
+            'generation': self.generation
+        }